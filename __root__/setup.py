@@ -35,6 +35,7 @@ from distutils.errors import DistutilsSetupError
 from distutils.command.build import build
 from distutils.command.build_ext import build_ext
 from distutils.command.install_data import install_data
+from setuptools.command.build_py import build_py as setuptools_build_py
 from setuptools.command.develop import develop as setuptools_develop
 # otherwise fails on
 #   error: option --single-version-externally-managed not recognized...managed
@@ -233,6 +234,27 @@ class install_data(install_data):
     prereq = staticmethod(true_gen)
 
 
+class build_py(setuptools_build_py):
+    # Additionally generate manifests of the (bundled) plugins within the
+    # build tree so that run-time discovery need not import every module;
+    # failing that is not fatal (discovery falls back to probing modules)
+    def run(self):
+        setuptools_build_py.run(self)
+        if self.dry_run:
+            return
+        from distutils import log
+        from subprocess import call
+        from sys import executable
+        ext = glob(path_join(self.build_lib, pkg_name, 'ext-plugins', '*', ''))
+        code = ("import sys; sys.path.insert(0, sys.argv[1]);"
+                " from {0}.main import rebuild_manifest;"
+                " sys.exit(bool(rebuild_manifest(ext_plugins=False,"
+                " ext_plugins_user=sys.argv[2:])[1]))").format(pkg_name)
+        log.info("generating plugin manifests")
+        if call([executable, '-c', code, path_abs(self.build_lib)] + ext):
+            log.warn("plugin manifests (some or all) not generated")
+
+
 def setup_pkg_prepare(pkg_name, pkg_prepare_options=()):
 
     class pkg_prepare(Command):
@@ -656,6 +678,7 @@ setup(
     # Override ``build'' command handler with local specialized one
     cmdclass=pkg_prepare.inject_cmdclass(
         develop,
+        build_py,
         build=(build, build_binary),
         install=(install, install_data),
         setuptools_develop=setuptools_develop,
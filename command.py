@@ -10,9 +10,11 @@ try:
     from itertools import zip_longest
 except ImportError:  # PY2 backward compatibility
     from itertools import izip_longest as zip_longest
+from functools import partial
 from logging import getLogger
-from optparse import OptionParser
+from optparse import OptionParser, OptionValueError
 from sys import stderr, stdin, stdout
+from threading import Event, Lock
 from time import time
 
 try:
@@ -24,6 +26,8 @@ from .command_context import CommandContext
 from .error import ClufterError, \
                    EC
 from .filter import Filter, CMD_HELP_OPTSEP_COMMON
+from .filter_cache import FilterCache
+from .filter_stats import FilterProfile, FilterStats
 from .format import FormatError, SimpleFormat
 from .plugin_registry import PluginRegistry
 from .protocol import protodictval
@@ -36,7 +40,7 @@ from .utils import any2iter, \
                    nonetype, \
                    selfaware, \
                    tuplist
-from .utils_2to3 import MimicMeta, basestring, \
+from .utils_2to3 import MimicMeta, PY3, basestring, \
                         foreach_u, filter_u, \
                         iter_items, iter_values, \
                         xrange
@@ -44,17 +48,23 @@ from .utils_func import apply_aggregation_preserving_depth, \
                         apply_intercalate, \
                         apply_loose_zip_preserving_depth, \
                         apply_preserving_depth, \
-                        bifilter, \
                         foreach, \
                         tailshake, \
+                        tailshake_safe, \
                         zip_empty
 from .utils_prog import FancyOutput, \
                         cli_decor, \
                         longopt_letters_reprio, \
                         defer_common
+from .utils_xslt import XSLTProfile, XSLTTrace
 
 log = getLogger(__name__)
 
+if PY3:
+    import_lock_held = lambda: False  # per-module import locks
+else:
+    from imp import lock_held as import_lock_held
+
 fltiodecl = lambda x: len(x) == 2 and isinstance(x[0], Filter)
 
 # expected to be lowercase for more straightforward case-insensitive comparison
@@ -66,9 +76,34 @@ class CommandError(ClufterError):
     pass
 
 
+def parser_callback_stats(option, opt_str, value, parser):
+    """Makes 'stats' option accept 'optional option argument' (=FILE only)"""
+    # positional arguments may follow, hence only the explicit form counts
+    val = True
+    if getattr(parser, 'long_opt_explicit', False):
+        val = parser.rargs.pop(0)
+    setattr(parser.values, option.dest, val)
+
+
+def parser_callback_filters(option, opt_str, value, parser, choices=()):
+    """Makes option accept comma-separated filter names (can be repeated)"""
+    names = value.split(',')
+    for name in names:
+        if name not in choices:
+            raise OptionValueError("option {0}: invalid choice: {1!r}"
+                                   " (choose from {2})".format(
+                                       opt_str, name, ', '.join(choices)))
+    setattr(parser.values, option.dest,
+            list(getattr(parser.values, option.dest, None) or ()) + names)
+
+
 class commands(PluginRegistry):
     """Command registry (to be used as a metaclass for commands)"""
-    pass
+
+    @classmethod
+    def _manifest_plugin(registry, plugin):
+        """Declared (unresolved) filter chain of the command, if any"""
+        return dict(filter_chain=getattr(plugin, '_filter_chain', None))
 
 
 class _Command(object):
@@ -135,9 +170,73 @@ class _Command(object):
     def filter_chain_analysis(self):
         if self._filter_chain_analysis is None:
             filter_chain = self._filter_chain
-            self._filter_chain_analysis = self.analyse_chain(filter_chain)
+            analysis = self.analyse_chain(filter_chain)
+            terminals = tailshake_safe(analysis['terminal_chain'][-1])
+            analysis['plan'] = self.execution_plan(
+                analysis['filter_backtrack'],
+                tuple(t.__class__.name for t in terminals)
+            )
+            self._filter_chain_analysis = analysis
         return self._filter_chain_analysis
 
+    @MimicMeta.method
+    def execution_plan(self, filter_backtrack, terminals):
+        """Plan for given flattened terminals, computed once per class"""
+        plan = self._plan_cache.get(terminals)
+        if plan is None:
+            plan = self._plan_cache[terminals] = self.plan_chain(
+                dict((f.__class__.name, tuple(b.__class__.name for b in bt))
+                     for f, bt in iter_items(filter_backtrack)),
+                terminals
+            )
+        return plan
+
+    @MimicMeta.staticmethod
+    @selfaware
+    def plan_chain(me, feeders, terminals):
+        """Given feeders and flattened terminals, return the plan
+
+        Feeders map the name of each filter to the names of the filters
+        feeding it (as per filter backtrack), terminals are the names of
+        the filters at the respective positions of the flattened terminal
+        chain (None for an unused position).
+        The plan is a topologically ordered sequence of steps, each being
+        a triple of kind, filter name and the position of the terminal
+        the step is bound to (None for inner filters), where kind is one of:
+
+            input   UPFILTER reads the data as per its terminal and runs
+            run     DOWNFILTER runs with the outputs of its feeders
+            output  terminal filter stores its output as per its terminal
+
+        The order is the one the terminals are visited in, whereas any
+        filter not fed yet first gets its feeders scheduled (recursively).
+        """
+        bound = set(t for t in terminals if t is not None)
+        plan, done = [], set()
+        worklist = [(t, pos) for pos, t in reversed(tuple(enumerate(terminals)))
+                    if t is not None]
+        while worklist:
+            name, pos = worklist.pop()
+            if name not in done:
+                notyet = tuple(f for f in feeders[name] if f not in done)
+                if notyet:
+                    worklist.append((name, pos))
+                    worklist.extend(reversed(tuple((ny, None)
+                                                   for ny in notyet)))
+                    continue
+                if not feeders[name] and pos is None:
+                    raise CommandError(me,
+                        "filter `{0}' would have to run before its input"
+                        " is known", name
+                    )
+                plan.append(('run' if feeders[name] else 'input', name, pos))
+                done.add(name)
+                if not feeders[name]:
+                    continue  # UPFILTER terminal is tracked twice (I/O)
+            if name in bound:
+                plan.append(('output', name, pos))
+        return tuple(plan)
+
     @MimicMeta.staticmethod
     @selfaware
     def analyse_chain(me, filter_chain, analysis_acc=None):
@@ -268,6 +367,62 @@ class _Command(object):
             )
             options.append([["--" + optname_used], opt])
 
+    @MimicMeta.method
+    def _figure_parser_opt_run(self, options, shortopts):
+        # how the filters are run: profiling, plan, caching, statistics
+        # (XXX shortopts unused)
+        options.append([["--profile-filter"], dict(
+            metavar="NAME[,NAME...]",
+            type='string',
+            action='callback',
+            callback=parser_callback_filters,
+            callback_kwargs=dict(choices=list(self._filters) + ['ANY']),
+            default=[],
+            expert=True,
+            help="debug only: profile the run of the filter (cProfile;"
+                 " 2+: repeat, or comma-separated); any filter of the"
+                 " command, unlike with --noop/--dump not limited to those"
+                 " preserving the format [none out of {0}]"
+                 .format(', '.join(list(self._filters) + ['ANY'])),
+        )])
+        options.append([["--profile-memory"], dict(
+            action='store_true',
+            default=False,
+            expert=True,
+            help="debug only: with --profile-filter, also store tracemalloc"
+                 " snapshot of what the filter leaves allocated",
+        )])
+        options.append([["--show-plan"], dict(
+            action='store_true',
+            default=False,
+            expert=True,
+            help="debug only: show the execution plan of the filters and exit",
+        )])
+        options.append([["--no-cache"], dict(
+            action='store_true',
+            default=False,
+            expert=True,
+            help="do not use (nor populate) the persistent cache of filter"
+                 " outputs, even if configured (FILTERCACHE env. variable)",
+        )])
+        options.append([["--stats"], dict(
+            metavar="[FILE]",
+            type='string',
+            nargs=0,  # <- we take one if given as --stats=FILE
+            action='callback',
+            callback=parser_callback_stats,
+            default=False,
+            help="report per-filter time, memory peak and in/out sizes"
+                 " (to stderr, or FILE; JSON if named *.json)",
+        )])
+        options.append([["--keep-outputs"], dict(
+            action='store_true',
+            default=False,
+            expert=True,
+            help="debug only: keep intermediate outputs of the filters till"
+                 " the command finishes (released once consumed otherwise)",
+        )])
+
     @MimicMeta.method
     def _figure_parser_opt_unofficial(self, options, shortopts, fnc_varnames):
         # unofficial/unsupported ones  (XXX shortopts unused)
@@ -297,6 +452,8 @@ class _Command(object):
                     continue
                 line = line.replace('\t', ' ')
                 optname, optdesc = head_tail(line.split(' ', 1))  # 2nd->tuple
+                # optionally with explicit metavar: name=METAVAR description
+                optname, _, metavar = optname.partition('=')
                 if not all((optname, optdesc)) or optname not in fnc_varnames:
                     log.warning("Bad option line: {0}".format(line))
                 else:
@@ -306,16 +463,21 @@ class _Command(object):
                         self.__class__.name, optname_used, optname
                     ))
                     fnc_varnames.remove(optname)
-                    short_aliases = shortopts.setdefault(optname_used[0], [])
                     opt = {}
                     if target is expert:
+                        # no short option, hence not claiming any letter
                         opt['expert'] = True
                         opt['dest'] = optname  # (un)decor just works, '_' not
-                    elif not common_tail:
-                        assert optname_used not in \
-                            (options[i][0][0] for i in short_aliases)
-                        short_aliases.append(len(options))  # as an index
+                    else:
+                        short_aliases = shortopts.setdefault(optname_used[0],
+                                                             [])
+                        if not common_tail:
+                            assert optname_used not in \
+                                (options[i][0][0] for i in short_aliases)
+                            short_aliases.append(len(options))  # as an index
                     opt['help'] = optdesc[0].strip()
+                    if metavar:
+                        opt['metavar'] = metavar
                     if optname in fnc_defaults:  # default if known
                         default = fnc_defaults[optname]
                         if default in (True, False):
@@ -348,6 +510,7 @@ class _Command(object):
                 options[alias][0].append(use)
 
         self._figure_parser_opt_dumpnoop(options, shortopts)
+        self._figure_parser_opt_run(options, shortopts)
         options.extend(expert)
         self._figure_parser_opt_unofficial(options, shortopts, fnc_varnames)
 
@@ -418,19 +581,12 @@ class _Command(object):
 
     @MimicMeta.method  # should be classmethod?
     def _iochain_proceed(self, cmd_ctxt, io_chain):
-        # currently works sequentially, jumping through the terminals in-order;
-        # when any of them (apparently the output one) hasn't its prerequisites
-        # (i.e., input data) satisfied, the run is restarted with first
-        # producing such data (which are output of another filter feeding
-        # the one in question) -- this can be repeated multiple times if
-        # there is a longer chain forming such a gap
-        # -- this is certainly needlessly slow method, but there is a hope
-        #    the same approach could be applied when parallelizing the stuff
-        # XXX could be made more robust (ordering still not as strict as it
-        #                                should)
-        # XXX some parts could be performed in parallel (requires previous
-        #     item so to prevent deadlocks on cond. var. wait)
-        #     - see also `heapq` standard module
+        # executes the statically computed plan (see `plan_chain`), only
+        # binding the terminals therein to the resolved io chain;
+        # plan itself is computed once per command class (and terminal
+        # chain shape, which may differ when io chain has gaps);
+        # with jobs > 1, filters ready to run are run concurrently
+        # (see `_plan_compute`)
         filter_backtrack = cmd_ctxt['filter_chain_analysis']['filter_backtrack']
         terminal_chain = cmd_ctxt['filter_chain_analysis']['terminal_chain'][-1]
         terminals = apply_intercalate(terminal_chain)
@@ -444,109 +600,384 @@ class _Command(object):
                                                        terminal_chain,
                                                        magic_fds,
                                                        cmd_ctxt['__filters__'])
+        # if any "EMPTY" (zip_empty) value present, respective class name ~ str
+        bound = tailshake(terminal_chain,
+                          partitioner=lambda x: not (tuplist(x)) or fltiodecl(x))
+        plan = self.execution_plan(filter_backtrack, tuple(
+            None if workitem == zip_empty else workitem[0].__class__.name
+            for workitem in bound
+        ))
+        if cmd_ctxt.get('show_plan'):
+            self._plan_show(plan, bound)
+        else:
+            self._plan_execute(cmd_ctxt, plan, bound, terminals, magic_fds)
+
+        # close "magic" fds
+        foreach(lambda k: k in native_fds or magic_fds[k].close(), magic_fds)
+        return EC.EXIT_SUCCESS  # XXX some better decision?
+
+    @MimicMeta.method
+    def _plan_show(self, plan, bound):
+        for i, (kind, name, pos) in enumerate(plan, 1):
+            io_decl = () if kind == 'run' else protodictval(bound[pos][1])
+            print("{0:>3} {1:<6} {2}{3}".format(
+                i, kind, cli_decor(name),
+                ' {0} {1}'.format('<' if kind == 'input' else '>',
+                                  ':'.join(str(getattr(d, 'name', d))
+                                           for d in io_decl))
+                if io_decl else ''
+            ))
 
+    @MimicMeta.staticmethod
+    def _filter_runner(cmd_ctxt):
+        """Return function to run the filter with, caching/measuring if on"""
+        run = cmd_ctxt.get('filter_cache')
+        if run is None:
+            run = lambda flt, in_obj, flt_ctxt: flt(in_obj, flt_ctxt)
+        profile = cmd_ctxt.get('filter_profile')
+        if profile is not None:
+            run = partial(profile.run, run)
+        stats = cmd_ctxt.get('stats')
+        return run if stats is None else partial(stats.run, run)
+
+    @MimicMeta.staticmethod
+    def _format_instantiator(cmd_ctxt):
+        """Return function to get the filter's input format instance with"""
+        stats = cmd_ctxt.get('stats')
+        if stats is None:
+            return lambda flt, *args, **kwargs: \
+                       flt.in_format.as_instance(*args, **kwargs)
+        return stats.instantiate
+
+    @MimicMeta.method
+    def _plan_consumers(self, plan, bound, filter_backtrack):
+        """Figure out which plan steps consume what (releasable only)
+
+        Returns dict mapping pairs, either ('out', filter name), ('in',
+        filter name) or ('input', io_decl), denoting the filter's output/
+        input or the cached input, respectively, to the list of indexes
+        of the plan steps consuming them.
+
+        Outputs of the filters with output steps are not included (post-
+        processing may refer to them), neither are inputs of the filters
+        referred to in the string interpolation of IO declarations
+        (`{ccs2ccsflat.in.hash}'), as these have to survive.
+        """
+        decls = ' '.join(str(workitem[1]) for workitem in bound
+                         if workitem != zip_empty)
+        keep = set(name for kind, name, _ in plan if kind == 'output')
+        ret = {}
+        for i, (kind, name, pos) in enumerate(plan):
+            if kind == 'output':
+                continue
+            for feeder in filter_backtrack[self._filters[name]]:
+                feeder = feeder.__class__.name
+                if feeder not in keep:
+                    ret.setdefault(('out', feeder), []).append(i)
+            if not any('{' + n + '.' in decls
+                       for n in (name, cli_decor(name))):
+                ret.setdefault(('in', name), []).append(i)
+            if kind == 'input':
+                ret.setdefault(('input', protodictval(bound[pos][1])),
+                               []).append(i)
+        return ret
+
+    @MimicMeta.method
+    def _plan_release(self, plan, bound, filter_backtrack):
+        """Figure out what can be released after the respective plan steps
+
+        Returns tuple (parallel to the plan) of tuples of pairs as per
+        `_plan_consumers', denoting what has already been consumed for
+        the last time.  Consequently, nothing is to be released after
+        the output steps.
+        """
+        ret = tuple([] for _ in plan)
+        for what, steps in iter_items(self._plan_consumers(plan, bound,
+                                                           filter_backtrack)):
+            ret[max(steps)].append(what)
+        return tuple(tuple(r) for r in ret)
+
+    @MimicMeta.method
+    def _plan_concurrent(self, plan, filter_backtrack):
+        """Whether some filters of the plan can run concurrently at all
+
+        That is the case when the filters are not totally ordered by
+        the feeding relation, i.e., some filters share the same depth
+        (length of the longest chain of filters feeding them).
+        """
+        depths = {}
+        for kind, name, _ in plan:
+            if kind == 'output' or name in depths:
+                continue
+            depths[name] = 1 + max([depths.get(f.__class__.name, 0)
+                                    for f in filter_backtrack[
+                                        self._filters[name]
+                                    ]] or [0])
+        return len(set(iter_values(depths))) < len(depths)
+
+    @MimicMeta.method
+    def _plan_compute(self, cmd_ctxt, plan, bound, terminals, jobs):
+        """Run the filters as per the plan on a pool of `jobs` threads
+
+        A filter is run as soon as the filters feeding it are finished,
+        hence independent branches of the chain are run concurrently.
+        Nothing but the filters' run happens here, i.e., the resulting
+        mapping of filter name to (in_obj, out, messages) triple is then
+        handled in order as per the plan (terminal outputs, dumps, and
+        the messages emitted meanwhile), exactly as in the sequential
+        case.  The filters run here are not interactive and do not start
+        any pool of their own (jobs being 1 for them).
+
+        Intermediate results are dropped (unless to be dumped) as soon as
+        the last of their consumers is finished, as per `_plan_consumers',
+        hence the result for such a filter then comes with None in place
+        of its (in_obj, out) parts.
+
+        As the tasks are submitted in the topological order and the pool
+        picks them in FIFO fashion, waiting for the feeders in the task
+        cannot deadlock (they are already running or finished).  Finished
+        tasks are signalled with events as multiple waiters are possible
+        (PY2 pool results would only wake one of them up).
+        """
+        filter_backtrack = cmd_ctxt['filter_chain_analysis']['filter_backtrack']
         input_cache = cmd_ctxt.setdefault('input_cache', {}, bypass=True)
-        worklist = list(reversed(tailshake(terminal_chain,
-                                           partitioner=lambda x:
-                                           not (tuplist(x)) or fltiodecl(x))))
-        # if any "EMPTY" (zip_empty) value present, respective class name ~ str
-        unused, tstmp = {}, hex(int(time()))[2:]
-        while worklist:
-            workitem = worklist.pop()
-            if workitem == zip_empty:
-                log.debug("Worklist: EMPTY value observed, skipped")
+        run = self._filter_runner(cmd_ctxt)
+        instantiate = self._format_instantiator(cmd_ctxt)
+        tasks, inputs, pending, messages = [], {}, {}, {}
+        dumped = lambda n: (n in cmd_ctxt['filter_dump']
+                            or 'ANY' in cmd_ctxt['filter_dump'])
+        consumers = {} if cmd_ctxt.get('keep_outputs') else \
+                    self._plan_consumers(plan, bound, filter_backtrack)
+        users, consumed, lock = {}, {}, Lock()
+
+        def task(flt, flt_ctxt, source, noop, slot, done):
+            try:
+                in_obj = source()
+                slot.append([in_obj, in_obj if noop else run(flt, in_obj,
+                                                                    flt_ctxt)])
+                in_obj = None
+                release(flt.__class__.name)
+            finally:
+                done.set()
+
+        def release(name):
+            with lock:
+                for what in consumed.get(name, ()):
+                    users[what][0] -= 1
+                    if not users[what][0]:
+                        for slot, i in users.pop(what)[1]:
+                            slot[0][i] = None
+
+        def finished(name, slot, done):
+            done.wait()
+            if not slot:
+                raise CommandError(self, "filter `{0}' failed", name)
+            return slot[0]
+
+        def as_instance(flt, feeders, **fmt_kws):
+            return instantiate(flt, *(f()[1] for f in feeders), **fmt_kws)
+
+        # first, all the preparation (possibly tainting the context)
+        for kind, name, pos in plan:
+            if kind == 'output':
                 continue
-            flt, io_decl = workitem
+            flt, io_decl = (self._filters[name], None) if pos is None \
+                           else bound[pos]
+            io_decl = protodictval(io_decl)
+            flt_ctxt = cmd_ctxt.ensure_filter(flt)
+            if 'out' in flt_ctxt:
+                pending[name] = partial(tuple, (None, flt_ctxt['out']))
+                continue
+            with flt_ctxt.prevented_taint():
+                fmt_kws = filterdict_keep(flt_ctxt, *flt.in_format.context)
+            if kind == 'input' and io_decl in input_cache:
+                source = partial(lambda x: x, input_cache[io_decl])
+            elif kind == 'input' and io_decl in inputs:
+                source = partial(lambda f: f()[0], inputs[io_decl])
+            elif kind == 'input':
+                source = partial(instantiate, flt, *io_decl, **fmt_kws)
+            else:
+                source = partial(as_instance, flt,
+                                 tuple(pending[x.__class__.name]
+                                       for x in filter_backtrack[flt]),
+                                 **fmt_kws)
+            noop = flt.__class__.name in cmd_ctxt['filter_noop']
+            if flt in terminals and not noop:
+                flt_ctxt['io_decl'] = io_decl  # see _plan_execute
+            messages[name] = []
+            flt_ctxt.update(
+                jobs=1,
+                interactive=False,
+                svc_output=partial(lambda m, msg, **kws: m.append((msg, kws)),
+                                   messages[name]),
+            )
+            slot, done = [], Event()
+            pending[name] = partial(finished, name, slot, done)
+            if kind == 'input':
+                inputs.setdefault(io_decl, pending[name])
+            tasks.append((name, (flt, flt_ctxt, source, noop, slot, done)))
+
+        # what is to be released once the consumers (tasks) are finished
+        slots = dict((name, args[4]) for name, args in tasks)
+        for what, steps in iter_items(consumers):
+            names = set(plan[i][1] for i in steps)
+            if what[0] == 'input':
+                which = [n for n in names if ('in', n) in consumers]
+            else:
+                which = [what[1]]
+            which = [(slots[n], int(what[0] == 'out')) for n in which
+                     if n in slots and not dumped(n)]
+            if not which or not names.issubset(slots) or what[0] == 'in' \
+                    and plan[steps[0]][0] == 'input':
+                continue  # not ours, kept, or left to the cached input
+            users[what] = [len(names), which]
+            foreach(lambda n: consumed.setdefault(n, []).append(what), names)
+
+        # then, the concurrent run as such (no tainting possible)
+        from multiprocessing.pool import ThreadPool  # not to slow start
+        pool, ret = ThreadPool(jobs), None
+        try:
+            with cmd_ctxt.prevented_taint():
+                results = [(name, pool.apply_async(task, args))
+                           for name, args in tasks]
+                # in order, so that the root cause is what gets raised
+                foreach(lambda r: r[1].get(), results)
+                ret = dict((name, tuple(slots[name][0]) + (messages[name], ))
+                           for name, r in results)
+        finally:
+            pool.terminate()
+            pool.join()
+            foreach(lambda f: cmd_ctxt.filter(f.__class__.name)
+                                      .pop('io_decl', None), terminals)
+            for name, args in tasks:
+                flt_ctxt = args[1]
+                foreach(lambda k: flt_ctxt.pop(k, None),
+                        ('jobs', 'interactive', 'svc_output'))
+                if ret is None:  # failed, emit what the filters have so far
+                    for msg, kws in messages[name]:
+                        flt_ctxt['svc_output'](msg, **kws)
+        return ret
+
+    @MimicMeta.method
+    def _plan_execute(self, cmd_ctxt, plan, bound, terminals, magic_fds):
+        filter_backtrack = cmd_ctxt['filter_chain_analysis']['filter_backtrack']
+        input_cache = cmd_ctxt.setdefault('input_cache', {}, bypass=True)
+        unused, tstmp = {}, hex(int(time()))[2:]
+        jobs = cmd_ctxt.filter().get('jobs', 1)
+        if jobs > 1 and import_lock_held():
+            # PY2: threads could not import anything meanwhile (run-dev)
+            log.info("Cannot run filters in parallel with import lock held")
+            jobs = 1
+        elif jobs > 1 and not self._plan_concurrent(plan, filter_backtrack):
+            jobs = 1  # nothing to gain, jobs left to the filters (XSLT)
+        computed = {} if jobs < 2 else self._plan_compute(cmd_ctxt, plan,
+                                                          bound, terminals,
+                                                          jobs)
+        run = self._filter_runner(cmd_ctxt)
+        instantiate = self._format_instantiator(cmd_ctxt)
+        # intermediate results are dropped once consumed for the last time,
+        # so that they do not pile up till the very end of the command
+        release = ((), ) * len(plan) if cmd_ctxt.get('keep_outputs') else \
+                  self._plan_release(plan, bound, filter_backtrack)
+        for (kind, name, pos), released in zip(plan, release):
+            flt, io_decl = (self._filters[name], None) if pos is None \
+                           else bound[pos]
             io_decl_use = protodictval(io_decl)
             io_decl, passout = (io_decl_use, unused if io_decl_use is io_decl
                                              else io_decl)
             flt_ctxt = cmd_ctxt.ensure_filter(flt)
+            if kind == 'output':
+                # output time!  (incl. UPFILTER terminal listed twice)
+                with cmd_ctxt.prevented_taint():  # still needed for late bind
+                    io_decl = SimpleFormat.io_decl_specials(io_decl, 0,
+                                                            magic_fds,
+                                                            cmd_ctxt['__filters__'])
+                log.debug("Run `{0}' filter with `{1}' io decl. as TERMINAL"
+                          .format(flt.__class__.name, io_decl))
+                # store output somewhere, which even can be useful (as a lib)
+                passout['passout'] = flt_ctxt['out'](*io_decl)
+                stats = cmd_ctxt.get('stats')
+                if stats is not None:
+                    stats.output(flt, flt_ctxt['out'], io_decl[0],
+                                 passout['passout'])
+                if passout is unused and io_decl[0] == SimpleFormat.FILE:
+                    flt_ctxt.ctxt_svc_output("|subheader:output:|"
+                                             " |highlight:{0}|"
+                                             .format(passout['passout']))
+                continue
+            elif 'out' in flt_ctxt:
+                continue  # output already precomputed
             with flt_ctxt.prevented_taint():
                 fmt_kws = filterdict_keep(flt_ctxt, *flt.in_format.context)
-            if not filter_backtrack[flt] and 'out' not in flt_ctxt:
-                # UPFILTER in in-mode
+            precomputed = computed.pop(name, None)
+            if kind == 'input':
                 log.debug("Run `{0}' filter with `{1}' io decl. as UPFILTER"
                           .format(flt.__class__.__name__, io_decl))
                 if io_decl in input_cache:
                     in_obj = input_cache[io_decl]
                 else:
-                    with cmd_ctxt.prevented_taint():
-                        in_obj = flt.in_format.as_instance(*io_decl, **fmt_kws)
-                    input_cache[io_decl] = flt_ctxt['in'] = in_obj
-            elif filter_backtrack[flt] and 'out' not in flt_ctxt:
-                # not UPFILTER in either mode (nor output already precomputed?)
+                    if precomputed:
+                        in_obj = precomputed[0]  # None if released already
+                    else:
+                        with cmd_ctxt.prevented_taint():
+                            in_obj = instantiate(flt, *io_decl, **fmt_kws)
+                    if in_obj is not None:
+                        input_cache[io_decl] = flt_ctxt['in'] = in_obj
+            else:
                 log.debug("Run `{0}' filter with `{1}' io decl. as DOWNFILTER"
                           .format(flt.__class__.__name__, io_decl))
-                ok, notyet = bifilter(lambda x: 'out' in
-                                        cmd_ctxt.filter(x.__class__.__name__),
-                                      filter_backtrack[flt])
-                if notyet:
-                    log.debug("Backtrack with inclusion of {0} to feed `{1}'"
-                              .format(', '.join("`{0}'"
-                                      .format(ny.__class__.__name__)
-                                              for ny in notyet),
-                                      flt.__class__.__name__))
-                    worklist.append((flt, io_decl if passout is unused
-                                          else passout))
-                    worklist.extend(reversed(tuple((ny, None)
-                                             for ny in notyet)))
-                    continue
-
-                inputs = tuple(cmd_ctxt.filter(x.__class__.__name__).get('out')
-                               for x in filter_backtrack[flt])
-                assert all(inputs)
+                if precomputed:
+                    in_obj = precomputed[0]  # None if released already
+                else:
+                    inputs = tuple(cmd_ctxt.filter(x.__class__.__name__)
+                                   .get('out') for x in filter_backtrack[flt])
+                    assert all(inputs)
+                    with cmd_ctxt.prevented_taint():
+                        in_obj = instantiate(flt, *inputs, **fmt_kws)
+                if in_obj is not None:  # referred in interpolation -> a bug?
+                    flt_ctxt['in'] = in_obj
+            if precomputed:
+                ret = precomputed[1]
+                for msg, kws in precomputed[2]:
+                    flt_ctxt['svc_output'](msg, **kws)
+            elif flt.__class__.name in cmd_ctxt['filter_noop']:
+                ret = in_obj
+            else:
+                # re io_decl: allow terminal filters have a peek at
+                # respective resolved(!) filter IO declaration, so they
+                # can, e.g., choose a final formatting (see cmd-wrap)
+                # XXX useful just for output terminals, really
+                if flt in terminals:
+                    flt_ctxt['io_decl'] = io_decl
                 with cmd_ctxt.prevented_taint():
-                    in_obj = flt.in_format.as_instance(*inputs, **fmt_kws)
-                flt_ctxt['in'] = in_obj  # referred in interpolation -> a bug?
-            if 'out' not in flt_ctxt or flt not in terminals:
-                if 'out' not in flt_ctxt:
-                    if flt.__class__.name in cmd_ctxt['filter_noop']:
-                        ret = in_obj
+                    ret = run(flt, in_obj, flt_ctxt)
+                if flt in terminals:
+                    flt_ctxt.pop('io_decl')
+            if ret is not None:  # unless released already (jobs > 1)
+                flt_ctxt['out'] = ret
+            if kind == 'input' or flt not in terminals:
+                if (flt.__class__.name in cmd_ctxt['filter_dump']
+                    or 'ANY' in cmd_ctxt['filter_dump']):
+                    try:
+                        fn = 'dump-{0}-{1}-{2}'.format(
+                            flt.__class__.name,
+                            flt_ctxt['in'].hash,
+                            tstmp,
+                        )
+                        ret(SimpleFormat.FILE, fn)
+                    except FormatError:
+                        flt_ctxt.ctxt_svc_output("dumping failed",
+                                                 base='error', urgent=True)
                     else:
-                        # re io_decl: allow terminal filters have a peek at
-                        # respective resolved(!) filter IO declaration, so they
-                        # can, e.g., choose a final formatting (see cmd-wrap)
-                        # XXX useful just for output terminals, really
-                        if flt in terminals:
-                            flt_ctxt['io_decl'] = io_decl
-                        with cmd_ctxt.prevented_taint():
-                            ret = flt(in_obj, flt_ctxt)
-                        if flt in terminals:
-                            flt_ctxt.pop('io_decl')
-                    flt_ctxt['out'] = ret
-                if flt not in terminals or not filter_backtrack[flt]:
-                    if (flt.__class__.name in cmd_ctxt['filter_dump']
-                        or 'ANY' in cmd_ctxt['filter_dump']):
-                        try:
-                            fn = 'dump-{0}-{1}-{2}'.format(
-                                flt.__class__.name,
-                                flt_ctxt['in'].hash,
-                                tstmp,
-                            )
-                            ret(SimpleFormat.FILE, fn)
-                        except FormatError:
-                            flt_ctxt.ctxt_svc_output("dumping failed",
-                                                     base='error', urgent=True)
-                        else:
-                            flt_ctxt.ctxt_svc_output("|subheader:dump:|"
-                                                     " |highlight:{0}|"
-                                                     .format(fn))
-                    continue
-            # output time!  (incl. UPFILTER terminal listed twice in io_chain)
-            with cmd_ctxt.prevented_taint():  # still needed for late binding
-                io_decl = SimpleFormat.io_decl_specials(io_decl, 0, magic_fds,
-                                                        cmd_ctxt['__filters__'])
-            log.debug("Run `{0}' filter with `{1}' io decl. as TERMINAL"
-                      .format(flt.__class__.name, io_decl))
-            # store output somewhere, which even can be useful (use as a lib)
-            passout['passout'] = flt_ctxt['out'](*io_decl)
-            if passout is unused and io_decl[0] == SimpleFormat.FILE:
-                flt_ctxt.ctxt_svc_output("|subheader:output:| |highlight:{0}|"
-                                         .format(passout['passout']))
-
-        # close "magic" fds
-        foreach(lambda k: k in native_fds or magic_fds[k].close(), magic_fds)
-        return EC.EXIT_SUCCESS  # XXX some better decision?
+                        flt_ctxt.ctxt_svc_output("|subheader:dump:|"
+                                                 " |highlight:{0}|"
+                                                 .format(fn))
+            in_obj = ret = inputs = None
+            for what, which in released:
+                if what == 'input':
+                    input_cache.pop(which, None)
+                else:
+                    cmd_ctxt.filter(which).pop(what, None)
 
     @MimicMeta.method
     def __call__(self, opts, args=None, cmd_ctxt=None):
@@ -559,6 +990,18 @@ class _Command(object):
         cmd_ctxt = cmd_ctxt or CommandContext({
             'filter_noop':           getattr(opts, 'noop', ()),
             'filter_dump':           getattr(opts, 'dump', ()),
+            'filter_profile':        getattr(opts, 'profile_filter', ()) and
+                                     FilterProfile(opts.profile_filter,
+                                                   getattr(opts,
+                                                           'profile_memory',
+                                                           False)) or None,
+            'show_plan':             getattr(opts, 'show_plan', False),
+            'keep_outputs':          getattr(opts, 'keep_outputs', False),
+            'filter_cache':          None if getattr(opts, 'no_cache', False)
+                                     else FilterCache.from_env(),
+            'stats':                 getattr(opts, 'stats', False) and
+                                     FilterStats(None if opts.stats is True
+                                                 else opts.stats) or None,
             'system':                getattr(opts, 'sys', ''),
             'system_extra':          tuple(se for se in
                                            getattr(opts, 'dist', '').split(',')
@@ -628,8 +1071,31 @@ class _Command(object):
         for driver, handler in io_driver_map:
             driver = () if driver is None else (driver, )
             ec = handler(cmd_ctxt, *driver)
-            if ec != EC.EXIT_SUCCESS:
-                break
+            if ec != EC.EXIT_SUCCESS or cmd_ctxt.get('show_plan'):
+                break  # no postprocessing when just showing the plan
+        # per-filter statistics (to stderr unless to be stored in a file)
+        stats = cmd_ctxt.get('stats')
+        fn = stats is not None and stats.close()
+        if fn:
+            cmd_ctxt['svc_output']("|subheader:stats:| |highlight:{0}|"
+                                   .format(fn),
+                                   prefix_arg=self.__class__.name)
+        # XSLT profiling data aggregated across all the filters involved
+        profile = cmd_ctxt['__filter_context__'].get('profile')
+        if isinstance(profile, XSLTProfile) and profile.atoms:
+            for fn in profile.dump('xslt-profile-{0}-{1}'.format(
+                self.__class__.name, hex(int(time()))[2:]
+            )):
+                cmd_ctxt['svc_output']("|subheader:xslt-profile:|"
+                                       " |highlight:{0}|".format(fn),
+                                       prefix_arg=self.__class__.name)
+        # structured trace shared across all the filters involved
+        trace = cmd_ctxt['__filter_context__'].get('trace')
+        fn = isinstance(trace, XSLTTrace) and trace.close()
+        if fn:
+            cmd_ctxt['svc_output']("|subheader:xslt-trace:|"
+                                   " |highlight:{0}|".format(fn),
+                                   prefix_arg=self.__class__.name)
         return ec
 
     @MimicMeta.classmethod
@@ -756,6 +1222,7 @@ class _Command(object):
                 '_fnc': staticmethod(wrapped),
                 '_fnc_defaults_varnames': (fnc_defaults, fnc_varnames),
                 '_fnc_defaults_raw': fnc_defaults.copy(),  # un-interpolated
+                '_plan_cache': {},  # terminals -> plan, see `execution_plan`
             }
             # optimization: shorten type() -> new() -> probe
             ret = cls.probe(fnc.__name__, (cls, ), attrs)
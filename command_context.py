@@ -19,6 +19,17 @@ class CommandContextError(ClufterError):
     pass
 
 
+class _recording(object):
+    def __init__(self, ctxt):
+        self._ctxt = ctxt
+    def __enter__(self):
+        self.reads = self._ctxt._reads = set()
+        self.messages = self._ctxt._messages = []
+        return self
+    def __exit__(self, *exc):
+        del self._ctxt._reads, self._ctxt._messages
+
+
 class CommandContextBase(TweakedDict):
     """Object representing command context"""
     def __init__(self, initial=None, parent=None, **kwargs):
@@ -79,6 +90,12 @@ class CommandContext(CommandContextBase):
                     ret = obj
                 elif name == 'ctxt_set':
                     ret = lambda self, **kwargs: self.update(kwargs)
+                elif name == 'ctxt_svc_output':
+                    def ret(msg, **kwargs):
+                        messages = self.__dict__.get('_messages')
+                        if messages is not None:
+                            messages.append((msg, kwargs))
+                        obj.ctxt_svc_output(self, msg, **kwargs)
                 elif name.startswith('ctxt_'):
                     # by convention, ctxt_* methods are using second
                     # argument to pass the respective (nested) context
@@ -91,7 +108,8 @@ class CommandContext(CommandContextBase):
                     try:
                         if name.startswith('_'):
                             raise KeyError  # dot=index access not for internals
-                        ret = self.__getitem__(name)
+                        ret = super(wrapped, self).__getitem__(name)
+                        self._record(name)
                     except KeyError:
                         try:
                             ret = super(wrapped, self).__getattribute__(name)
@@ -99,8 +117,27 @@ class CommandContext(CommandContextBase):
                             ret = obj.__getattribute__(name)
                 return ret
 
+            def __getitem__(self, key):
+                self._record(key)  # also when missing, as that matters too
+                return super(wrapped, self).__getitem__(key)
+
             def __setattribute__(self, name, value):
                 obj.__setattribute__(name, value)
+
+            def _record(self, key):
+                reads = self.__dict__.get('_reads')
+                if reads is not None:
+                    reads.add(key)
+
+            def recording(self):
+                """Return context manager collecting what the filter did
+
+                Within, `reads` set of the object returned upon entering
+                grows with the keys the context is accessed with, and
+                `messages` list with the (msg, kwargs) pairs emitted with
+                `ctxt_svc_output` (see `FilterCache`).
+                """
+                return _recording(self)
         return wrapped
 
     def ensure_filter(self, flt):
@@ -9,8 +9,8 @@ from __future__ import print_function
 __author__ = "Jan Pokorný <jpokorny @at@ Red Hat .dot. com>"
 
 from copy import deepcopy
-from functools import reduce
-from itertools import dropwhile, islice
+from functools import partial, reduce
+from itertools import count, dropwhile, islice
 from logging import getLogger
 from os import environ, isatty, stat
 from os.path import dirname, join
@@ -20,6 +20,7 @@ from shutil import rmtree
 from subprocess import CalledProcessError, check_call
 from sys import modules, stderr, __stdin__
 from tempfile import mkdtemp, NamedTemporaryFile
+from threading import local
 from time import time
 from warnings import warn
 try:
@@ -31,7 +32,7 @@ from lxml import etree
 
 from . import package_name
 from .error import ClufterError, ClufterPlainError
-from .format import CompositeFormat, Format, XML
+from .format import CompositeFormat, Format, XML, walk_resolve
 from .plugin_registry import MetaPlugin, PluginRegistry
 from .utils import args2tuple, arg2wrapped, \
                    filterdict_keep, filterdict_invkeep, filterdict_pop, \
@@ -42,8 +43,9 @@ from .utils_2to3 import MimicMeta, basestring, \
                         iter_items, iter_values, \
                         filter_u, foreach_u, reduce_u, \
                         unicode, xrange
-from .utils_lxml import etree_XSLT_safe, \
-                        etree_parser_safe, etree_parser_safe_unblanking
+from .utils_lxml import etree_XSLT_cached, etree_XSLT_safe, \
+                        etree_parser_safe, etree_parser_safe_unblanking, \
+                        etree_standalone
 from .utils_func import apply_preserving_depth, \
                         apply_aggregation_preserving_depth, \
                         apply_intercalate, \
@@ -53,10 +55,13 @@ from .utils_func import apply_preserving_depth, \
 from .utils_prog import FancyOutput, ProtectedDict, \
                         cli_decor, cli_undecor, docformat, which
 from .utils_xml import CLUFTER_NS, XSL_NS, \
-                       namespaced, nselem, squote, element_juggler, \
+                       namespaced, nselem, element_juggler, \
                        xml_get_root_pi, \
                        xmltag_get_namespace, xmltag_get_localname
-from .utils_xslt import xslt_identity
+from .utils_xpath import xpath_clufter_comment, xpath_clufter_descent, \
+                         xpath_pi_named
+from .utils_xslt import XSLTProfile, XSLTTrace, \
+                        xslt_identity, xslt_params_decl, xslt_params_runtime
 from .command_context import CommandContext
 
 try:
@@ -91,6 +96,17 @@ _IMPLIED_TOP_LEVEL_XSL = (
 )
 TOP_LEVEL_XSL = [namespaced(XSL_NS, e) for e in
                  _TOP_LEVEL_XSL + _IMPLIED_TOP_LEVEL_XSL]
+# comments and top-level items + any templates, precompiled (used per snippet)
+xpath_top_level_xsl = etree.ETXPath(
+    "./comment()|" + '|./'.join(TOP_LEVEL_XSL)
+    + '|descendant::' + namespaced(XSL_NS, 'template')
+)
+
+# sparse: XSLT run per (non-mixed) descent, monolithic: single XSLT run
+XSLT_MODES = ('sparse', 'monolithic')
+
+# (snippet, name, parent's key) -> xslt_preprocessed, see _xslt_preprocess
+_xslt_preprocess_memo = {}
 
 
 class FilterError(ClufterError):
@@ -103,7 +119,12 @@ class FilterPlainError(ClufterPlainError, FilterError):
 
 class filters(PluginRegistry):
     """Filter registry (to be used as a metaclass for filters)"""
-    pass
+
+    @classmethod
+    def _manifest_plugin(registry, plugin):
+        """Declared (unresolved) input and output formats of the filter"""
+        return dict(in_format=getattr(plugin, '_in_format', None),
+                    out_format=getattr(plugin, '_out_format', None))
 
 
 class _Filter(object):
@@ -232,9 +253,35 @@ class _Filter(object):
 Filter = MimicMeta('Filter', filters, _Filter)
 
 
-def tag_log(s, elem):
-    """Logging helper"""
-    return s.format(elem.tag, ', '.join(':'.join(i) for i in elem.items()))
+class xslt_preprocessed(tuple):
+    """Memoized `(snippet, hooks, do_mix)` triple from `_xslt_preprocess`
+
+    Attribute `key` identifies how it was derived, so that it can also
+    become a part of the key for the nested (child) triples, and `xslt`
+    is a per-use cache of the stylesheets built from the snippet alone.
+    """
+    def __new__(cls, key, *args):
+        ret = super(xslt_preprocessed, cls).__new__(cls, args)
+        ret.key, ret.xslt = key, {}
+        return ret
+
+    def __deepcopy__(self, memo):
+        # do_mix triple gets edited in place (cleared) upon the first use
+        return xslt_preprocessed(self.key, deepcopy(self[0], memo), *self[1:])
+
+
+class xslt_pending(object):
+    """XSLT application result in the making (parallel mode of proceed_xslt)
+
+    Yields `(result, error_log)` pair once ready, see `get`.
+    """
+    __slots__ = ('async_result', )
+
+    def __init__(self, async_result):
+        self.async_result = async_result
+
+    def get(self):
+        return self.async_result.get()
 
 
 class XMLFilter(Filter, MetaPlugin):
@@ -251,15 +298,27 @@ class XMLFilter(Filter, MetaPlugin):
                        batch=False,
                        editor=EDITOR,
                        raw=False,
-                       _profile=False):
+                       jobs='1',
+                       _nofastpath=False,
+                       _profile=False,
+                       _trace='',
+                       _xslt_mode=XSLT_MODES[0]):
         """\
         {0}
-            nocheck   do not validate any step (even if self-checks present)
-            batch     do not interact (validation failure recovery, etc.)
-            editor    customize editor to run (unused in batch mode)
-            raw       do not care about pretty-printed output
-            _profile  enable XSLT profiling (auxiliary files produced)
+            nocheck     do not validate any step (even if self-checks present)
+            batch       do not interact (validation failure recovery, etc.)
+            editor      customize editor to run (unused in batch mode)
+            raw         do not care about pretty-printed output
+            jobs        number of sibling subtrees/filters to run in parallel
+            _nofastpath apply XSLT even if a native fast path is available
+            _profile    enable XSLT profiling (aggregated report produced)
+            _trace=FILE write structured traversal trace (JSON lines) to FILE
+            _xslt_mode=MODE  how to apply XSLT snippets (sparse, monolithic)
         """
+        try:
+            jobs = int(jobs)
+        except ValueError:
+            raise FilterPlainError("Cannot interpret jobs value: `{0}'", jobs)
         flt_ctxt = cmd_ctxt.filter()
         flt_ctxt.setdefault('validator_specs', {'': ''} if nocheck else {},
                             bypass=True)
@@ -267,15 +326,24 @@ class XMLFilter(Filter, MetaPlugin):
             raw=raw,
             interactive=not(batch and isatty(__stdin__.fileno())),
             editor=editor,
-            profile=_profile,
+            jobs=jobs,
+            nofastpath=_nofastpath,
+            profile=_profile and XSLTProfile(),
+            trace=_trace and XSLTTrace(_trace),
+            xslt_mode=_xslt_mode,
         )
 
     @staticmethod
     def _traverse(in_fmt, walk, et=None,
                   walk_default_first=None, walk_default=None,
                   preprocess=lambda s, n, r: s, proceed=lambda *x: x,
-                  postprocess=lambda x: x[0] if len(x) == 1 else x):
-        """Generic traverse through XML as per symbols within schema tree"""
+                  postprocess=lambda x: x[0] if len(x) == 1 else x,
+                  trace=None):
+        """Generic traverse through XML as per symbols within schema tree
+
+        Optional `trace` is called as `trace(event, **fields)` (see
+        `XSLTTrace`), any cost of tracing is avoided when not passed.
+        """
         default = walk_default_first
         default = default if default is not None else walk_default
 
@@ -292,55 +360,62 @@ class XMLFilter(Filter, MetaPlugin):
             skip_until = [('start', tag) for tag in walk]
         et = et or in_fmt('etree')
 
-        for context in etree.iterwalk(et, events=('start', 'end')):
+        walker = etree.iterwalk(et, events=('start', 'end'))
+        # pruning: subtree of interest neither per se nor for its descendants
+        # is skipped up to its end (natively with lxml 4.0+)
+        skip_subtree = getattr(walker, 'skip_subtree', lambda: None)
+        pruned = None
+        for context in walker:
             event, elem = context
-            log.debug("Got: {0} {1}".format(event, elem.tag))
+            if pruned is not None:
+                if elem is not pruned:
+                    continue
+                pruned = None
             if skip_until and (event, elem.tag) not in skip_until:
                 continue
-            log.debug("Not skipped: {0}".format(elem.tag))
             skip_until = ()  # reset skipping any time we get further
             if event == 'start':
                 # going down
-                log.debug(tag_log("Moving downwards: {0} ({1})", elem))
+                if trace:
+                    trace('enter', tag=elem.tag, depth=len(tree_stack) - 1)
                 if elem.tag in tree_stack[-1][1][1] or default is not None:
-                    if elem.tag not in tree_stack[-1][1][1]:
-                        log.debug("Pushed to use default for `{0}'"
-                                  .format(elem.tag))
+                    use_default = elem.tag not in tree_stack[-1][1][1]
+                    if use_default:
                         previous = tree_stack[-1][1][1].copy()
                         tree_stack[-1][1][1].clear()
                         tree_stack[-1][1][1][elem.tag] = (default, previous)
                     walk_new_sym, walk_new_rest = tree_stack[-1][1][1][elem.tag]
                     default = walk_default  # for the rest under first/root
-                    walk_new_sym = preprocess(walk_new_sym, elem.tag,
-                                              tree_stack[-1][1][0])
+                    # snippet module may only be loaded now (lazy walk)
+                    walk_new_sym = preprocess(walk_resolve(walk_new_sym),
+                                              elem.tag, tree_stack[-1][1][0])
+                    if trace:
+                        trace('snippet', tag=elem.tag, default=use_default,
+                              kind='none' if walk_new_sym is None else
+                                   'callable' if callable(walk_new_sym) else
+                                   'xslt')
                     tree_stack[-1][1][1][elem.tag] = (walk_new_sym, walk_new_rest)
                     tree_stack.append((elem.tag, (walk_new_sym, walk_new_rest), OrderedDict()))
-                    if walk_new_rest is {}:
-                        # safe optimization
-                        skip_until = [('end', elem.tag)]
-                # XXX: optimization prunning, probably no good
-                #else:
-                #    skip_until = [('end', tag) for tag in tree_stack[-1][1][1]]
-                #    skip_until = [('end', elem.tag)]
-                #    log.debug("Skipping (A) until: {0}".format(skip_until))
+                    if not walk_new_rest and default is None:
+                        pruned = elem  # nothing expected underneath
+                elif default is None and (
+                    not tree_stack[-1][1][1]
+                    or next(elem.iter(*tree_stack[-1][1][1]), None) is None
+                ):
+                    pruned = elem  # nothing expected (at any depth) underneath
+                if pruned is not None:
+                    if trace:
+                        trace('prune', tag=elem.tag)
+                    skip_subtree()
 
             else:
                 # going up
-                log.debug(tag_log("Moving upwards: {0} ({1})", elem))
-                log.debug("Expecting {0}".format(elem.tag))
                 if elem.tag == tree_stack[-1][0]:
                     walk, children = tree_stack.pop()[1:3]
                     tree_stack[-1][2][elem] = proceed(walk[0], elem, children)
-                    try:
-                        log.debug("Proceeded {0}".format(
-                                  etree.tostring(tree_stack[-1][2][elem], encoding='unicode').replace('\n', '')))
-                    except AttributeError:
-                        log.debug("Proceeded {0}".format(tree_stack[-1][2][elem]))
+                    if trace:
+                        trace('leave', tag=elem.tag, children=len(children))
 
-                # XXX: optimization prunning, probably no good
-                #else:
-                #    skip_until = [('end', tree_stack[-1][0])]
-                #    log.debug("Skipping (C) until: {0}".format(skip_until))
 
         ret = tuple(iter_values(tree_stack[-1][2]))
         # XXX can be () in case of not finding anything, should we emit error?
@@ -470,8 +545,7 @@ class XMLFilter(Filter, MetaPlugin):
             if ret:
                 # "protected" comments have to be turned to something
                 # else, here a processing instruction
-                cl = ret.xpath("//clufter:comment",
-                               namespaces={'clufter': CLUFTER_NS})
+                cl = xpath_clufter_comment(ret)
                 for e in cl:
                     element_juggler.rebind(etree.PI(pi_comment,
                                                     etree.tostring(e)),
@@ -538,7 +612,7 @@ class XMLFilter(Filter, MetaPlugin):
                     return ret, ()  # validation for the whole block cancelled
                 use_offset = False
 
-            cl = ret.xpath("//processing-instruction('{0}')".format(pi_comment))
+            cl = xpath_pi_named(ret, name=pi_comment)
             for e in cl:
                 # XXX could be done better?  (e.text.strip().join((' ', ) * 2))
                 reverted = etree.fromstring(e.text, parser=etree_parser_safe)
@@ -592,16 +666,6 @@ class XMLFilter(Filter, MetaPlugin):
             if urgent:
                 fatal.append("XSLT: " + entry.message)
         if not fatal:
-            if hasattr(ret, 'xslt_profile') and ret.xslt_profile:
-                profile = etree.tostring(ret.xslt_profile, pretty_print=True)
-                fn = 'xslt-profile-{0}-{1}.xml'.format(cls.name,
-                                                       hex(int(time()))[2:])
-                with open(fn, "a") as f:
-                    f.write(profile)
-                    svc_output("|subheader:xslt-profile:| |highlight:{0}|"
-                               .format(fn))
-                del ret.xslt_profile
-
             if validate_hook:
                 ret, entries = validate_hook(ret)
                 fatal.extend("RNG: " + ':'.join(args2tuple(str(e[0]), str(e[1]),
@@ -626,12 +690,23 @@ class XMLFilter(Filter, MetaPlugin):
         # in top-down manner
         if isinstance(sym, tuple):
             return sym  # already proceeded
+        key = None
         if isinstance(sym, lazystring):
-            sym = str(sym)
+            sym = str(sym)  # may vary per each use, hence not memoized
+        elif isinstance(sym, basestring):
+            if parent is None:
+                key = (sym, name, None)
+            elif isinstance(parent, xslt_preprocessed):
+                key = (sym, name, parent.key)
+            elif parent[1] is None:  # default (root) snippet
+                key = (sym, name, (etree.tostring(parent[0]), parent[2]))
+        if key is not None:
+            ret = _xslt_preprocess_memo.get(key)
+            if ret is not None:
+                return deepcopy(ret) if ret[2] else ret
         if isinstance(sym, basestring):
             log.debug("preprocessing {0}".format(sym))
             # XXX <xsl:output method="xml"
-            # XXX memoize as a constant + deepcopy
             sym = ('<clufter:snippet'
                    ' xmlns:xsl="{0}"'
                    ' xmlns:clufter="{1}">'
@@ -640,7 +715,6 @@ class XMLFilter(Filter, MetaPlugin):
             ret = etree.XML(sym)
             hooks = OrderedDict()
 
-            log.debug("walking {0}".format(etree.tostring(ret)))
             will_mix = 0  # whether any descent-mix observed
             for event, elem in etree.iterwalk(ret, events=('start', )):
                 # XXX xpath/specific tag filter
@@ -651,7 +725,6 @@ class XMLFilter(Filter, MetaPlugin):
                 # not needed
                 #if elem is ret:
                 #    continue
-                log.debug("Got {0}".format(elem.tag))
                 if elem.tag in (namespaced(CLUFTER_NS, t) for t
                                 in ('descent', 'descent-mix')):
                     up = elem
@@ -717,7 +790,11 @@ class XMLFilter(Filter, MetaPlugin):
                     ret.append(deepcopy(e))
 
             log.debug("do_mix {0}, hooks {1}".format(do_mix, hooks))
-            return (ret, hooks, do_mix)
+            if key is None:
+                return (ret, hooks, do_mix)
+            ret = _xslt_preprocess_memo[key] = xslt_preprocessed(key, ret,
+                                                                 hooks, do_mix)
+            return deepcopy(ret) if do_mix else ret
         elif callable(sym):
             return sym
         else:
@@ -733,11 +810,59 @@ class XMLFilter(Filter, MetaPlugin):
         """
         # XXX postprocess: omitted as standard defines the only root element
 
-        def proceed(transformer, elem, children, profile=False):
+        def proceed(transformer, elem, children):
+            if pool is not None:
+                resolve(children)
             # expect (xslt, hooks) in the former case
-            return xslt_atom_hook(*do_proceed(transformer, elem, children, profile)
-                                  if not callable(transformer)
-                                  else transformer(elem, children))
+            ret = (do_proceed(transformer, elem, children)
+                   if not callable(transformer)
+                   else transformer(elem, children))
+            if isinstance(ret, xslt_pending):
+                return ret
+            return xslt_atom_hook(*ret)
+
+        def resolve(results):
+            # in document order, so any side effects of the hook are ordered
+            for k, v in list(iter_items(results)):
+                if isinstance(v, xslt_pending):
+                    results[k] = xslt_atom_hook(*v.get())
+            return results
+
+        def snippet_path(elem):
+            # profiling/tracing label, mirroring the snippet modules hierarchy
+            return '/'.join(xmltag_get_localname(e.tag) for e in
+                            reversed((elem, ) + tuple(elem.iterancestors())))
+
+        def apply_xslt(xslt, elem, snippet=None, source=None):
+            if source is not None:
+                # stylesheet objects are not to be shared (error_log, etc.),
+                # hence compiled per thread from the serialized form
+                compiled = thread_local.__dict__.setdefault('compiled', {})
+                try:
+                    xslt = compiled[xslt]
+                except KeyError:
+                    xslt = compiled[xslt] = \
+                        etree_XSLT_safe(etree.fromstring(source))
+            start = time()
+            try:
+                ret = xslt(elem, profile_run=bool(profile), **xslt_params)
+            except etree.XSLTApplyError as e:
+                if trace:
+                    trace('xslt', snippet=snippet, failed=True,
+                          ms=round((time() - start) * 1000, 3))
+                return None, e.error_log
+            if profile:
+                profile.add(cls.name, snippet, time() - start,
+                            ret.xslt_profile)
+                del ret.xslt_profile
+            if trace:
+                trace('xslt', snippet=snippet, failed=False,
+                      ms=round((time() - start) * 1000, 3))
+            # following seems to carefully preserve space (depending on
+            # xsl:output)
+            #ret = etree.fromstring(str(xslt(elem))).getroottree()
+            #etree.cleanup_namespaces(ret)
+            return ret, xslt.error_log
 
         def _merge_previous(snippet, hooks, elem, children):
             # snippet, an original preprocessed "piece of template puzzle",
@@ -763,9 +888,11 @@ class XMLFilter(Filter, MetaPlugin):
                 parent = tag.getparent()
                 index = parent.index(tag)
 
+                if trace:
+                    trace('merge', tag=elem.tag, at=tag.attrib.get('at', '*'),
+                          mix=mix, substitutes=len(substitutes))
                 for s in substitutes:
                     #assert s.tag == namespaced(CLUFTER_NS, 'snippet')
-                    log.debug("before extension: {0}".format(etree.tostring(s)))
                     if s.tag == namespaced(CLUFTER_NS, 'snippet'):
                         # only single root "detached" supported (first == last)
                         dst = parent
@@ -779,7 +906,6 @@ class XMLFilter(Filter, MetaPlugin):
                     else:
                         # required by obfuscate
                         tag.append(s)
-                    log.debug("as extended contains: {0}".format(etree.tostring(tag)))
 
                 at = tag.attrib.get('at', '*')
                 if mix == 1 and at != '*':  #and elem.getparent() is None:
@@ -790,8 +916,7 @@ class XMLFilter(Filter, MetaPlugin):
                     e.append(nselem(XSL_NS, 'apply-templates', select="@*|node()"))
                     tag.append(e)
 
-            cl = snippet.xpath("//clufter:descent|//clufter:descent-mix",
-                                 namespaces={'clufter': CLUFTER_NS})
+            cl = xpath_clufter_descent(snippet)
             # remove these remnants so cleanup_namespaces works well
             for e in cl:
                 parent = e.getparent()
@@ -799,16 +924,8 @@ class XMLFilter(Filter, MetaPlugin):
                 parent[index:index] = e.getchildren()
                 e.getparent().remove(e)
 
-        def do_proceed(xslt, elem, children, profile=False):
-            # in bottom-up manner
-
+        def build_stylesheet(xslt, elem, children):
             hooks, do_mix = xslt[1:]
-            error_log = ()
-            # something already "mixed", shortcut, if first "mix" copy+clear
-            if not len(xslt[0]):
-                assert do_mix
-                return xslt[0].getroottree(), error_log
-
             snippet = deepcopy(xslt[0])  # for in-situ template manipulation
 
             if do_mix:
@@ -821,11 +938,14 @@ class XMLFilter(Filter, MetaPlugin):
             # move top-level items directly to the stylesheet being built
             if do_mix:
                 xslt_root.text = snippet.text
-            for e in etree.ETXPath(
-                "./comment()|" + '|./'.join(tag
-                                        for tag in TOP_LEVEL_XSL)
-               + '|descendant::' + namespaced(XSL_NS, 'template')
-            )(snippet):
+            named = set()  # named items may come repeatedly through mixing
+            for e in xpath_top_level_xsl(snippet):
+                if e.tag is not etree.Comment and e.get('name') is not None:
+                    e_key = etree.tostring(e, with_tail=False)
+                    if e_key in named:
+                        e.getparent().remove(e)
+                        continue
+                    named.add(e_key)
                 # special case for variable, as it may be needed within template
                 # immediately
                 if xmltag_get_localname(e.tag) == 'variable':
@@ -835,13 +955,11 @@ class XMLFilter(Filter, MetaPlugin):
 
             # if something still remains, we assume it is "template"
             if tuple(islice(dropwhile(lambda x: x.tag in TOP_LEVEL_XSL, snippet), 1)):
-                log.debug("snippet0: {0}, {1}, {2}".format(do_mix, elem.tag, etree.tostring(snippet)))
                 template = nselem(XSL_NS, 'template', match=elem.tag)
                 if do_mix:
                     template.extend(snippet)
                 else:
                     template.append(snippet)
-                log.debug("template1: {0}".format(etree.tostring(template)))
                 #snippet.append(template)
                 ##else:
                 ##    template = snippet
@@ -859,6 +977,33 @@ class XMLFilter(Filter, MetaPlugin):
             #    # we dont't apply if there is nothing local and not at root
             #    print("zdrham", elem.tag)
             #    return elem
+            return xslt_root
+
+        def do_proceed(xslt, elem, children):
+            # in bottom-up manner
+
+            do_mix = xslt[2]
+            error_log = ()
+            # something already "mixed", shortcut, if first "mix" copy+clear
+            if not len(xslt[0]):
+                assert do_mix
+                return xslt[0].getroottree(), error_log
+
+            # stylesheet built from a shared snippet alone can be reused
+            reuse = (isinstance(xslt, xslt_preprocessed) and not do_mix
+                     and not children)
+            xslt_key = (elem.tag, elem.getparent() is None)
+            xslt_root = xslt.xslt.get(xslt_key) if reuse else None
+            if xslt_root is None:
+                xslt_root = build_stylesheet(xslt, elem, children)
+                if reuse:
+                    xslt.xslt[xslt_key] = xslt_root
+            elif trace:
+                trace('reuse', tag=elem.tag)
+
+            if trace:
+                trace('mix', tag=elem.tag, do_mix=do_mix,
+                      deferred=bool(do_mix) and elem.getparent() is not None)
 
             if do_mix and elem.getparent() is not None:
                 # "mix/carry" case in which we postpone this XSLT execution
@@ -867,23 +1012,25 @@ class XMLFilter(Filter, MetaPlugin):
                 ret = etree.ElementTree(xslt_root)
             else:
                 # "eager" case in which we perform the (presumably local)
-                # XSLT execution immediately
+                # XSLT execution immediately (or, for a non-root element in
+                # parallel mode, as soon as possible, at the pool's discretion)
+                parallel = pool is not None and elem.getparent() is not None
+                snippet = snippet_path(elem) if profile or trace else None
+                if parallel:
+                    # as good as "fake root" unless touching the original
+                    elem = deepcopy(elem)
+                    elem.tail = None
                 elem = etree.ElementTree(elem)  # XXX not getroottree?
-                log.debug("Applying {0}, {1}".format(type(elem), etree.tostring(elem)))
-                log.debug("Applying on {0}".format(etree.tostring(xslt_root)))
-                xslt = etree_XSLT_safe(xslt_root)
-                try:
-                    ret = xslt(elem, profile_run=profile)
-                except etree.XSLTApplyError as e:
-                    error_log = e.error_log
-                    ret = None
-                else:
-                    # following seems to carefully preserve space (depending on
-                    # xsl:output)
-                    #ret = etree.fromstring(str(xslt(elem))).getroottree()
-                    log.debug("With result {0}".format(etree.tostring(ret)))
-                    #etree.cleanup_namespaces(ret)
-                    error_log = xslt.error_log
+                xslt = etree_XSLT_cached(xslt_root)
+                if parallel:
+                    try:
+                        source = sources[xslt]
+                    except KeyError:
+                        source = sources[xslt] = etree.tostring(xslt_root)
+                    return xslt_pending(pool.apply_async(
+                        apply_xslt, (xslt, elem, snippet, source)
+                    ))
+                ret, error_log = apply_xslt(xslt, elem, snippet)
             return ret, error_log
 
         def postprocess(ret):
@@ -898,29 +1045,68 @@ class XMLFilter(Filter, MetaPlugin):
                 ret = ret.getroot()[0]
 
             # any "protected" comments are turned into full-fledged ones now
-            cl = ret.xpath("//clufter:comment",
-                           namespaces={'clufter': CLUFTER_NS})
+            cl = xpath_clufter_comment(ret)
             for e in cl:
                 element_juggler.rebind(etree.Comment(e.text),
                                        element_juggler.grab(e))
                 element_juggler.drop(e)
 
-            # XXX: ugly solution to get rid of the unneeded namespace
-            # (cleanup_namespaces did not work here)
-            ret = etree.fromstring(etree.tostring(ret),
-                                   parser=etree_parser_safe)
-            etree.cleanup_namespaces(ret)
-            return ret
+            # get rid of the unneeded namespaces (declared at the snippet)
+            return etree_standalone(ret)
+
+        def traverse_monolithic(in_fmt, walk, et=None, **kwargs):
+            et = et or in_fmt('etree')
+            root = et.getroot() if hasattr(et, 'getroot') else et
+            xslt_root = None
+            if kwargs.get('walk_default') is None:
+                xslt_root = cls._xslt_monolithic(
+                    walk, root, kwargs.get('walk_default_first'), textmode
+                )
+            if xslt_root is None:
+                log.info("`{0}': cannot use monolithic XSLT, falling back to"
+                         " the sparse walk".format(cls.name))
+                return cls._traverse(in_fmt, walk, et=et, **kwargs)
+            log.info("`{0}': using monolithic XSLT".format(cls.name))
+            xslt = etree_XSLT_cached(xslt_root)
+            ret, error_log = apply_xslt(xslt, etree.ElementTree(root),
+                                        snippet_path(root) + '[monolithic]'
+                                        if profile or trace else None)
+            return kwargs.get('postprocess', lambda x: x[0])(
+                (xslt_atom_hook(ret, error_log), )
+            )
 
-        if not kws.pop('textmode', False):
+        xslt_mode = kws.pop('xslt_mode', XSLT_MODES[0])
+        if xslt_mode not in XSLT_MODES:
+            raise FilterError(cls, "Unknown XSLT mode: `{0}'"
+                                   .format(xslt_mode))
+        textmode, profile = kws.pop('textmode', False), kws.pop('profile',
+                                                                False)
+        trace = kws.pop('trace', None)
+        trace = trace and partial(trace, cls.name)
+        xslt_params = kws.pop('xslt_params', {})
+        jobs = kws.pop('jobs', 1)
+        if not textmode:
             kws.setdefault('postprocess', postprocess)
-        if kws.pop('profile', False):
-            kws['proceed'] = (lambda *args, **kwargs:
-                                  proceed(*args, profile=True, **kwargs))
+        pool = None
+        if jobs > 1 and xslt_mode != 'monolithic':
+            from multiprocessing.pool import ThreadPool  # not to slow start
+            pool, thread_local, sources = ThreadPool(jobs), local(), {}
+            # top-level results may be pending as well (e.g. rewritten root)
+            final = kws.get('postprocess', lambda x: x[0] if len(x) == 1 else x)
+            kws['postprocess'] = lambda ret: final(tuple(iter_values(
+                resolve(OrderedDict(enumerate(ret)))
+            )))
         defaults = dict(preprocess=cls._xslt_preprocess, proceed=proceed,
-                        sparse=True)
+                        sparse=True, trace=trace)
+        if xslt_mode == 'monolithic':
+            defaults['traverse'] = traverse_monolithic
         defaults.update(kws)
-        return cls.proceed(in_obj, **defaults)
+        try:
+            return cls.proceed(in_obj, **defaults)
+        finally:
+            if pool is not None:
+                pool.terminate()
+                pool.join()
 
     # XXX missing descent-mix
     @classmethod
@@ -982,34 +1168,270 @@ class XMLFilter(Filter, MetaPlugin):
 
         return (lambda x: x[0] if len(x) == 1 else x)(ret)
 
+    # snippets applied to a detached subtree cannot see beyond that subtree
+    _re_monolithic_outreach = re_compile(
+        r'ancestor::|preceding::|following::|(?:^|[^\w./)\]*@-])/'
+    )
+
+    @classmethod
+    def _xslt_monolithic_attrs(cls, elem):
+        """Whether `elem` is a snippet item contributing only attributes"""
+        localname = xmltag_get_localname(elem.tag)
+        if xmltag_get_namespace(elem.tag) != XSL_NS:
+            return False
+        elif localname in ('attribute', 'message'):
+            return True
+        elif localname == 'copy-of':
+            return elem.attrib.get('select', '').lstrip().startswith('@')
+        elif localname == 'apply-templates':
+            return elem.attrib.get('mode', '').endswith('-attrs')
+        elif localname in ('choose', 'if', 'otherwise', 'when'):
+            return all(cls._xslt_monolithic_attrs(e) for e in elem
+                       if isinstance(e.tag, basestring))
+        return False
+
+    @classmethod
+    def _xslt_monolithic(cls, walk, root, default=None, textmode=False):
+        """Fold the sparse snippets (`walk`) into a single stylesheet
+
+        Each non-mixed descent starts a new scope (what would otherwise be
+        a separate XSLT run on the respective subtree), which is expressed
+        by applying templates in a mode dedicated to that scope.  Mixed
+        children just contribute their templates to the enclosing scope.
+        Attributes that the sparse walk lifts from the result of a descent
+        to the enclosing element are emitted by a companion "-attrs" mode.
+
+        Returns `None` when the snippets tree cannot be expressed this way
+        (callables, explicit descent-mix, snippets reaching beyond their
+        subtree, ...), leaving it up to the caller to use the sparse walk.
+        """
+        if root.tag in walk:
+            sym, children = walk[root.tag]
+            sym = walk_resolve(sym)
+        elif default is not None:
+            sym, children = default, walk
+        else:
+            return None  # sparse walk would start from the first match
+        if sym is None or callable(sym) or (sym is not default
+                                            and 'descent-mix' in str(sym)):
+            return None
+
+        default_sym = etree.XML('<clufter:snippet'
+               ' xmlns:xsl="{0}"'
+               ' xmlns:clufter="{1}">'
+               ' {2}'
+               ' </clufter:snippet>'.format(XSL_NS, CLUFTER_NS, default or ''))
+        xsl_template, xsl_apply_templates = (namespaced(XSL_NS, t) for t in
+                                             ('template', 'apply-templates'))
+        top_level, templates, identity_modes = OrderedDict(), [], []
+        named = {}  # named templates are defined once per each snippet
+        modes = count(1)
+        scopes = [(root.tag,
+                   cls._xslt_preprocess(sym, root.tag, (default_sym, None, 2)),
+                   children, '')]
+        while scopes:
+            tag, (snippet, hooks, do_mix), children, mode = scopes.pop()
+            snippet = deepcopy(snippet)  # for in-situ template manipulation
+            # locate descents prior to any manipulation shifting the indexes
+            descents = [(reduce(lambda x, y: x[y], index_history, snippet),
+                         at, mix)
+                        for at, at_hooks in iter_items(hooks)
+                        for index_history, mix in at_hooks]
+
+            local, scoped = [(snippet, tag, bool(do_mix or mode))], {}
+            for child_tag, (child_sym, grandchildren) in iter_items(children):
+                child_sym = walk_resolve(child_sym)
+                if child_sym is None or callable(child_sym) \
+                        or 'descent-mix' in str(child_sym):
+                    return None
+                elif child_tag in hooks and not hooks[child_tag][0][1]:
+                    if textmode:
+                        return None  # results of scopes merged as text
+                    scoped[child_tag] = (child_sym, grandchildren)
+                    continue
+                elif grandchildren or not hooks.get('*', ((None, 0), ))[0][1]:
+                    return None
+                child = cls._xslt_preprocess(child_sym, child_tag,
+                                             (snippet, hooks, do_mix))
+                if any(not mix for at_hooks in iter_values(child[1])
+                       for _, mix in at_hooks):
+                    return None  # would only apply to the first occurrence
+                child_snippet = deepcopy(child[0])
+                if tuple(islice(child_snippet.iter(xsl_template), 1)):
+                    # templates may match beyond the child, but these are
+                    # only merged when the child occurs in the input
+                    if mode:
+                        return None
+                    elif not tuple(islice(root.iterdescendants(child_tag),
+                                          1)):
+                        continue
+                for e in child_snippet.iter(namespaced(CLUFTER_NS,
+                                                       'descent-mix')):
+                    e.getparent().remove(e)
+                local.append((child_snippet, child_tag, True))
+                do_mix = max(do_mix, child[2])
+
+            for descent, at, mix in descents:
+                if not mix and at in scoped:
+                    child_sym, grandchildren = scoped.pop(at)
+                    child = cls._xslt_preprocess(child_sym, at,
+                                                 (snippet, hooks, do_mix))
+                    child_mode = 'clufter-{0}'.format(next(modes))
+                    scopes.append((at, child, grandchildren, child_mode))
+                    # leading attributes of the descent's result are lifted
+                    # to the enclosing element by the sparse walk
+                    attrs = nselem(XSL_NS, 'template', match=at,
+                                   mode=child_mode + '-attrs')
+                    for e in tuple(child[0]):
+                        if not isinstance(e.tag, basestring) \
+                                or e.tag in TOP_LEVEL_XSL:
+                            continue
+                        elif not cls._xslt_monolithic_attrs(e):
+                            break
+                        attrs.append(deepcopy(e))
+                    if len(attrs) and descent.getparent() is snippet \
+                            and (do_mix or mode):
+                        return None  # would be lifted yet another level up
+                    elif len(attrs):
+                        local.append((attrs, None, None))
+                        descent.getparent().insert(0, nselem(
+                            XSL_NS, 'apply-templates',
+                            select=".//{0}".format(at),
+                            mode=attrs.attrib['mode']
+                        ))
+                    descent.append(nselem(XSL_NS, 'apply-templates',
+                                          select=".//{0}".format(at),
+                                          mode=child_mode))
+                elif not mix and at == '*':
+                    return None
+                # replace the descent with its content (+ children results)
+                parent = descent.getparent()
+                index = parent.index(descent)
+                parent[index:index] = descent.getchildren()
+                parent.remove(descent)
+
+            if do_mix > 1 or mode == '' and (not children or not tuple(
+                    islice(root.iterdescendants(*children), 1))):
+                identity_modes.append(mode)
+
+            for s, match, extend in local:
+                if (mode or match is None) and any(
+                    cls._re_monolithic_outreach.search(v)
+                    for e in s.iter() for v in e.attrib.values()
+                ):
+                    return None
+                elif match is None:  # "-attrs" template, already complete
+                    templates.append(s)
+                    continue
+                elif mode and s is snippet:
+                    # lifted attributes dealt with separately, see above
+                    for e in tuple(s):
+                        if not isinstance(e.tag, basestring) \
+                                or e.tag in TOP_LEVEL_XSL:
+                            continue
+                        elif not cls._xslt_monolithic_attrs(e):
+                            break
+                        s.remove(e)
+                    if any(cls._xslt_monolithic_attrs(e) for e in s
+                           if isinstance(e.tag, basestring)
+                           and e.tag not in TOP_LEVEL_XSL
+                           and xmltag_get_localname(e.tag) != 'message'):
+                        return None  # attributes after the content
+                for e in s.iter(xsl_apply_templates, xsl_template):
+                    if not mode or e.attrib.get('mode', '').startswith(
+                            'clufter-'):
+                        continue  # default mode or descent turned into scope
+                    elif 'mode' in e.attrib:
+                        return None
+                    elif e.tag == xsl_apply_templates or 'match' in e.attrib:
+                        e.attrib['mode'] = mode
+                for e in xpath_top_level_xsl(s):
+                    if not isinstance(e.tag, basestring):
+                        s.remove(e)
+                        continue
+                    elif xmltag_get_localname(e.tag) == 'when':
+                        return None  # only meaningful with descent-mix
+                    elif e.tag == xsl_template:
+                        e.getparent().remove(e)
+                        name = e.attrib.get('name')
+                        if name is None or 'match' in e.attrib:
+                            templates.append(e)
+                        elif name not in named:
+                            named[name] = etree.tostring(e)
+                            templates.append(e)
+                        elif named[name] != etree.tostring(e):
+                            return None  # conflicting redefinition
+                        continue
+                    # special case for variable, as it may be needed within
+                    # template immediately (see `proceed_xslt`)
+                    if xmltag_get_localname(e.tag) == 'variable':
+                        e = deepcopy(e)
+                    else:
+                        e.getparent().remove(e)
+                    key = (e.tag, e.attrib.get('name', etree.tostring(e)))
+                    if key not in top_level:
+                        top_level[key] = e
+                    elif etree.tostring(top_level[key]) != etree.tostring(e):
+                        return None  # conflicting redefinition
+                if tuple(islice(dropwhile(lambda x: x.tag in TOP_LEVEL_XSL,
+                                          s), 1)):
+                    template = nselem(XSL_NS, 'template', match=match)
+                    if mode:
+                        template.attrib['mode'] = mode
+                    if extend:
+                        template.extend(s)
+                    else:
+                        template.append(s)
+                    templates.append(template)
+
+        xslt_root = nselem(XSL_NS, 'stylesheet', version="1.0")
+        xslt_root.extend(iter_values(top_level))
+        xslt_root.extend(templates)
+        for mode in identity_modes:
+            template = etree.XML(xslt_identity(''))
+            if mode:
+                for e in template.iter(xsl_template, xsl_apply_templates):
+                    e.attrib['mode'] = mode
+            xslt_root.append(template)
+        return xslt_root
+
     @classmethod
     def proceed(cls, in_obj, root_dir=None, **kwargs):
         """Push-button to be called from the filter itself"""
         if not root_dir:
             root_dir = dirname(modules[cls.__module__].__file__)
         kwargs.setdefault('symbol', cli_undecor(cls.name))
-        walk = in_obj.walk_schema(root_dir, **filterdict_pop(kwargs,
-                                                             'symbol',
-                                                             'sparse',
-                                                             'xml_root'))
+        walk = in_obj.walk_schema(root_dir, lazy=True,
+                                  **filterdict_pop(kwargs, 'symbol', 'sparse',
+                                                           'xml_root'))
         walk_transform = kwargs.pop('walk_transform', identity)
         walk = walk_transform(walk)
-        return cls._traverse(in_obj, walk, **kwargs)
+        traverse = kwargs.pop('traverse', cls._traverse)
+        return traverse(in_obj, walk, **kwargs)
 
     def filter_proceed_xslt(self, in_obj, **kwargs):
         """Push-button to be called from the filter itself, with walk_default"""
         raw, textmode = kwargs.pop('raw', False), kwargs.get('textmode', False)
+        fastpath = kwargs.pop('fastpath', None)
+        if fastpath is not None and not kwargs.pop('nofastpath', False):
+            # native equivalent of the XSLT snippets, see `deco_xslt`
+            ret = fastpath(deepcopy(in_obj('etree').getroot()))
+            if not raw:
+                ret = etree.fromstring(etree.tostring(ret),
+                                       parser=etree_parser_safe_unblanking)
+            return ret
+        kwargs.pop('nofastpath', None)
         system = kwargs.pop('system', '')
         system_extra = kwargs.pop('system_extra', ())
-        def_first = kwargs.pop('def_first', '') + (
-            '<xsl:param name="system" select="{0}"/>'.format(squote(system))
-        )
+        # params are only declared in the stylesheet, values passed at runtime
+        # (so that a single compiled stylesheet serves any combination)
+        params = dict(kwargs.pop('params', ()), system=system)
         if system:
             # guarantee at least 3 extra params, so they can be relied upon
             for i, val in loose_zip(xrange(1,4), system_extra):
                 val = val if val is not zip_empty else ''
-                def_first += ('<xsl:param name="system_{0}" select="{1}"/>'
-                              .format(str(i), squote(val)))
+                params['system_' + str(i)] = val
+        def_first = kwargs.pop('def_first', '') + xslt_params_decl(*params)
         if textmode:
             def_first += '<xsl:output method="text" encoding="UTF-8"/>'
             def_first += '<xsl:strip-space elements="*"/>'
@@ -1017,14 +1439,40 @@ class XMLFilter(Filter, MetaPlugin):
         else:
             def_first += '<clufter:descent-mix preserve-rest="true"/>'
 
+        # standalone use, otherwise aggregated across the command run
+        standalone = not isinstance(kwargs.get('profile'), XSLTProfile)
+        if standalone and kwargs.get('profile'):
+            kwargs['profile'] = XSLTProfile()
+        standalone_trace = isinstance(kwargs.get('trace'), basestring)
+        if standalone_trace:
+            kwargs['trace'] = kwargs['trace'] and XSLTTrace(kwargs['trace'])
+        svc_output = kwargs.get('svc_output', partial(Filter.ctxt_svc_output,
+                                                      {}))
+
         xslt_atom_hook = self._xslt_get_atom_hook(**filterdict_pop(kwargs,
             'editor', 'interactive', 'svc_output', 'validator_specs'
         ))
 
         kwargs.setdefault('walk_default_first', def_first)
         kwargs['xslt_atom_hook'] = xslt_atom_hook
+        kwargs['xslt_params'] = xslt_params_runtime(**params)
 
-        ret = self.proceed_xslt(in_obj, **kwargs)
+        try:
+            ret = self.proceed_xslt(in_obj, **kwargs)
+        finally:
+            fn = standalone_trace and kwargs['trace']
+            fn = fn and fn.close()
+            if fn:
+                svc_output("|subheader:xslt-trace:| |highlight:{0}|"
+                           .format(fn))
+        if standalone and kwargs.get('profile'):
+            for fn in kwargs['profile'].dump('xslt-profile-{0}-{1}'.format(
+                self.__class__.name, hex(int(time()))[2:]
+            )):
+                svc_output("|subheader:xslt-profile:| |highlight:{0}|"
+                           .format(fn))
+        log.debug("XSLT cache after `{0}': {1}".format(self.__class__.name,
+                                                      etree_XSLT_cached.stats))
         if not raw and not textmode:
             # <http://lxml.de/FAQ.html#
             #  why-doesn-t-the-pretty-print-option-reformat-my-xml-output>
@@ -1038,6 +1486,7 @@ class XMLFilter(Filter, MetaPlugin):
         """The same as `filter_proceed_xslt`, context-aware"""
         kwargs = filterdict_keep(ctxt,
             'profile', 'raw', 'system', 'system_extra',  # <- proceed_xslt
+            'jobs', 'nofastpath', 'trace', 'xslt_mode',
             'editor', 'interactive', 'validator_specs',  # <- atom_hook
             'root_dir', 'walk_transform', 'xml_root',    # <- generic `proceed`
             **kwargs
@@ -1046,7 +1495,15 @@ class XMLFilter(Filter, MetaPlugin):
         return self.filter_proceed_xslt(in_obj, **kwargs)
 
     @classmethod
-    def deco_xslt(cls, in_format, out_format, **kwargs):
+    def deco_xslt(cls, in_format, out_format, fastpath=None, **kwargs):
+        """Decorator as an easy factory of XSLT-driven filters
+
+        Optional `fastpath` is a native (lxml) equivalent of the XSLT
+        snippets, used instead unless `nofastpath` (it is passed a copy
+        of the input root element, which it is free to modify and return).
+        """
+        if fastpath is not None:
+            kwargs['fastpath'] = fastpath
         def deco_cls(new_cls):
             fnc = lambda ctxt, in_obj, **kwargsi: \
                       ('etree', ctxt.ctxt_proceed_xslt(in_obj,
@@ -0,0 +1,198 @@
+# -*- coding: UTF-8 -*-
+# Copyright 2019 Red Hat, Inc.
+# Part of clufter project
+# Licensed under GPLv2+ (a copy included | http://gnu.org/licenses/gpl-2.0.txt)
+"""Persistent content-addressed cache of filter outputs"""
+__author__ = "Jan Pokorný <jpokorny @at@ Red Hat .dot. com>"
+
+import hashlib
+from collections import Mapping
+from json import dump as json_dump, dumps as json_dumps, load as json_load
+from logging import getLogger
+from os import extsep, fdopen, makedirs, rename, stat, utime
+from os.path import dirname, isdir, join
+from sys import modules
+from tempfile import mkstemp
+
+from . import version
+from .filter import XMLFilter
+from .format import XML, SimpleFormat
+from .utils import filterdict_keep
+from .utils_2to3 import bytes_enc
+from .utils_prog import evict_lru, getenv_namespaced
+
+log = getLogger(__name__)
+
+
+class FilterCache(object):
+    """Persistent (on-disk) cache of filter outputs, content-addressed
+
+    Output of the filter is looked up by the name of the filter, version
+    of the package (and the modification time of the filter's module,
+    plus identities of the files of the snippet tree for XML filters),
+    and the `digest` of the input;  as this is not enough to identify
+    the output in general, also the values of the keys from the filter
+    context the filter has actually read (i.e., `system`, `pcscmd_force`,
+    etc.) are recorded with each particular (variant of) output, and
+    these have to match, too, for the output to be reused.  Messages
+    the filter emits along (`ctxt_svc_output`, e.g., warnings stemming
+    from `xsl:message`) are stored with the variant, and replayed when
+    the output is reused.
+
+    Only filters with both input and output being `SimpleFormat` are
+    considered, and only if all the keys read have plain (JSON-able)
+    values (except for the service ones that do not affect the output,
+    see `IGNORED`).  Outputs are stored as bytestrings, and the least
+    recently used ones are evicted once `maxsize` (bytes) is exceeded.
+
+    Beware that the cached outputs may contain sensitive data (such as
+    passwords in cluster.conf), hence it is off unless the directory
+    is explicitly configured (see {PREFIX}_FILTERCACHE env. variable).
+    """
+    IGNORED = frozenset(('svc_output', 'profile', 'trace'))
+
+    def __init__(self, cache_dir, maxsize=64 << 20):
+        self.cache_dir = cache_dir
+        self.maxsize = maxsize
+        self.hits = self.misses = self.evictions = 0
+        self._identities = {}  # (root_dir, xml_root) -> identities
+
+    @classmethod
+    def from_env(cls):
+        """Return instance as per the environment, None if not configured"""
+        cache_dir = getenv_namespaced('FILTERCACHE', '')
+        if not cache_dir:
+            return None
+        try:
+            maxsize = int(getenv_namespaced('FILTERCACHESIZE', 64)) << 20
+        except ValueError:
+            log.warning("Cannot interpret FILTERCACHESIZE value, using default")
+            maxsize = 64 << 20
+        return cls(cache_dir, maxsize)
+
+    @staticmethod
+    def plain(value):
+        """Plain (JSON) representation of the value read from the context"""
+        def default(obj):
+            if isinstance(obj, Mapping):
+                return dict(obj)
+            raise TypeError("not plain: {0}".format(type(obj).__name__))
+        return json_dumps(value, sort_keys=True, default=default)
+
+    def _snippets(self, flt, in_obj, flt_ctxt, module):
+        """Identities of the snippet tree the XML filter is driven by"""
+        if not isinstance(flt, XMLFilter) or not isinstance(in_obj, XML):
+            return None
+        # resolved the same way as in `XMLFilter.proceed`/`XML.walk_schema`
+        root_dir = flt_ctxt.get('root_dir') or dirname(module)
+        xml_root = flt_ctxt.get('xml_root') or in_obj.root
+        ret = self._identities.get((root_dir, xml_root))
+        if ret is None:
+            ret = self._identities[(root_dir, xml_root)] = \
+                XML._walk_schema_identities(root_dir, xml_root)
+        return ret
+
+    def _key(self, flt, in_obj, flt_ctxt):
+        module = getattr(modules.get(flt.__class__.__module__), '__file__', '')
+        try:
+            mtime = str(stat(module).st_mtime)
+        except OSError:
+            mtime = ''
+        key = json_dumps([version, flt.__class__.name, module, mtime,
+                          self._snippets(flt, in_obj, flt_ctxt, module),
+                          in_obj.digest])
+        return hashlib.sha1(bytes_enc(key, 'utf-8')).hexdigest()
+
+    def _load(self, key, flt_ctxt):
+        index_file = join(self.cache_dir, key + extsep + 'json')
+        try:
+            with open(index_file) as f:
+                variants = json_load(f)
+        except (IOError, OSError, ValueError):
+            return None, []
+        for reads, payload, messages in variants:
+            current = {}
+            for k in reads:
+                try:
+                    current[k] = self.plain(flt_ctxt[k])
+                except KeyError:
+                    current[k] = None
+                except TypeError:
+                    break
+            if current != reads:
+                continue
+            payload_file = join(self.cache_dir, payload)
+            try:
+                with open(payload_file, 'rb') as f:
+                    data = f.read()
+                utime(payload_file, None)  # most recently used
+            except (IOError, OSError):
+                continue  # evicted meanwhile
+            return (data, messages), variants
+        return None, variants
+
+    def _store(self, key, variants, reads, messages, data):
+        variant = hashlib.sha1(bytes_enc(json_dumps(reads, sort_keys=True),
+                                         'utf-8')).hexdigest()
+        payload = '{0}-{1}'.format(key, variant)
+        variants = [v for v in variants if v[1] != payload]
+        variants.append([reads, payload, messages])
+        try:
+            if not isdir(self.cache_dir):
+                makedirs(self.cache_dir)
+            for name, mode, content in (
+                (payload, 'wb', lambda f: f.write(data)),
+                (key + extsep + 'json', 'w', lambda f: json_dump(variants, f)),
+            ):
+                fd, tmp = mkstemp(dir=self.cache_dir, suffix=extsep + 'tmp')
+                with fdopen(fd, mode) as f:
+                    content(f)
+                rename(tmp, join(self.cache_dir, name))
+        except (IOError, OSError) as e:
+            log.debug("Filter cache `{0}' not stored: {1}".format(payload, e))
+        else:
+            self.evict()
+
+    def evict(self):
+        """Evict the least recently used entries until within maxsize"""
+        self.evictions += evict_lru(self.cache_dir, self.maxsize)
+
+    def __call__(self, flt, in_obj, flt_ctxt):
+        """Run the filter unless its output is cached already"""
+        if not isinstance(in_obj, SimpleFormat):
+            return flt(in_obj, flt_ctxt)
+        key = self._key(flt, in_obj, flt_ctxt)
+        hit, variants = self._load(key, flt_ctxt)
+        if hit is not None:
+            self.hits += 1
+            log.info("Filter cache hit for `{0}'".format(flt.__class__.name))
+            data, messages = hit
+            for msg, kwargs in messages:
+                flt_ctxt.ctxt_svc_output(msg, **kwargs)
+            fmt_kws = filterdict_keep(flt_ctxt, *flt.out_format.context)
+            fmt_kws['validator_specs'] = {'': ''}  # validated when stored
+            return flt.out_format('bytestring', data, **fmt_kws)
+        self.misses += 1
+        with flt_ctxt.recording() as recorded:
+            ret = flt(in_obj, flt_ctxt)
+        if isinstance(ret, SimpleFormat):
+            try:
+                reads = {}
+                for k in recorded.reads.difference(self.IGNORED):
+                    try:
+                        reads[k] = self.plain(flt_ctxt[k])
+                    except KeyError:
+                        reads[k] = None
+                self.plain(recorded.messages)
+            except TypeError as e:
+                log.debug("Filter cache: `{0}' output not stored: {1}"
+                          .format(flt.__class__.name, e))
+            else:
+                self._store(key, variants, reads, recorded.messages,
+                            bytes_enc(ret.BYTESTRING(), 'utf-8'))
+        return ret
+
+    @property
+    def stats(self):
+        return dict(hits=self.hits, misses=self.misses,
+                    evictions=self.evictions, maxsize=self.maxsize)
@@ -0,0 +1,310 @@
+# -*- coding: UTF-8 -*-
+# Copyright 2019 Red Hat, Inc.
+# Part of clufter project
+# Licensed under GPLv2+ (a copy included | http://gnu.org/licenses/gpl-2.0.txt)
+"""Per-filter timing and memory statistics/profiling of a command run"""
+__author__ = "Jan Pokorný <jpokorny @at@ Red Hat .dot. com>"
+
+from json import dumps
+from logging import getLogger
+from os.path import getsize, isfile
+from sys import stderr
+from threading import Lock
+from time import time
+from weakref import ref
+try:
+    from time import thread_time as cpu_time
+except ImportError:  # PY2 (process-wide on Unix, exact with jobs=1 only)
+    from time import clock as cpu_time
+
+try:
+    from collections import OrderedDict
+except ImportError:
+    from ordereddict import OrderedDict
+
+from lxml import etree
+
+from .format import CompositeFormat, Nothing, validation_time
+from .utils_2to3 import basestring, bytes_enc, iter_items, iter_values
+
+log = getLogger(__name__)
+
+
+def _tracemalloc():
+    """Import tracemalloc on demand (startup), None if unavailable (PY2)"""
+    try:
+        import tracemalloc
+    except ImportError:
+        return None
+    return tracemalloc
+
+
+def _data_size(protocol, data):
+    if protocol == 'file':
+        if isinstance(data, basestring) and isfile(data):
+            return getsize(data)
+    elif isinstance(data, (bytes, basestring)):
+        return len(bytes_enc(data, 'utf-8'))
+    elif isinstance(data, (etree._ElementTree, etree._Element)):
+        return len(etree.tostring(data))
+    elif isinstance(data, (list, tuple, set, frozenset)) \
+            and all(isinstance(i, (bytes, basestring)) for i in data):
+        return sum(len(bytes_enc(i, 'utf-8')) for i in data)
+    return None
+
+
+def representation_size(fmt):
+    """Size (bytes) of the format instance once serialized, None if unknown
+
+    Only the representations at hand are considered, producing new ones
+    would affect the measurements (incl. the subsequent filters); this
+    leaves out the lazily produced streams (e.g., `bytestringiter').
+    """
+    if isinstance(fmt, Nothing):
+        return 0
+    if isinstance(fmt, CompositeFormat):
+        sizes = [representation_size(f) for f in fmt]
+        return None if None in sizes else sum(sizes)
+    representations = getattr(fmt, 'representations', {})
+    for protocol, args in sorted(iter_items(representations),
+                                 key=lambda x: x[0] != 'bytestring'):
+        size = _data_size(protocol, args[0] if len(args) == 1 else None)
+        if size is not None:
+            return size
+    return None
+
+
+class FilterStats(object):
+    """Statistics of the filters run within a command (see --stats)
+
+    For each filter, wall-clock and CPU time of its run is recorded,
+    together with the peak of memory allocated meanwhile (tracemalloc,
+    hence PY3 only; prior to Python 3.9, the peak is reset by clearing
+    the traces; tracing the allocations also slows the run down), sizes
+    of the input and output (as serialized, the terminal outputs once
+    written out), time to construct its input format and time spent
+    validating formats (input and output ones alike).  What cannot be
+    measured is reported as `n/a'.
+
+    Note that with jobs > 1, the filters are run concurrently, hence
+    the memory peaks may reflect other filters as well, same for CPU
+    time with PY2 (only process-wide figure available).
+    """
+    def __init__(self, filename=None):
+        self._lock = Lock()
+        self._filters = OrderedDict()  # name -> record, first-seen order
+        self._filename = filename
+        self._lazy = {}  # id -> (weakref, name) of outputs yet to be sized
+        tracemalloc = self._tracemalloc = _tracemalloc()
+        self.memory = self._tracing = (tracemalloc is not None
+                                       and not tracemalloc.is_tracing())
+        if self._tracing:
+            tracemalloc.start()
+
+    def _record(self, name):
+        with self._lock:
+            return self._filters.setdefault(name, OrderedDict((
+                ('filter', name), ('runs', 0), ('wall', 0.0), ('cpu', 0.0),
+                ('peak', None), ('in', None), ('out', None),
+                ('construct', 0.0), ('validate', 0.0),
+            )))
+
+    def _measured(self, name, fields, fnc, *args, **kwargs):
+        # fields: where to add wall (and CPU) time to, peak along the latter
+        outer = getattr(validation_time, 'total', None)
+        validation_time.total = 0.0
+        tracemalloc = self._tracemalloc
+        if self._tracing:
+            if hasattr(tracemalloc, 'reset_peak'):
+                tracemalloc.reset_peak()
+            else:  # Python < 3.9, also resets the traced memory
+                tracemalloc.clear_traces()
+            mem_start = tracemalloc.get_traced_memory()[0]
+        wall_start, cpu_start = time(), cpu_time()
+        try:
+            return fnc(*args, **kwargs)
+        finally:
+            wall, cpu = time() - wall_start, cpu_time() - cpu_start
+            peak = (tracemalloc.get_traced_memory()[1] - mem_start
+                    if self._tracing else None)
+            validated = validation_time.total
+            if outer is None:
+                del validation_time.total
+            else:
+                validation_time.total = outer + validated
+            record = self._record(name)
+            with self._lock:
+                for field, value in zip(fields, (wall, cpu)):
+                    record[field] += value * 1000
+                if peak is not None and len(fields) > 1:
+                    record['peak'] = max(record['peak'] or 0, peak)
+                record['validate'] += validated * 1000
+
+    def instantiate(self, flt, *args, **kwargs):
+        """Construct the input format instance for the filter, measured"""
+        ret = self._measured(flt.__class__.name, ('construct', ),
+                             flt.in_format.as_instance, *args, **kwargs)
+        # converted instance stands for the (not yet sized) original
+        outs = (list(ret) if len(args) > 1 and isinstance(ret, CompositeFormat)
+                else [ret])
+        with self._lock:
+            for obj, new in zip(args, outs):
+                lazy = self._lazy.pop(id(obj), None)
+                if lazy is not None and lazy[0]() is obj:
+                    self._lazy[id(new)] = ref(new), lazy[1]
+        return ret
+
+    def run(self, runner, flt, in_obj, flt_ctxt):
+        """Run the filter (by the means of `runner`), measured"""
+        name = flt.__class__.name
+        ret = self._measured(name, ('wall', 'cpu'),
+                             runner, flt, in_obj, flt_ctxt)
+        record = self._record(name)
+        sizes = representation_size(in_obj), representation_size(ret)
+        ins = list(in_obj) if isinstance(in_obj, CompositeFormat) else []
+        with self._lock:
+            record['runs'] += 1
+            record['in'], record['out'] = sizes
+            if sizes[1] is None:
+                self._lazy[id(ret)] = ref(ret), name
+            # streams get sized once materialized by the consumer, if ever
+            for obj in [in_obj] + ins:
+                lazy = self._lazy.pop(id(obj), None)
+                if lazy is not None and lazy[0]() is obj:
+                    self._filters[lazy[1]]['out'] = representation_size(obj)
+        return ret
+
+    def output(self, flt, out_obj, protocol, produced):
+        """Record the size of the terminal output once written out"""
+        size = representation_size(out_obj)
+        if size is None:
+            size = _data_size(protocol, produced)
+        if size is not None:
+            record = self._record(flt.__class__.name)
+            with self._lock:
+                record['out'] = size
+
+    def as_dict(self):
+        """Report as a dict (JSON-friendly, time in ms, sizes in bytes)"""
+        with self._lock:
+            filters = [dict(r) for r in iter_values(self._filters)]
+        return dict(
+            filters=filters,
+            wall=sum(f['wall'] for f in filters),
+            cpu=sum(f['cpu'] for f in filters),
+            construct=sum(f['construct'] for f in filters),
+            validate=sum(f['validate'] for f in filters),
+            memory=self.memory,
+        )
+
+    def as_json(self):
+        return dumps(self.as_dict(), indent=2, separators=(',', ': '),
+                     sort_keys=True)
+
+    def as_text(self):
+        d = self.as_dict()
+        row = ("{0:>10} {1:>10} {2:>10} {3:>10} {4:>10} {5:>10} {6:>10}"
+               "  {7}").format
+        ms = lambda x: "{0:.2f}".format(x)
+        kib = lambda x: 'n/a' if x is None else "{0:.1f}".format(x / 1024.0)
+        ret = ["Filter stats: {0} filters, {1} ms wall, {2} ms CPU total"
+               " (construct {3} ms, validate {4} ms)".format(
+                   len(d['filters']), ms(d['wall']), ms(d['cpu']),
+                   ms(d['construct']), ms(d['validate'])),
+               '', row("wall [ms]", "CPU [ms]", "constr.", "valid.",
+                       "peak [KiB]", "in [KiB]", "out [KiB]", "filter")]
+        ret.extend(row(ms(f['wall']), ms(f['cpu']), ms(f['construct']),
+                       ms(f['validate']), kib(f['peak']), kib(f['in']),
+                       kib(f['out']), f['filter']
+                       + (" (x{0})".format(f['runs']) if f['runs'] > 1
+                          else ''))
+                   for f in d['filters'])
+        if not d['memory']:
+            ret.append("(peak n/a: memory tracing unavailable (PY2)"
+                       " or already in use)")
+        if any(f['in'] is None or f['out'] is None for f in d['filters']):
+            ret.append("(in/out n/a: lazily produced stream, not materialized)")
+        return '\n'.join(ret) + '\n'
+
+    def close(self):
+        """Finish (incl. memory tracing), write the report (JSON if *.json)
+
+        Returns the file name when written to a file (stderr otherwise).
+        """
+        if self._tracing:
+            self._tracemalloc.stop()
+            self._tracing = False
+        if not self._filename:
+            stderr.write(self.as_text())
+            return None
+        with open(self._filename, 'w') as f:
+            f.write(self.as_json() if self._filename.endswith('.json')
+                    else self.as_text())
+        return self._filename
+
+
+class FilterProfile(object):
+    """cProfile (and optionally tracemalloc) scoped to the selected filters
+
+    Only the run of the filter as such is profiled (in the thread it runs
+    in, i.e., not the sibling subtrees transformed in parallel with jobs
+    > 1), and it is never served from the filter cache.  The results are
+    stored as `profile-<filter>-<input hash>-<timestamp>.pstats' (see
+    `pstats' module) and, with `memory', `<ditto>.tracemalloc' snapshot
+    of the allocations still alive at the end of the run (to be loaded
+    with `tracemalloc.Snapshot.load').
+    """
+    def __init__(self, filters, memory=False):
+        self._filters = frozenset(filters)
+        from cProfile import Profile  # on demand (startup)
+        self._profile = Profile
+        tracemalloc = self._tracemalloc = _tracemalloc()
+        self._memory = memory and tracemalloc is not None
+        if memory and not self._memory:
+            log.warning("Cannot profile memory without tracemalloc (PY2)")
+        self._lock = Lock()
+        self._tracing = 0  # number of runs relying on our tracing
+        self._tstmp = hex(int(time()))[2:]
+
+    def selected(self, flt):
+        return 'ANY' in self._filters or flt.__class__.name in self._filters
+
+    def _trace_start(self):
+        tracemalloc = self._tracemalloc
+        with self._lock:
+            if self._tracing or not tracemalloc.is_tracing():
+                if not self._tracing:
+                    tracemalloc.start()
+                self._tracing += 1
+                return True
+        return False
+
+    def _trace_stop(self):
+        with self._lock:
+            self._tracing -= 1
+            if not self._tracing:
+                self._tracemalloc.stop()
+
+    def run(self, runner, flt, in_obj, flt_ctxt):
+        """Run the filter (by the means of `runner' unless selected)"""
+        if not self.selected(flt):
+            return runner(flt, in_obj, flt_ctxt)
+        prefix = 'profile-{0}-{1}-{2}'.format(flt.__class__.name, in_obj.hash,
+                                              self._tstmp)
+        tracing = self._memory and self._trace_start()
+        profile = self._profile()
+        try:
+            ret = profile.runcall(flt, in_obj, flt_ctxt)
+            snapshot = self._memory and self._tracemalloc.take_snapshot()
+        finally:
+            if tracing:
+                self._trace_stop()
+        fns = [prefix + '.pstats']
+        profile.dump_stats(fns[0])
+        if snapshot:
+            fns.append(prefix + '.tracemalloc')
+            snapshot.dump(fns[1])
+        for fn in fns:
+            flt_ctxt.ctxt_svc_output("|subheader:profile:| |highlight:{0}|"
+                                     .format(fn))
+        return ret
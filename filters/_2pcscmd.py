@@ -11,6 +11,7 @@ from hashlib import sha256
 from os import getpid
 from time import time
 
+from ..utils import volatilestring
 from ..utils_2to3 import bytes_enc, str_enc
 from ..utils_prog import getenv_namespaced
 from ..utils_xslt import NL
@@ -26,25 +27,39 @@ ec_test = "{0}{1}:{1}".format(
     NL
 )
 
-verbose_ec_test = '''\
-    <xsl:if test="$pcscmd_verbose">
-        <xsl:value-of select='"%(ec_test)s"'/>
-    </xsl:if>
+# named templates to be defined once per stylesheet (see `def_first' of
+# the respective filters) and called wherever needed, via following items
+verbose_templates = '''\
+    <xsl:template name="pcscmd_verbose_ec_test">
+        <xsl:if test="$pcscmd_verbose">
+            <xsl:value-of select='"%(ec_test)s"'/>
+        </xsl:if>
+    </xsl:template>
+    <xsl:template name="pcscmd_verbose_inform">
+        <xsl:param name="what"/>
+        <xsl:if test="$pcscmd_verbose">
+            <xsl:value-of select='concat("echo &apos;%(verbose_prefix)s",
+                                         $what,
+                                         "&apos;%(NL)s")'/>
+        </xsl:if>
+    </xsl:template>
 ''' % dict(
-    ec_test=ec_test
+    ec_test=ec_test,
+    verbose_prefix=verbose_prefix or '""',
+    NL=NL,
 )
 
+verbose_ec_test = '''\
+    <xsl:call-template name="pcscmd_verbose_ec_test"/>
+'''
+
 def verbose_inform(what):
     return '''\
-    <xsl:if test="$pcscmd_verbose">
-        <xsl:value-of select='concat("echo &apos;%(verbose_prefix)s",
-                                     %(what)s,
-                                     "&apos;%(NL)s")'/>
-    </xsl:if>
+    <xsl:call-template name="pcscmd_verbose_inform">
+        <xsl:with-param name="what" select='concat("", %(what)s)'/>
+    </xsl:call-template>
 ''' % dict(
     what=what or '""',
-    verbose_prefix=verbose_prefix or '""',
-    NL=NL,
 )
 
 
@@ -53,7 +68,8 @@ def coro2pcscmd(**kwargs):
         '<clufter:descent-mix at="{what}"/>'.format(
             what=kwargs.get(w) or w
         ) if w in kwargs else ''
-    return ('''\
+    # salted (see `randomized'), hence may differ per each run
+    return volatilestring(('''\
     <xsl:variable name="ClusterName">
         <xsl:choose>
             <xsl:when test="string(@name|totem/@cluster_name)">
@@ -173,4 +189,4 @@ def coro2pcscmd(**kwargs):
     ),
     **dict(('descent_' + k, descent(k))
            for k in ('cman', 'node', 'quorum', 'totem'))
-)
+))
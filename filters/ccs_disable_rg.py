@@ -8,8 +8,18 @@ __author__ = "Jan Pokorný <jpokorny @at@ Red Hat .dot. com>"
 from ..filter import XMLFilter
 
 
+def ccs_disable_rg_fastpath(root):
+    # as with the XSLT snippet, rm is emitted anew with only disabled="1"
+    for rm in root.iterchildren('rm'):
+        tail = rm.tail
+        rm.clear()
+        rm.set('disabled', '1')
+        rm.tail = tail
+    return root
+
+
 # avoid accidental start of rgmanager, see bz#723925;
 # only rm tag already present as only then there is a chance
 # of having RGManager + service set to start on boot
-@XMLFilter.deco_xslt('ccs', 'ccs')
+@XMLFilter.deco_xslt('ccs', 'ccs', fastpath=ccs_disable_rg_fastpath)
 class ccs_disable_rg: pass
@@ -5,8 +5,19 @@
 """Filter to bump a configuration version in cluster.conf"""
 __author__ = "Jan Pokorný <jpokorny @at@ Red Hat .dot. com>"
 
+from lxml import etree
+
 from ..filter import XMLFilter
 
+# XPath arithmetics/formatting so as to match the XSLT snippet exactly
+_version_bumped = etree.XPath('string(@config_version + 1)')
+
+
+def ccs_version_bump_fastpath(root):
+    if root.get('config_version') is not None:
+        root.set('config_version', _version_bumped(root))
+    return root
+
 
-@XMLFilter.deco_xslt('ccs', 'ccs')
+@XMLFilter.deco_xslt('ccs', 'ccs', fastpath=ccs_version_bump_fastpath)
 class ccs_version_bump: pass
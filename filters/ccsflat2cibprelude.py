@@ -7,7 +7,6 @@ __author__ = "Jan Pokorný <jpokorny @at@ Red Hat .dot. com>"
 
 from ..facts import cluster_pcs_flatiron, component_or_state, package, system
 from ..filter import XMLFilter
-from ..utils_xslt import xslt_params
 
 from os.path import join
 
@@ -21,7 +20,7 @@ def ccsflat2cibprelude(flt_ctxt, in_obj):
         'etree',
         flt_ctxt.ctxt_proceed_xslt(
             in_obj,
-            def_first=xslt_params(
+            params=dict(
                 pcscmd_cman=cluster_pcs_flatiron(*sys_pair),
                 pcscmd_init_sys=system('init-sys', *sys_pair),
                 pcscmd_tomcat_catalina_home=join(
@@ -7,7 +7,7 @@ __author__ = "Jan Pokorný <jpokorny @at@ Red Hat .dot. com>"
 
 from ..facts import infer
 from ..filter import XMLFilter
-from ..utils_xslt import xslt_params
+from ..filters._2pcscmd import verbose_templates
 
 
 @XMLFilter.deco('ccs', 'string-list', defs=dict(
@@ -26,7 +26,8 @@ def ccspcmk2pcscmd(flt_ctxt, in_obj):
         flt_ctxt.ctxt_proceed_xslt(
             in_obj,
             textmode=True,
-            def_first=xslt_params(
+            def_first=verbose_templates,
+            params=dict(
                 pcscmd_force=flt_ctxt['pcscmd_force'],
                 pcscmd_noauth=flt_ctxt['pcscmd_noauth'],
                 pcscmd_verbose=flt_ctxt['pcscmd_verbose'],
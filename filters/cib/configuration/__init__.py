@@ -16,6 +16,25 @@ cibprelude2cibcompact = '''\
 from .... import package_name
 
 cibcompact2cib = ('''\
+    <!-- lookup tables for deriving the constraints (see below) -->
+    <xsl:key name="cib-resource"
+             match="resources/*"
+             use="@id"/>
+    <xsl:key name="cib-domain-service"
+             match="resources/template[
+                        @provider = '%(package_name)s'
+                        and
+                        @type = 'temporary-service'
+                    ]"
+             use="meta_attributes/nvpair[
+                      @name = 'domain'
+                  ]/@value"/>
+    <xsl:key name="cib-service-primitive"
+             match="resources/primitive"
+             use="meta_attributes/nvpair[
+                      @name = 'rgmanager-service'
+                  ]/@value"/>
+
     <xsl:template match="crm_config[
                              not(
                                  following-sibling::resources/primitive[
@@ -48,28 +67,16 @@ cibcompact2cib = ('''\
                                       @type = 'temporary-failoverdomain'
                                   ]">
                 <xsl:variable name="FailoverDomain" select="."/>
-                <xsl:for-each select="../template[
-                                        @provider = '%(package_name)s'
-                                        and
-                                        @type = 'temporary-service'
-                                        and
-                                        meta_attributes/nvpair[
-                                            @name = 'domain'
-                                        ]/@value = $FailoverDomain/@id
-                                    ]">
+                <xsl:for-each select="key('cib-domain-service',
+                                          $FailoverDomain/@id)">
                     <xsl:variable name="Service" select="."/>
                     <xsl:variable name="Resources"
-                                  select="../primitive[
-                                              meta_attributes/nvpair[
-                                                  @name = 'rgmanager-service'
-                                                  and
-                                                  @value = $Service/@id
-                                              ]
-                                          ]
+                                  select="key('cib-service-primitive',
+                                              $Service/@id)
                                           |
-                                          ../group[
-                                            @id = concat($Service/@id, '-GROUP')
-                                          ]"/>
+                                          key('cib-resource',
+                                              concat($Service/@id, '-GROUP')
+                                          )[self::group]"/>
                     <xsl:for-each select="$Resources">
                         <xsl:variable name="Resource" select="."/>
 
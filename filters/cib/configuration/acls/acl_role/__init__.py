@@ -17,6 +17,11 @@ cib2pcscmd_id_whitelist = (
 )
 
 cib2pcscmd = ('''\
+    <!-- index of identified elements (referenced in ACL permissions) -->
+    <xsl:key name="cib-id"
+             match="*"
+             use="@id"/>
+
     <!-- "pcs acl" only supported with certain newer versions of
          pacemaker/pcs (https://bugzilla.redhat.com/1111369) -->
     <xsl:choose>
@@ -37,7 +42,7 @@ cib2pcscmd = ('''\
                         <xsl:value-of select='concat(" xpath &apos;", @xpath, "&apos;")'/>
                     </xsl:when>
                     <xsl:when test="@reference">
-                        <xsl:variable name="CibAclReferenced" select="//*[@id = current()/@reference]"/>
+                        <xsl:variable name="CibAclReferenced" select="key('cib-id', @reference)"/>
                         <xsl:choose>
                             <xsl:when test="
 ''' + (
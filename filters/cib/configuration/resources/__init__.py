@@ -10,32 +10,49 @@ from .... import package_name
 from ....utils_xslt import xslt_is_member
 
 cibprelude2cibcompact = ('''\
+    <!--
+        INDEXES (cross-references resolved in constant time, otherwise
+        it would be quadratic in the number of resources)
+     -->
+
+    <xsl:key name="cib-resource"
+             match="resources/*"
+             use="@id"/>
+    <xsl:key name="cib-template-primitive"
+             match="resources/primitive"
+             use="@template"/>
+    <xsl:key name="cib-service-primitive"
+             match="resources/primitive"
+             use="meta_attributes/nvpair[
+                      @name = 'rgmanager-service'
+                  ]/@value"/>
+
     <!--
         SIMPLIFY FENCING/STONITH
      -->
 
-    <xsl:template match="primitive[
-                             @template
-                             =
-                             preceding-sibling::template[
+    <xsl:template match="resources/primitive[
+                             key('cib-resource', @template)[
+                                self::template
+                                and
                                 @class = 'stonith'
-                             ]/@id
-                             and not(preceding-sibling::primitive[
-                                @template = current()/@template
-                             ])
+                             ]
+                             and
+                             generate-id()
+                             =
+                             generate-id(
+                                key('cib-template-primitive', @template)[1]
+                             )
                          ]">
         <xsl:variable name="Primitives"
-                      select="(following-sibling::primitive|self::primitive)[
-                                  @template = current()/@template
-                              ]"/>
+                      select="key('cib-template-primitive', @template)"/>
         <xsl:variable name="Template"
-                      select="preceding-sibling::template[
-                                 @id = current()/@template
+                      select="key('cib-resource', @template)[
+                                 self::template
                               ]"/>
         <xsl:variable name="GroupablePrimitives"
-                      select="(following-sibling::primitive|self::primitive)[
-                                  @template = current()/@template
-                                  and not(*[name() != 'instance_attributes'])
+                      select="$Primitives[
+                                  not(*[name() != 'instance_attributes'])
                                   and not(instance_attributes/nvpair[
                                       @name != 'pcmk_host_list'
                                       and
@@ -116,13 +133,9 @@ cibprelude2cibcompact = ('''\
             </xsl:when>
             <xsl:otherwise>
                 <xsl:if test="count($Primitives) != count($GroupablePrimitives)">
-                    <xsl:copy-of select="preceding-sibling::template[
+                    <xsl:copy-of select="$Template[
                                              @class = 'stonith'
-                                             and
-                                             @id = current()/@template
-                                         ]|(following-sibling::primitive|self::primitive)[
-                                             @template = current()/@template
-                                         ]"/>
+                                         ]|$Primitives"/>
                 </xsl:if>
             </xsl:otherwise>
         </xsl:choose>
@@ -130,15 +143,18 @@ cibprelude2cibcompact = ('''\
 
     <!-- remove non-first instances of fence devices, of which all are
          removed unconditionally (preserved in the above logic when needed) -->
-    <xsl:template match="primitive[
-                             @template
-                             =
-                             preceding-sibling::template[
+    <xsl:template match="resources/primitive[
+                             key('cib-resource', @template)[
+                                self::template
+                                and
                                 @class = 'stonith'
-                             ]/@id
-                             and preceding-sibling::primitive[
-                                @template = current()/@template
                              ]
+                             and
+                             generate-id()
+                             !=
+                             generate-id(
+                                key('cib-template-primitive', @template)[1]
+                             )
                          ]"/>
     <xsl:template match="template[@class = 'stonith']"/>
 
@@ -166,13 +182,8 @@ cibprelude2cibcompact = ('''\
                              )
                           ]">
         <xsl:variable name="ResourceGroup" select="@id"/>
-        <xsl:variable name="Resources" select="../primitive[
-                                                  meta_attributes/nvpair[
-                                                      @name = 'rgmanager-service'
-                                                      and
-                                                      @value = $ResourceGroup
-                                                  ]
-                                               ]"/>
+        <xsl:variable name="Resources"
+                      select="key('cib-service-primitive', $ResourceGroup)"/>
         <xsl:if test="$Resources">
             <group id="{$ResourceGroup}-GROUP">
                 <xsl:for-each select="$Resources">
@@ -219,14 +230,16 @@ cibprelude2cibcompact = ('''\
                     stickiness=INFINITY for each N in dedicated nodes ~ @nofailback
                 -->
                 <xsl:variable name="FailoverDomain"
-                            select="../template[
+                            select="key('cib-resource',
+                                        meta_attributes/nvpair[
+                                            @name = 'domain'
+                                        ]/@value
+                                    )[
+                                    self::template
+                                    and
                                     @provider = '%(package_name)s'
                                     and
                                     @type = 'temporary-failoverdomain'
-                                    and
-                                    @id = current()/meta_attributes/nvpair[
-                                        @name = 'domain'
-                                    ]/@value
                                 ]"/>
                 <xsl:if test="$FailoverDomain/meta_attributes/nvpair[
                                 @name = 'nofailback'
@@ -360,27 +373,29 @@ cibprelude2cibcompact = ('''\
     </xsl:template>
 
     <!-- also remove the primitive(s) now moved to the group(s) -->
-    <xsl:template match="primitive[
-                            meta_attributes/nvpair[
-                                @name = 'rgmanager-service'
+    <xsl:template match="resources/primitive[
+                            key('cib-resource',
+                                meta_attributes/nvpair[
+                                    @name = 'rgmanager-service'
+                                ]/@value
+                            )[
+                                self::template
                                 and
-                                @value = current()/../template[
-                                    @provider = '%(package_name)s'
-                                    and
-                                    @type = 'temporary-service'
-                                    and
-                                    not(
-                                        meta_attributes/nvpair[
-                                            @name = 'exclusive'
-                                            and
-                                            (
-                                               @value = 'yes'
-                                               or
-                                               @value &gt; 0
-                                           )
-                                        ]
-                                    )
-                                ]/@id
+                                @provider = '%(package_name)s'
+                                and
+                                @type = 'temporary-service'
+                                and
+                                not(
+                                    meta_attributes/nvpair[
+                                        @name = 'exclusive'
+                                        and
+                                        (
+                                           @value = 'yes'
+                                           or
+                                           @value &gt; 0
+                                       )
+                                    ]
+                                )
                             ]
                          ]"/>
 
@@ -605,6 +620,10 @@ cib_meld_templates_op_roles = ('Started', 'Slave')
 
 # see lib/pengine/complex.c: unpack_template
 cib_meld_templates = ('''\
+    <xsl:key name="cib-template"
+             match="template"
+             use="@id"/>
+
     <!-- drop any occurrence as we meld them into proper primitives -->
     <xsl:template match="template[1]">
         <xsl:message
@@ -639,7 +658,7 @@ cib_meld_templates = ('''\
 
     <xsl:template match="primitive[@template]">
         <xsl:variable name="Template"
-                      select="//template[@id = current()/@template]"/>
+                      select="key('cib-template', @template)"/>
         <xsl:variable name="InstanceId" select="generate-id()"/>
         <xsl:copy>
             <xsl:copy-of select="@id|$Template/@*[name() != 'id']"/>
@@ -7,8 +7,9 @@ __author__ = "Jan Pokorný <jpokorny @at@ Red Hat .dot. com>"
 
 from ..facts import infer
 from ..filter import XMLFilter
-from ..filters._2pcscmd import verbose_ec_test, verbose_inform
-from ..utils_xslt import NL, xslt_params
+from ..filters._2pcscmd import verbose_ec_test, verbose_inform, \
+                               verbose_templates
+from ..utils_xslt import NL
 
 
 def attrset_xsl(attrset, cmd=None, inform=None):
@@ -63,7 +64,8 @@ def cib2pcscmd(flt_ctxt, in_obj):
         flt_ctxt.ctxt_proceed_xslt(
             in_obj,
             textmode=True,
-            def_first=xslt_params(
+            def_first=verbose_templates,
+            params=dict(
                 pcscmd_force=flt_ctxt['pcscmd_force'],
                 pcscmd_verbose=flt_ctxt['pcscmd_verbose'],
                 pcscmd_tmpcib=flt_ctxt['pcscmd_tmpcib'],
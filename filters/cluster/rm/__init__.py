@@ -352,6 +352,12 @@ ccsflat2cibprelude = ('''\
 ###
 
 ccs_revitalize = '''\
+    <!-- index of resources by their primary attribute (sibling scope) -->
+    <xsl:key name="ccs-resource-primary"
+             match="*[@*[name() = ../@rgmanager-meta-primary]]"
+             use="concat(generate-id(..), ' ', name(), ' ',
+                         @*[name() = ../@rgmanager-meta-primary])"/>
+
     <xsl:template match="service
                           |service//*[name() != 'action']
                           |vm
@@ -364,17 +370,18 @@ ccs_revitalize = '''\
                  XXX: this will only work for config preprocessed with
                       ccs_flatten
              -->
-            <xsl:when test="preceding-sibling::*[
-                                name() = name(current())
-                                and
-                                current()/@rgmanager-meta-primary
-                                and
-                                @*[
-                                    name() = current()/@rgmanager-meta-primary
-                                ] = current()/@*[
-                                    name() = current()/@rgmanager-meta-primary
-                                ]
-                             ]">
+            <xsl:when test="@*[name() = ../@rgmanager-meta-primary]
+                            and
+                            generate-id()
+                            !=
+                            generate-id(
+                                key('ccs-resource-primary',
+                                    concat(generate-id(..), ' ', name(), ' ',
+                                           @*[
+                                               name() = ../@rgmanager-meta-primary
+                                           ])
+                                )[1]
+                            )">
                 <xsl:message>
                     <xsl:value-of select="concat('WARNING: omitting resource',
                                                 ' with repeated primary',
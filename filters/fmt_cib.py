@@ -6,7 +6,6 @@
 __author__ = "Jan Pokorný <jpokorny @at@ Red Hat .dot. com>"
 
 from ..filter import XMLFilter
-from ..utils_xslt import xslt_params
 
 from os.path import basename, splitext
 
@@ -23,7 +22,7 @@ def fmt_cib_1to2(flt_ctxt, in_obj):
         'etree',
         flt_ctxt.ctxt_proceed_xslt(
             in_obj,
-            def_first=xslt_params(
+            params=dict(
                 cib2_min_ver=validator_spec_min
             )
         )
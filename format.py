@@ -14,9 +14,15 @@ from glob import glob
 from imp import find_module, load_module
 from itertools import dropwhile, islice
 from logging import getLogger
-from os import extsep, fdopen, stat, walk
-from os.path import basename, commonprefix, dirname, exists, join, sep, splitext
-from sys import modules
+from json import dump as json_dump, dumps as json_dumps, load as json_load
+from os import environ, extsep, fdopen, listdir, makedirs, remove, rename, \
+               stat, utime, walk
+from os.path import abspath, dirname, exists, expanduser, isdir, join, sep, \
+                    split, splitext
+from shutil import rmtree
+from sys import modules, version_info
+from tempfile import mkstemp
+from threading import RLock, local
 from time import time
 
 try:
@@ -30,6 +36,7 @@ try:
     from .defaults import HASHALGO
 except ImportError:
     HASHALGO = 'md5'
+from . import package_name, version
 from .error import ClufterError, ClufterPlainError
 from .plugin_registry import MetaPlugin, PluginRegistry
 from .protocol import Protocol
@@ -44,14 +51,68 @@ from .utils import arg2wrapped, args2sgpl, args2tuple, args2unwrapped, \
                    isinstanceupto, \
                    popattr, \
                    tuplist
-from .utils_2to3 import MimicMeta, basestring, bytes_enc, iter_items, xrange
-from .utils_func import bifilter_unpack, foreach
+from .utils_2to3 import MimicMeta, basestring, bytes_enc, iter_items
+from .utils_func import bifilter_unpack
 from .utils_lxml import etree_parser_safe
-from .utils_prog import ProtectedDict, getenv_namespaced, namever_partition
+from .utils_prog import ProtectedDict, evict_lru, getenv_namespaced, \
+                        namever_partition
 from .utils_xml import rng_get_start, rng_pivot
 
 log = getLogger(__name__)
 
+_walk_schema_index_memo = {}  # (root_dir, xml_root) -> (identities, index)
+_walk_schema_cache_swept = False  # leftovers of other versions removed?
+# marks the per-version walk cache dirs as ours (to be removed when stale),
+# also keeping them off the backups (see https://bford.info/cachedir/)
+_walk_schema_cache_tag = ('CACHEDIR.TAG',
+                          "Signature: 8a477f597d28d172789f06886806bc55\n"
+                          "# This file is a cache directory tag created by"
+                          " {0}.\n".format(package_name()))
+_walk_schema_load_lock = RLock()  # filters may run concurrently
+# validators run in this thread add up their time to `total' when it is
+# present (see FilterStats)
+validation_time = local()
+_decode = lambda s: s if s is None or isinstance(s, str) \
+                    else s.encode('utf-8')  # PY2 (JSON yields unicode)
+
+
+class LazySnippet(object):
+    """Placeholder for a snippet within the walk, loaded once really needed
+
+    Only upon `resolve`, the respective snippet module is loaded and
+    the symbol grabbed from it (see `XML.walk_schema` with `lazy`).
+    """
+    __slots__ = ('_fmt', '_namespace', '_name', '_root', 'rel_dir',
+                 '_symbol', '_swag')
+
+    def __init__(self, fmt, namespace, name, root, rel_dir, symbol):
+        self._fmt, self._namespace, self._name = fmt, namespace, name
+        self._root, self.rel_dir, self._symbol = root, rel_dir, symbol
+        self._swag = self
+
+    def resolve(self):
+        if self._swag is self:
+            log.debug("Resolving lazy snippet `{0}' at `{1}'"
+                      .format(self._name, self.rel_dir))
+            mod, mpath = self._fmt._walk_schema_load(
+                self._namespace, self._name, join(self._root, self.rel_dir)
+            )
+            if mod is None:
+                raise FormatError(self._fmt, "Cannot load snippet `{0}'"
+                                             .format(mpath))
+            self._swag = getattr(mod, self._symbol)
+        return self._swag
+
+    def __repr__(self):
+        return "<{0} {1}/{2}:{3}>".format(self.__class__.__name__,
+                                          self.rel_dir, self._name,
+                                          self._symbol)
+
+
+def walk_resolve(swag):
+    """Get actual snippet for `swag` (which may be a `LazySnippet`)"""
+    return swag.resolve() if isinstance(swag, LazySnippet) else swag
+
 DEFAULT_ROOT_DIR = join(dirname(__file__), 'formats')
 
 
@@ -226,7 +287,10 @@ class _Format(object):
             return  # cannot validate in any way
 
         obj = self(validating_protocol)
+        start = time()
         entries, _ = head_tail(validator(obj))
+        if hasattr(validation_time, 'total'):
+            validation_time.total += time() - start
         if isinstance(entries, basestring):
             log.warning(entries)
         elif entries:
@@ -305,6 +369,7 @@ class _Format(object):
         assert not(getattr(self, '_representations', None)), "int. API misuse"
         rs = {}
         self._representations, self._representations_ro = rs, ProtectedDict(rs)
+        self._producing = RLock()
         if not hasattr(self, '_hash'):  # can be defined at the class level
             self._hash = None
         validator_specs = kwargs.pop('validator_specs', {})
@@ -367,8 +432,10 @@ class _Format(object):
             if instance.__class__.__bases__[0] is cls:
                 return instance
 
-            # convert using (preferably native) protocol
-            com = instance.common_protocols(cls)
+            # convert using (preferably native) protocol, but never via
+            # bare `file' (no path given -> dumped as ./file, littering
+            # and racy once the filters run concurrently)
+            com = [p for p in instance.common_protocols(cls) if p != 'file']
             if not com:
                 raise FormatError(cls, "no common protocol with source format"
                                        " `{0}'", instance.name)
@@ -428,42 +495,50 @@ class _Format(object):
                 # XXX enforce nochain for this iterative processing?
                 do_protect = protect and not kwargs.pop('protect_safe', False)
                 produced = None
-                try:
-                    # stored -> computed norm.: detuple if len == 1
-                    produced = args2unwrapped(*self._representations[protocol])
-                except KeyError:
-                    produced = None
-                    # seemingly absurd inversion of starting with this `prev`:
-                    # arranged like this for empty _protocols (hence `get`s)
-                    worklist = [(Format, self.__class__)] * 2
-                    this_proto = self._protocols[protocol]
-                    while worklist:
-                        prev_cls, that_cls = worklist.pop()
-                        that_proto = that_cls._protocols[protocol]
-                        prev_proto = prev_cls._protocols.get(protocol)
-                        if that_proto in (this_proto, prev_proto):
-                            if worklist or that_proto == prev_proto:
-                                if chained:
-                                    worklist.extend((that_cls, b) for b in
-                                                    that_cls.__bases__ if
-                                                    protocol in b._protocols)
-                                 # also ensures meth fired atmost once (@level?)
+                # shared by filters possibly running concurrently
+                with self._producing:
+                    try:
+                        # stored -> computed norm.: detuple if len == 1
+                        produced = args2unwrapped(
+                            *self._representations[protocol]
+                        )
+                    except KeyError:
+                        produced = None
+                        # seemingly absurd inversion of starting with this
+                        # `prev`: arranged like this for empty _protocols
+                        # (hence `get`s)
+                        worklist = [(Format, self.__class__)] * 2
+                        this_proto = self._protocols[protocol]
+                        while worklist:
+                            prev_cls, that_cls = worklist.pop()
+                            that_proto = that_cls._protocols[protocol]
+                            prev_proto = prev_cls._protocols.get(protocol)
+                            if that_proto in (this_proto, prev_proto):
+                                if worklist or that_proto == prev_proto:
+                                    if chained:
+                                        worklist.extend(
+                                            (that_cls, b) for b in
+                                            that_cls.__bases__ if
+                                            protocol in b._protocols
+                                        )
+                                     # also ensures meth fired atmost once
+                                     # (@level?)
+                                    continue
+                                producer = lambda *args, **kwargs: \
+                                               meth(self, *args, **kwargs)
+                            else:
+                                producer = getattr(super(prev_cls, self),
+                                                   that_proto[1])
+                            produced = producer(protocol, *args, **kwargs)
+                            if produced is None:
                                 continue
-                            producer = lambda *args, **kwargs: \
-                                           meth(self, *args, **kwargs)
-                        else:
-                            producer = getattr(super(prev_cls, self),
-                                               that_proto[1])
-                        produced = producer(protocol, *args, **kwargs)
-                        if produced is None:
-                            continue
-                        if (that_cls is self.__class__
-                            and protocol not in self._representations):
-                            # computed -> stored normalization
-                            self._swallow(protocol, *arg2wrapped(produced))
-                        else:
-                            do_protect = False
-                        break
+                            if (that_cls is self.__class__
+                                and protocol not in self._representations):
+                                # computed -> stored normalization
+                                self._swallow(protocol, *arg2wrapped(produced))
+                            else:
+                                do_protect = False
+                            break
 
                 if do_protect and not immutable(produced):
                     log.debug("{0}:{1}:Forced deepcopy of `{2}' instance"
@@ -554,17 +629,8 @@ class SimpleFormat(Format):
             # w/o salt:   md5sum $FILE
             # with salt:  { stat --printf "%Y" $FILE; cat $FILE; } | md5sum
             content, salt = '', ''
-            hash_algo = getenv_namespaced('HASHALGO', HASHALGO)
             do_salt = getenv_namespaced('NOSALT', '0') in ('0', 'false')
-            try:
-                hash_algo = getattr(hashlib, hash_algo)
-            except AttributeError:
-                log.warning("`{0}' hash algorithm unknown".format(hash_algo))
-                hash_algo = hashlib.md5
-            try:
-                h = hash_algo()
-            except:
-                h = hash_algo(usedforsecurity=False)  # Fedora/RHEL-specific
+            h = self._hasher()
 
             if self.FILE in self._representations:
                 if do_salt:
@@ -588,6 +654,31 @@ class SimpleFormat(Format):
             self._hash = h.hexdigest()[:h.digest_size//2]  # expected even
         return self._hash
 
+    @property
+    def digest(self):
+        """Compute (full) hash of the very content, with no salt mixed in
+
+        Unlike `hash`, the same content always yields the same digest,
+        which makes it suitable for content-addressing (cf. `FilterCache`),
+        but not for exposing in, e.g., output file names.
+        """
+        h = self._hasher()
+        h.update(bytes_enc(self.BYTESTRING(), 'utf-8'))
+        return h.hexdigest()
+
+    @staticmethod
+    def _hasher():
+        hash_algo = getenv_namespaced('HASHALGO', HASHALGO)
+        try:
+            hash_algo = getattr(hashlib, hash_algo)
+        except AttributeError:
+            log.warning("`{0}' hash algorithm unknown".format(hash_algo))
+            hash_algo = hashlib.md5
+        try:
+            return hash_algo()
+        except:
+            return hash_algo(usedforsecurity=False)  # Fedora/RHEL-specific
+
     @classmethod
     def io_decl_specials(cls, io_decl, in_mode, magic_fds, interpolations={}):
         """Special file decl. treatment: "magic files", string interpolation
@@ -718,46 +809,351 @@ class CompositeFormat(Format, MetaPlugin):
 class XML(SimpleFormat):
     """Base for XML-based configuration formats"""
 
-    MAX_DEPTH = 1000
-
     root = ''  # root tag of the XML document
 
     @staticmethod
-    def _walk_schema_step_up(tree_stack):
-        """Step up within the tree_stack (bottom-up return in dir structure)"""
-        child_root, child_data = (lambda x, *y: (x, y))(*tree_stack.pop())
-        log.debug("Moving upwards: `{0}' -> `{1}'"
-                  .format(child_root, tree_stack[-1][0]))
-        current_tracking = tree_stack[-1][2]
-        if len(child_data[1]):
-            name = basename(child_root)
-            if name in current_tracking:
-                to_update = current_tracking[name][1]
-            else:
-                to_update = current_tracking
-            to_update.update(child_data[1])
+    def _walk_schema_identities(root_dir, xml_root):
+        """Identities (path, size, mtime) of files the walk depends on
+
+        These are all the files in `xml_root` subtree of `root_dir` (snippet
+        modules and whatever they may `execfile`), plus Python modules
+        directly at `root_dir` and at the package level (the snippets
+        commonly import helpers from there).
+        """
+        ret = []
+        for top, recursive in ((join(root_dir, xml_root), True),
+                               (root_dir, False),
+                               (dirname(abspath(__file__)), False)):
+            for root, dirs, files in walk(top):
+                if recursive:
+                    dirs[:] = sorted(d for d in dirs if d != '__pycache__')
+                else:
+                    dirs[:] = ()
+                    files = (f for f in files if splitext(f)[1] == extsep + 'py')
+                for f in sorted(files):
+                    if splitext(f)[1] in (extsep + 'pyc', extsep + 'pyo'):
+                        continue
+                    f = join(root, f)
+                    st = stat(f)
+                    ret.append([f, st.st_size, st.st_mtime])
+        return ret
 
-        return current_tracking
+    @staticmethod
+    def _walk_schema_cache_dir():
+        """Directory to persistently cache walk-related data at, if any
+
+        It is a per-version subdirectory of the dedicated `<package>-walk'
+        one within the configured directory, so that the leftovers of other
+        versions can be told and dropped without touching anything else.
+        """
+        cache_dir = getenv_namespaced('WALKCACHE', join(
+            environ.get('XDG_CACHE_HOME') or join(expanduser('~'), '.cache'),
+            package_name()
+        ))
+        return cache_dir and join(cache_dir, package_name() + '-walk', version)
 
     @staticmethod
-    def _walk_schema_step_down(tree_stack, root):
-        """Step down within the tree_stack (top-down diving in dir structure)
-
-        Based on the fact that we traverse down by one level to already
-        (shallowly) explored level so the item is already tracked at
-        the parent and the shallow knowledge (dict) is passed down to be
-        potentially extended -- as dict is mutable, this knowledge
-        is shared between parent and child level.
+    def _walk_schema_cache_prune(cache_dir):
+        """Keep the cache within the size limit, drop the stale leftovers
+
+        The least recently used entries are evicted beyond the limit (see
+        {PREFIX}_WALKCACHESIZE environment variable, in MiB), and once per
+        run, also the entries of other versions, i.e., sibling directories
+        tagged as created by us (see `_walk_schema_cache_tag').
+        """
+        global _walk_schema_cache_swept
+        if not _walk_schema_cache_swept:
+            _walk_schema_cache_swept = True
+            parent, current = split(cache_dir)
+            try:
+                names = listdir(parent)
+            except OSError:
+                names = ()
+            for name in names:
+                path = join(parent, name)
+                if name == current or not isdir(path):
+                    continue
+                try:
+                    with open(join(path, _walk_schema_cache_tag[0])) as f:
+                        tagged = f.read() == _walk_schema_cache_tag[1]
+                except (IOError, OSError):
+                    tagged = False
+                if tagged:
+                    log.debug("Walk cache: dropping `{0}'".format(path))
+                    rmtree(path, ignore_errors=True)
+        try:
+            maxsize = int(getenv_namespaced('WALKCACHESIZE', 16)) << 20
+        except ValueError:
+            log.warning("Cannot interpret WALKCACHESIZE value, using default")
+            maxsize = 16 << 20
+        evicted = evict_lru(cache_dir, maxsize, ('index-*.json', 'walk-*.json'))
+        if evicted:
+            log.debug("Walk cache: evicted {0} entries".format(evicted))
+
+    @classmethod
+    def _walk_schema_cache_load(cls, cache_file, identities, field='walk',
+                                lazy=None):
+        """Load raw walk (`field`) from `cache_file`, unless missing/stale
+
+        Snippets stored as lazy are turned into `LazySnippet` instances
+        using `lazy`, a triple of the namespace, root dir and symbol.
+        """
+        try:
+            with open(cache_file) as f:
+                cached = json_load(f)
+        except (IOError, OSError, ValueError) as e:
+            log.debug("Walk cache `{0}' miss: {1}".format(cache_file, e))
+            return None
+        if cached.get('identities') != identities or field not in cached:
+            log.debug("Walk cache `{0}' stale".format(cache_file))
+            try:
+                remove(cache_file)  # not to linger when not stored anew
+            except OSError:
+                pass
+            return None
+        log.debug("Walk cache `{0}' hit".format(cache_file))
+        try:
+            utime(cache_file, None)  # most recently used
+        except OSError:
+            pass
+        if field != 'walk':
+            return cached[field]
+        def swag_rebuild(name, swag):
+            if isinstance(swag, dict):  # {"lazy": rel_dir}
+                return LazySnippet(cls, lazy[0], name, lazy[1],
+                                   _decode(swag['lazy']), lazy[2])
+            return _decode(swag)
+        def rebuild(walk):
+            return dict((_decode(k), (swag_rebuild(_decode(k), swag),
+                                      rebuild(children)))
+                        for k, (swag, children) in iter_items(walk))
+        return rebuild(cached['walk'])
+
+    @classmethod
+    def _walk_schema_cache_store(cls, cache_file, identities, walk,
+                                 field='walk'):
+        """Store raw walk to `cache_file` (non-fatal)
+
+        Only plain string snippets are stored as are, any other `LazySnippet`
+        (incl. `lazystring` and `volatilestring`, i.e., the snippets that
+        may differ per each run) is stored as lazy (to be loaded anew once
+        needed).  They are resolved for that, loading their modules.
+        """
+        def plain(swag):
+            if isinstance(swag, LazySnippet):
+                if type(swag.resolve()) is str:
+                    return swag.resolve()
+                return {'lazy': swag.rel_dir}
+            return swag
+        def store(walk):
+            return dict((name, (plain(swag), store(children)))
+                        for name, (swag, children) in iter_items(walk))
+        if field == 'walk':
+            walk = store(walk)
+        cache_dir = dirname(cache_file)
+        try:
+            if not isdir(cache_dir):
+                makedirs(cache_dir)
+                with open(join(cache_dir, _walk_schema_cache_tag[0]),
+                          'w') as f:
+                    f.write(_walk_schema_cache_tag[1])
+            fd, tmp = mkstemp(dir=cache_dir, suffix=extsep + 'tmp')
+            with fdopen(fd, 'w') as f:
+                json_dump({'identities': identities, field: walk}, f)
+            rename(tmp, cache_file)
+        except (IOError, OSError, TypeError, ValueError) as e:
+            log.debug("Walk cache `{0}' not stored: {1}".format(cache_file, e))
+        else:
+            cls._walk_schema_cache_prune(cache_dir)
+
+    @classmethod
+    def _walk_schema_load(cls, namespace, name, root):
+        """Load snippet module `name` at `root` within `namespace`
+
+        Returns pair of the module (None if it cannot be loaded) and its path.
+        """
+        log.debug("Trying `{0}' at `{1}'".format(name, root))
+        # need to obfuscate the name due to, e.g., "logging" clash
+        mname = '.'.join((namespace, 'walk_' + name))
+        # module gets registered prior to being executed, hence other
+        # thread must not observe it (as already present) until then
+        with _walk_schema_load_lock:
+            mfile, mpath, mdesc = find_module(name, [root])
+            # suppress problems with missing parent in module hierarchy
+            modules.setdefault(namespace, modules[__name__])
+            if mname in modules:
+                if mfile:
+                    mfile.close()
+                mod = modules[mname]
+                if hasattr(mod, '__path__') and mod.__path__[0] != mpath:
+                    # XXX robust?
+                    raise FormatError(cls, "`{0}' already present"
+                                           .format(mname))
+            else:
+                try:
+                    mod = load_module(mname, mfile, mpath, mdesc)
+                except ImportError as e:
+                    log.warning("Cannot load `{0}': {1}".format(mpath, e))
+                    mod = None
+                finally:
+                    if mfile:
+                        mfile.close()
+        return mod, mpath
+
+    @classmethod
+    def _walk_schema_index_build(cls, root_dir, xml_root, namespace):
+        """Build index of `xml_root` subtree (see `_walk_schema_index`)
+
+        All the snippet modules are loaded (within `namespace`) to learn
+        the symbols they provide.  Returns pair of the index and a list
+        of paths of the modules that could not be loaded.
+        """
+        failed = []
+
+        def build(rel_dir, entries=None):
+            ret = {}
+            top = join(root_dir, rel_dir)
+            for i in sorted(listdir(top) if entries is None else entries):
+                name, ext = splitext(i)  # does not hurt even if it is a dir
+                is_dir = isdir(join(top, i))
+                if name in ret or i == '__pycache__' \
+                or not is_dir and (ext != extsep + 'py'
+                                   or name.startswith(('_', '.'))):
+                    continue
+                symbols = None
+                if not name.startswith(('_', '.')):
+                    mod, mpath = cls._walk_schema_load(namespace, name, top)
+                    if mod is None:
+                        failed.append(mpath)
+                    else:
+                        symbols = sorted(set(dir(mod)) - set(dir(type(mod))))
+                children = build(join(rel_dir, i)) if is_dir else {}
+                ret[name] = [rel_dir, not is_dir, symbols, children]
+            return ret
+
+        # at root, we do not consider anything else but `xml_root` dir
+        ret = build('', [xml_root] if isdir(join(root_dir, xml_root)) else [])
+        return ret, failed
+
+    @classmethod
+    def _walk_schema_index(cls, root_dir, xml_root, namespace):
+        """Get identities and index of snippet modules for `xml_root`
+
+        The index mirrors the layout of `xml_root` subtree of `root_dir`,
+        mapping each (possible) element name to a list of: directory of
+        the respective snippet module (relative to `root_dir`), whether
+        it is a plain file (i.e., terminal), sorted symbols it provides
+        (None if it is not to be considered a snippet module) and index
+        of the same form for the nested elements.
+
+        Once built, the index is memoized for the run and persistently
+        cached (see {PREFIX}_WALKCACHE environment variable) alongside
+        the identities of the files it is derived from, which serve
+        for its invalidation.  No caching occurs when some snippet
+        module cannot be loaded (may be a transient condition).
         """
-        log.debug("Moving downwards:`{0}' -> `{1}'"
-                  .format(tree_stack[-1][0], root))
-        tree_stack.append((root, None, {}))
+        memo_key = (abspath(root_dir), xml_root)
+        ret = _walk_schema_index_memo.get(memo_key)
+        if ret is not None:
+            return ret
+        identities = cls._walk_schema_identities(root_dir, xml_root)
+        cache_dir = cls._walk_schema_cache_dir()
+        cache_file = cache_dir and join(cache_dir, 'index-{0}-{1}.json'.format(
+            xml_root, hashlib.sha1(bytes_enc(json_dumps(
+                [version, version_info[:2]]  # dunders vary
+                + list(memo_key)
+            ), 'utf-8')).hexdigest()
+        ))
+        index = None
+        if cache_file:
+            index = cls._walk_schema_cache_load(cache_file, identities, 'index')
+        if index is None:
+            index, failed = cls._walk_schema_index_build(root_dir, xml_root,
+                                                         namespace)
+            if failed:
+                log.debug("Walk index: not cached due to {0}"
+                          .format(', '.join(failed)))
+            elif cache_file:
+                cls._walk_schema_cache_store(cache_file, identities, index,
+                                             'index')
+        else:
+            def rebuild(index):
+                return dict((_decode(k), [_decode(d), f, s and
+                                          [_decode(i) for i in s],
+                                          rebuild(c)])
+                            for k, (d, f, s, c) in iter_items(index))
+            index = rebuild(index)
+        ret = _walk_schema_index_memo[memo_key] = identities, index
+        return ret
 
-        return tree_stack[-1][2]  # current tracking
+    @staticmethod
+    def _walk_schema_preprocess(walk, preprocess):
+        """Apply `preprocess` to a raw walk, None if that would reshape it"""
+        ret = {}
+        for name, (swag, children) in iter_items(walk):
+            swag = walk_resolve(swag)
+            if swag is not None:
+                swag = preprocess(swag, name)
+                if swag is None:
+                    return None
+            children = XML._walk_schema_preprocess(children, preprocess)
+            if children is None:
+                return None
+            ret[name] = (swag, children)
+        return ret
 
     @classmethod
     def walk_schema(cls, root_dir, symbol=None, preprocess=lambda s, n: s,
-                    sparse=True, xml_root=None):
+                    sparse=True, xml_root=None, lazy=False):
+        """
+        Get recipe for visiting symbol(s) within the XML as (sparsely) arranged
+
+        See `_walk_schema` for the details.  In addition, the raw walk
+        (prior to `preprocess`) for a particular symbol is persistently
+        cached on disk (see {PREFIX}_WALKCACHE environment variable) so
+        that the snippet modules need not be loaded again and again;
+        the cached walk is invalidated with any change of the package
+        version or of the files it is (likely) derived from, and the
+        snippets other than plain strings (e.g., `volatilestring`) are
+        not stored, only noted down to be loaded anew.
+
+        With `lazy`, the snippets not at hand may be represented with
+        `LazySnippet` placeholders, and it is up to the caller to
+        `walk_resolve` (and `preprocess`) them once really needed.
+        """
+        xml_root = xml_root or cls.root
+        cache_dir = symbol and cls._walk_schema_cache_dir()
+        if not cache_dir:
+            return cls._walk_schema(root_dir, symbol, preprocess, sparse,
+                                    xml_root, lazy=lazy)
+
+        key = json_dumps([version, cls.__module__, cls.__name__, symbol,
+                          xml_root, sparse, abspath(root_dir)])
+        cache_file = join(cache_dir, 'walk-{0}-{1}.json'.format(
+            symbol, hashlib.sha1(bytes_enc(key, 'utf-8')).hexdigest()
+        ))
+        particular_namespace = '.'.join((cls.namespace, symbol))
+        identities, _ = cls._walk_schema_index(root_dir, xml_root,
+                                               particular_namespace)
+        raw = cls._walk_schema_cache_load(
+            cache_file, identities,
+            lazy=(particular_namespace, root_dir, symbol)
+        )
+        if raw is None:
+            raw = cls._walk_schema(root_dir, symbol, sparse=sparse,
+                                   xml_root=xml_root, lazy=True)
+            cls._walk_schema_cache_store(cache_file, identities, raw)
+        if lazy:
+            return raw
+        ret = cls._walk_schema_preprocess(raw, preprocess)
+        if ret is None:
+            ret = cls._walk_schema(root_dir, symbol, preprocess, sparse,
+                                   xml_root)
+        return ret
+
+    @classmethod
+    def _walk_schema(cls, root_dir, symbol=None, preprocess=lambda s, n: s,
+                     sparse=True, xml_root=None, lazy=False):
         """
         Get recipe for visiting symbol(s) within the XML as (sparsely) arranged
 
@@ -775,76 +1171,47 @@ class XML(SimpleFormat):
             }
 
         NB: order of keys really does not matter.
+
+        Snippet modules are discovered by the means of the index (see
+        `_walk_schema_index`) and only those providing `symbol` (if any)
+        get actually loaded.  With `lazy` (and `symbol`), not even those,
+        `LazySnippet` placeholders are used instead and `preprocess`
+        is not applied.
         """
         xml_root = xml_root or cls.root
         particular_namespace = '.'.join((cls.namespace, symbol or xml_root))
-        result = {}
-        tree_stack = [(root_dir, None, result)]  # for bottom-up reconstruction
-        for root, dirs, files in walk(root_dir):
-            try:
-                dirs.remove('__pycache__')  # PY3
-            except ValueError:
-                pass
-            # multi-step upwards and (followed by)/or single step downwards
-            while commonprefix((root, tree_stack[-1][0])) != tree_stack[-1][0]:
-                cls._walk_schema_step_up(tree_stack)
-            if root != tree_stack[-1][0]:
-                current_tracking = cls._walk_schema_step_down(tree_stack, root)
-            else:
-                assert root == root_dir
-                # at root, we do not traverse to any other dir than `xml_root`
-                foreach(lambda d: d != xml_root and dirs.remove(d), dirs[:])
-                current_tracking = tree_stack[-1][2]
-                files = []
-
-            for i in dirs + files:
-                name, ext = splitext(i)  # does not hurt even if it is a dir
-                if name.startswith('_') or name.startswith('.') \
-                or i in files and ext != extsep + 'py':
-                    continue
-
-                log.debug("Trying `{0}' at `{1}'".format(name, root))
-                mfile, mpath, mdesc = find_module(name, [root])
-                # need to obfuscate the name due to, e.g., "logging" clash
-                mname = '.'.join((particular_namespace, 'walk_' + name))
-                # suppress problems with missing parent in module hierarchy
-                modules.setdefault(particular_namespace, modules[__name__])
-                if mname in modules:
-                    if mfile:
-                        mfile.close()
-                    mod = modules[mname]
-                    if hasattr(mod, '__path__') and mod.__path__[0] != mpath:
-                        # XXX robust?
-                        raise FormatError(cls, "`{0}' already present"
-                                          .format(mname))
+        _, index = cls._walk_schema_index(root_dir, xml_root,
+                                          particular_namespace)
+
+        def resolve(index):
+            ret = {}
+            for name, (rel_dir, is_file, symbols, children) \
+                    in iter_items(index):
+                children = resolve(children)
+                swag = None
+                if symbols is None or symbol and symbol not in symbols:
+                    pass
+                elif lazy and symbol:
+                    swag = LazySnippet(cls, particular_namespace, name,
+                                       root_dir, rel_dir, symbol)
                 else:
-                    try:
-                        mod = load_module(mname, mfile, mpath, mdesc)
-                    except ImportError as e:
-                        log.warning("Cannot load `{0}': {1}".format(mpath, e))
-                        continue
-                    finally:
-                        if mfile:
-                            mfile.close()
+                    # only now the module is actually needed
+                    mod, _ = cls._walk_schema_load(
+                        particular_namespace, name, join(root_dir, rel_dir)
+                    )
+                    if mod is None:
+                        symbols = None
+                    else:
+                        swag = getattr(mod, symbol) if symbol \
+                               else tuple(symbols)
+                        swag = preprocess(swag, name)
+                if symbols is None or swag is None and (sparse or is_file):
+                    ret.update(children)  # hoisting, files have none anyway
+                    continue
+                ret[name] = (swag, children)
+            return ret
 
-                available = set(dir(mod)) - set(dir(type(mod)))
-                swag = None
-                if not symbol or symbol in available:
-                    swag = getattr(mod, symbol) if symbol else tuple(available)
-                    swag = preprocess(swag, name)
-                if swag is None and (sparse or i in files):
-                    continue  # files are terminals anyway
-                current_tracking[name] = (swag, {})
-
-        for i in xrange(cls.MAX_DEPTH):
-            try:
-                if cls._walk_schema_step_up(tree_stack) is result:
-                    return result
-            except IndexError:
-                raise FormatError(cls, "Format tree structure inconsistency"
-                                       " detected")
-        else:
-            raise FormatError(cls, "INFLOOP detected")
+        return resolve(index)
 
     ###
 
@@ -34,6 +34,8 @@ from .command_manager import CommandManager
 from .completion import Completion
 from .error import EC
 from .facts import aliases_dist, aliases_rel, format_dists, supported_dists
+from .filter_manager import FilterManager
+from .format_manager import FormatManager
 from .utils import args2sgpl, head_tail, identity
 from .utils_2to3 import iter_items, str_enc, xrange
 from .utils_func import foreach
@@ -248,6 +250,12 @@ opts_main = (
         dest='completion', const='bash',
         help="generate bash completion and exit"
     )),
+    (('--rebuild-manifest', ), dict(
+        action='store_true',
+        dest='rebuild_manifest',
+        expert=True,
+        help="(re)generate manifests of plugins (also external) and exit"
+    )),
 )
 
 opts_nonmain = (
@@ -317,6 +325,11 @@ class SharedOptionParser(OptionParser):
                          for l in self.get_description().split('\n\n')) \
                + (self.description_raw and '\n' + self.description_raw + '\n')
 
+    def _process_long_opt(self, rargs, values):
+        # let callbacks tell `--opt=value' from `--opt' followed by an arg
+        self.long_opt_explicit = '=' in rargs[0]
+        return OptionParser._process_long_opt(self, rargs, values)
+
     def format_epilog(self, formatter):
         ret = '\n' + '\n'.join(formatter.format_epilog(l).strip('\n')
                                if '<http' not in l else l
@@ -349,6 +362,16 @@ class SharedOptionParser(OptionParser):
                           self.formatter_nonexpert)
 
 
+def rebuild_manifest(**kwargs):
+    """(Re)generate manifests for all plugin kinds, see `PluginManager`"""
+    written, failed = [], []
+    for mgr in (FormatManager, FilterManager, CommandManager):
+        w, f = mgr.rebuild_manifest(**kwargs)
+        written.extend(w)
+        failed.extend(f)
+    return written, failed
+
+
 def run(argv=None, *args):
     """Entry point"""
     # re option parser: only one instance is used, modified along
@@ -393,9 +416,27 @@ def run(argv=None, *args):
     foreach(lambda args: log.log(*args),
             getattr(opts, '_deferred_log', _deferred_log))
 
-    cm = CommandManager.init_lookup(ext_plugins=not opts.skip_ext,
-                                    ext_plugins_user=opts.ext_user,
-                                    system=opts.sys, system_extra=opts.dist)
+    if prog_simple == prog_real and opts.rebuild_manifest:
+        written, failed = rebuild_manifest(ext_plugins=not opts.skip_ext,
+                                           ext_plugins_user=opts.ext_user)
+        foreach(print, written)
+        return EC.EXIT_FAILURE if failed else ec
+
+    # unless listing the commands, only the one requested is resolved
+    # (together with the filters and formats it transitively relies on)
+    cmd = None
+    if prog_simple != prog_real:
+        cmd = prog_simple
+    elif not (opts.list or opts.completion):
+        cmd = opts.help or (args[0] if args else None)
+    cm_kwargs = dict(ext_plugins=not opts.skip_ext,
+                     ext_plugins_user=opts.ext_user,
+                     system=opts.sys, system_extra=opts.dist)
+    cm = CommandManager.init_lookup(cmd or (), **cm_kwargs)
+    if cmd and cmd not in cm.commands:
+        log.debug("Command `{0}' not resolved on its own, resolving all"
+                  .format(cmd))
+        cm = CommandManager.init_lookup(**cm_kwargs)
     if prog_simple == prog_real and not opts.help \
        and (opts.list or opts.completion or not args):
         cmds = cm.pretty_cmds(ind=' ' * parser.formatter.indent_increment,
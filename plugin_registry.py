@@ -8,11 +8,13 @@ __author__ = "Jan Pokorný <jpokorny @at@ Red Hat .dot. com>"
 from contextlib import contextmanager
 from fnmatch import translate
 from imp import PY_SOURCE, find_module, get_suffixes, load_module
+from json import dump as json_dump, load as json_load
 from logging import getLogger
-from os import pathsep, walk
-from os.path import abspath, dirname, isabs, isdir, join, splitext
+from os import fdopen, listdir, pathsep, rename, stat, walk
+from os.path import abspath, dirname, isabs, isdir, isfile, join, splitext
 from re import compile as re_compile
 from sys import modules
+from tempfile import mkstemp
 
 try:
     from .defaults import EXTPLUGINS_SHARED
@@ -26,8 +28,8 @@ from .utils import args2tuple, \
                    filterdict_remove, \
                    hybridproperty, \
                    tuplist
-from .utils_2to3 import StandardError, filter_u, foreach_u  #, iter_values
-from .utils_func import apply_intercalate
+from .utils_2to3 import StandardError, foreach_u, iter_items
+from .utils_func import apply_intercalate, foreach
 from .utils_prog import ProtectedDict, cli_decor, getenv_namespaced
 
 log = getLogger(__name__)
@@ -35,6 +37,9 @@ module_ext = dict((t, s) for s, m, t in get_suffixes())[PY_SOURCE]
 
 here = dirname(abspath(__file__))
 
+MANIFEST = '_manifest.json'  # per plugin directory, see `rebuild_manifest`
+_manifest_memo = {}  # plugin directory -> manifest (None if missing/stale)
+
 EXTPLUGINS = tuple(e if isabs(e) else join(here, e) for e in
     map(str.strip, getenv_namespaced(
         'EXTPLUGINS', pathsep.join(('ext-plugins', EXTPLUGINS_SHARED))
@@ -227,6 +232,10 @@ class PluginRegistry(type):
             fname_start     glob/fnmatch pattern (not RE) used to filter files,
                             can also be a tuplist of strings like this
 
+        Where a valid manifest exists (see `rebuild_manifest`), the patterns
+        are rather matched against the plugin names it lists, and only
+        the modules providing the matching plugins are loaded.
+
         Returns `{plugin_name: plugin_cls}` mapping of plugins found.
         """
         ret = {}
@@ -235,41 +244,24 @@ class PluginRegistry(type):
             translate(fs + '*')
             for fs in (pfx.split('-', 1)[0] for pfx in fname_start_use)
         ))
+        pp = re_compile('|'.join(translate(pfx) for pfx in fname_start_use))
         if from_scratch:
             registry.setup(True)
         for path, path_plugins in registry._context(paths):
             # skip if path already discovered (considered final)
             if not path_plugins:
-                # visit *.py files within (and under) the path and probe them
-                for root, dirs, files in walk(path):
-                    if root != path:
-                        break  # ATM we only support flat dir (nested ~ private)
-                    #try:
-                    #    dirs.remove('__pycache__')  # PY3 (if we ever nest)
-                    #except ValueError:
-                    #    pass
-                    for name, ext in filter_u(
-                        lambda name, ext:
-                            fp.match(name) and
-                            (ext == module_ext or isdir(join(root, name))),
-                        (splitext(x) for x in files + dirs)
-                    ):
-                        try:
-                            mfile, mpath, mdesc = find_module(name, [root])
-                        except ImportError:
-                            log.debug("Omitting `{0}' at `{1}'"
-                                      .format(name, root))
-                        else:
-                            mname = registry.namespaced(name)
-                            try:
-                                load_module(mname, mfile, mpath, mdesc)
-                            except StandardError as e:
-                                # non-fatal, just log it and keep going
-                                log.error("Module load error: {0}: {1}"
-                                          .format(mfile or mpath, str(e)))
-                            finally:
-                                if mfile:
-                                    mfile.close()
+                manifest = registry._manifest(path)
+                if manifest is None:
+                    # probe *.py files within (and under) the path
+                    names = filter(fp.match, registry._modules(path))
+                elif fname_start:
+                    wanted = set(plugin['module'] for name, plugin
+                                 in iter_items(manifest['plugins'])
+                                 if pp.match(name))
+                    names = [n for n in manifest['modules'] if n in wanted]
+                else:
+                    names = manifest['modules']
+                foreach(lambda name: registry._load(str(name), path), names)
                 path_plugins = registry._path_mapping[path]
                 if fname_start:  # not picking everything -> restart next time
                     registry._path_mapping.pop(path)
@@ -279,6 +271,149 @@ class PluginRegistry(type):
 
         return ret
 
+    @classmethod
+    def rebuild_manifest(registry, paths=()):
+        """(Re)generate manifest for each of the specified plugin path(s)
+
+        Manifest (`MANIFEST` file right in the path) lists the plugins
+        together with modules providing them (and what else the registry
+        deems useful, see `_manifest_plugin`), so that the discovery can
+        load only the modules actually needed.  Its validity is bound to
+        the identities of the Python files in the path.
+
+        All the modules are loaded anew for that.  Manifest is not written
+        when any of them failed to load (e.g., missing dependency), as it
+        would then be incomplete.
+
+        Returns `(written, failed)` pair of lists of the manifest files.
+        """
+        written, failed = [], []
+        for path, _ in registry._context(paths):
+            mfile, found, complete = join(path, MANIFEST), set(), True
+            manifest = dict(registry=registry.registry, modules=[],
+                            plugins={},
+                            identities=registry._manifest_identities(path))
+            for name in registry._modules(path):
+                registry._path_mapping[path] = provided = set()
+                loaded = registry._load(name, path)
+                found.update(provided)
+                if loaded is None:
+                    complete = False
+                elif loaded:
+                    manifest['modules'].append(name)
+                    for plugin in sorted(provided):
+                        manifest['plugins'].setdefault(plugin, dict(
+                            registry._manifest_plugin(
+                                registry._plugins[plugin]),
+                            module=name
+                        ))
+            registry._path_mapping[path] = found
+            if not complete:
+                log.error("Manifest `{0}' not written: module load error"
+                          .format(mfile))
+                failed.append(mfile)
+                continue
+            try:
+                fd, tmp = mkstemp(dir=path, suffix='.tmp')
+                with fdopen(fd, 'w') as f:
+                    json_dump(manifest, f, indent=1, separators=(',', ': '),
+                              sort_keys=True)
+                rename(tmp, mfile)
+            except (IOError, OSError) as e:
+                log.error("Manifest `{0}' not written: {1}".format(mfile, e))
+                failed.append(mfile)
+            else:
+                log.info("Manifest `{0}' written".format(mfile))
+                _manifest_memo[path] = manifest
+                written.append(mfile)
+        return written, failed
+
+    # non-API
+
+    @classmethod
+    def _modules(registry, path):
+        """Names of the candidate plugin modules at the path (flat dir)
+
+        Private ones (starting with underscore or dot) are not considered.
+        """
+        ret = []
+        for root, dirs, files in walk(path):
+            ret.extend(name for name, ext in (splitext(x) for x in files + dirs)
+                       if name[:1] not in '_.' and
+                       (ext == module_ext or isdir(join(root, name))))
+            break  # ATM we only support flat dir (nested ~ private)
+        return ret
+
+    @classmethod
+    def _load(registry, name, path):
+        """Load module `name` at `path` (True), False if not a module at all
+
+        Module load errors are non-fatal, just logged (returning None).
+        """
+        try:
+            mfile, mpath, mdesc = find_module(name, [path])
+        except ImportError:
+            log.debug("Omitting `{0}' at `{1}'".format(name, path))
+            return False
+        try:
+            load_module(registry.namespaced(name), mfile, mpath, mdesc)
+        except StandardError as e:
+            # non-fatal, just log it and keep going
+            log.error("Module load error: {0}: {1}"
+                      .format(mfile or mpath, str(e)))
+            return None
+        finally:
+            if mfile:
+                mfile.close()
+        return True
+
+    @staticmethod
+    def _manifest_identities(path):
+        """Identities (name, size, mtime) of Python files the manifest reflects
+
+        These are all the modules directly at the path, including private
+        ones (commonly imported by the others), and packages' `__init__`.
+        """
+        ret = []
+        for name in sorted(listdir(path)):
+            f = join(path, name)
+            if isdir(f):
+                f = join(f, '__init__' + module_ext)
+                if not isfile(f):
+                    continue
+            elif splitext(name)[1] != module_ext:
+                continue
+            st = stat(f)
+            ret.append([name, st.st_size, st.st_mtime])
+        return ret
+
+    @classmethod
+    def _manifest(registry, path):
+        """Manifest for the path, unless missing or stale (then None)"""
+        try:
+            return _manifest_memo[path]
+        except KeyError:
+            pass
+        mfile, manifest = join(path, MANIFEST), None
+        try:
+            with open(mfile) as f:
+                manifest = json_load(f)
+        except (IOError, OSError, ValueError) as e:
+            log.debug("Manifest `{0}' miss: {1}".format(mfile, e))
+        else:
+            if (manifest.get('registry') != registry.registry or
+                manifest.get('identities')
+                    != registry._manifest_identities(path)):
+                log.info("Manifest `{0}' stale, ignored".format(mfile))
+                manifest = None
+        _manifest_memo[path] = manifest
+        return manifest
+
+    @classmethod
+    def _manifest_plugin(registry, plugin):
+        """Plugin details (beside the module) worth recording in manifest"""
+        return {}
+
 
 class PluginManager(object):
     """Common (abstract) base for *Manager objects"""
@@ -310,8 +445,12 @@ class PluginManager(object):
         return ret  # if tuplist(plugins) else ret[plugins]
 
     @classmethod
-    def init_lookup(cls, plugin=(), *plugins, **kwargs):
-        plugins = args2sgpl(plugin, *plugins)
+    def _ext_paths(cls, kwargs):
+        """Extend `paths` in `kwargs` with external plugin paths as specified
+
+        Standard EXTPLUGINS ones unless `ext_plugins` is false-ish, and
+        `ext_plugins_user` tuplist of (PATH-like composed) paths.
+        """
         ext_plugins = []
         if kwargs.get('ext_plugins', True):
             for e in EXTPLUGINS:
@@ -330,9 +469,24 @@ class PluginManager(object):
             else:
                 paths = kwargs['paths']
             paths.extend(ext_plugins)
-        kws_lu = filterdict_pop(kwargs, 'paths')
+        return kwargs
+
+    @classmethod
+    def init_lookup(cls, plugin=(), *plugins, **kwargs):
+        plugins = args2sgpl(plugin, *plugins)
+        kws_lu = filterdict_pop(cls._ext_paths(kwargs), 'paths')
         return cls(plugins=cls.lookup(plugins, **kws_lu), paths=None, **kwargs)
 
+    @classmethod
+    def rebuild_manifest(cls, **kwargs):
+        """(Re)generate manifests for built-in + external plugin paths
+
+        See `PluginRegistry.rebuild_manifest` (incl. the return value).
+        """
+        return cls._default_registry.rebuild_manifest(
+            **filterdict_keep(cls._ext_paths(kwargs), 'paths')
+        )
+
     def __init__(self, *args, **kwargs):
         registry = kwargs.pop('registry', None) or self._default_registry
         assert registry is not PluginRegistry, \
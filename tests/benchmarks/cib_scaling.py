@@ -0,0 +1,141 @@
+# -*- coding: UTF-8 -*-
+# Copyright 2019 Red Hat, Inc.
+# Part of clufter project
+# Licensed under GPLv2+ (a copy included | http://gnu.org/licenses/gpl-2.0.txt)
+"""Benchmark scaling of CIB-side conversions with the number of resources
+
+Optional arguments: sizes (numbers of resources) to try, and `--dump=DIR`
+to store the outputs (e.g. for comparing outputs across revisions).
+"""
+__author__ = "Jan Pokorný <jpokorny @at@ Red Hat .dot. com>"
+
+from os.path import join, dirname; from sys import modules as m  # 2/3 compat
+b = m.get('builtins', m.get('__builtin__')); e, E, h = 'exec', 'execfile', hash
+c = lambda x: compile(x.read(), x.name, 'exec')
+with open(join(dirname(__file__), '_bench')) as f:
+    getattr(b, e, getattr(b, E, h)(f.name).__repr__.__name__.__ne__)(c(f))
+
+
+from sys import argv
+from warnings import simplefilter
+
+from .utils_prog import setenv_namespaced
+setenv_namespaced('NOSALT', 'true')  # deterministic output to compare
+from .filter_manager import FilterManager
+
+# ccs2pcs sans ccs2ccsflat (external ccs_flatten binary), see _chains_pcs
+CCS2PCS = ('ccs-revitalize', 'ccsflat2cibprelude', 'cibprelude2cibcompact',
+           'cibcompact2cib', 'cib2cibfinal')
+CIB2PCSCMD = ('cib-revitalize', 'cib-meld-templates', 'cib2pcscmd')
+
+
+def gen_cib_xref(resources, nodes=3):
+    """Generate CIB (bytestring) with `resources` cross-referenced ones
+
+    Resource templates referenced by primitives, groups and clones,
+    constraints referring to the resources, and ACL roles referring
+    to resources by their ids.
+    """
+    node_ids = ['node-{0:02d}'.format(i) for i in range(nodes)]
+    tmpls = max(1, resources // 10)
+    ret = ['<cib validate-with="pacemaker-2.0" admin_epoch="0" epoch="0"'
+           ' num_updates="0">\n  <configuration>\n    <crm_config/>\n'
+           '    <nodes>\n']
+    ret.extend('      <node id="{0}" uname="{0}"/>\n'.format(n)
+               for n in node_ids)
+    ret.append('    </nodes>\n    <resources>\n')
+    ret.extend('      <primitive id="fence-{0}" class="stonith"'
+               ' type="fence_xvm">\n        <instance_attributes'
+               ' id="fence-{0}-ATTRS"><nvpair id="fence-{0}-ATTRS-port"'
+               ' name="port" value="{0}"/></instance_attributes>\n'
+               '      </primitive>\n'.format(n) for n in node_ids)
+    ret.extend('      <template id="TMPL-{0}" class="ocf" provider="heartbeat"'
+               ' type="Dummy">\n        <operations><op id="TMPL-{0}-OP"'
+               ' name="monitor" interval="30s"/></operations>\n'
+               '      </template>\n'.format(t) for t in range(tmpls))
+    prim = ('<primitive id="RSC-{0}" template="TMPL-{1}">\n'
+            '        <instance_attributes id="RSC-{0}-ATTRS">'
+            '<nvpair id="RSC-{0}-ATTRS-state" name="state"'
+            ' value="/run/rsc-{0}"/></instance_attributes>\n'
+            '      </primitive>')
+    for i in range(0, resources, 5):
+        members = range(i, min(i + 5, resources))
+        group = ('<group id="GRP-{0}">\n        '.format(i)
+                 + '\n        '.join(prim.format(j, j % tmpls)
+                                     for j in members)
+                 + '\n      </group>')
+        if not i % 20:
+            group = ('<clone id="CLN-{0}">\n        {1}\n'
+                     '        <meta_attributes id="CLN-{0}-META">'
+                     '<nvpair id="CLN-{0}-META-im" name="interleave"'
+                     ' value="true"/></meta_attributes>\n      </clone>'
+                     .format(i, group))
+        ret.append('      ' + group + '\n')
+    ret.append('    </resources>\n    <constraints>\n')
+    for i in range(0, resources, 5):
+        grp = 'GRP-{0}'.format(i) if i % 20 else 'CLN-{0}'.format(i)
+        ret.append('      <rsc_location id="LOC-{0}" rsc="{1}"'
+                   ' node="{2}" score="100"/>\n'
+                   .format(i, grp, node_ids[i % nodes]))
+        if i:
+            prev = 'GRP-{0}'.format(i - 5) if (i - 5) % 20 else \
+                   'CLN-{0}'.format(i - 5)
+            ret.append('      <rsc_order id="ORD-{0}" first="{1}"'
+                       ' then="{2}"/>\n      <rsc_colocation id="COL-{0}"'
+                       ' rsc="{2}" with-rsc="{1}" score="INFINITY"/>\n'
+                       .format(i, prev, grp))
+    ret.append('    </constraints>\n    <acls>\n')
+    for i in range(0, resources, 10):
+        ret.append('      <acl_role id="ROLE-{0}">\n        <acl_permission'
+                   ' id="ROLE-{0}-read" kind="read" reference="RSC-{0}"/>\n'
+                   '        <acl_permission id="ROLE-{0}-write" kind="write"'
+                   ' xpath="//primitive[@id=\'RSC-{0}\']"/>\n'
+                   '      </acl_role>\n      <acl_target id="user-{0}">'
+                   '<role id="ROLE-{0}"/></acl_target>\n'.format(i))
+    ret.append('    </acls>\n  </configuration>\n  <status/>\n</cib>\n')
+    return ''.join(ret).encode('ascii')
+
+
+def run_chain(filters, chain, in_obj):
+    kws = dict(validator_specs={'': ''}, system='linux',
+               system_extra=('rhel', '7.6'))
+    for name in chain:
+        flt = filters[name]
+        if flt.__class__.name == 'cib2pcscmd':
+            kws.update(pcscmd_verbose=False, pcscmd_tmpcib='')
+        in_obj = flt(flt.in_format.as_instance(in_obj, validator_specs={'':
+                                                                        ''}),
+                     **kws)
+    return in_obj
+
+
+def main(sizes, dump=None):
+    filters = FilterManager.init_lookup(*(CCS2PCS + CIB2PCSCMD)).filters
+    ccs = filters[CCS2PCS[0]].in_format
+    cib = filters[CIB2PCSCMD[0]].in_format
+    simplefilter('ignore')  # extraneous keyword arguments
+    bench_report("chain (best of 3) [s]", *sizes)
+    for name, chain, gen, fmt in (
+        ("ccs2pcs (flattened input)", CCS2PCS, gen_ccsflat, ccs),
+        ("cib2pcscmd", CIB2PCSCMD, gen_cib_xref, cib),
+    ):
+        times = []
+        for size in sizes:
+            in_str = gen(size)
+            t, ret = bench(lambda: run_chain(filters, chain,
+                                             fmt('bytestring', in_str,
+                                                 validator_specs={'': ''})),
+                           repeat=3)
+            times.append(t)
+            if dump:
+                with open(join(dump, '{0}-{1}'.format(chain[-1], size)),
+                          'wb') as f:
+                    f.write(ret('bytestring'))
+        bench_report(name, *times)
+        bench_report("  per resource [ms]",
+                     *(t * 1000 / s for t, s in zip(times, sizes)))
+
+if __name__ == '__main__':
+    dump = [a.split('=', 1)[1] for a in argv[1:] if a.startswith('--dump=')]
+    main([int(a) for a in argv[1:] if not a.startswith('--')]
+         or [100, 1000, 5000], dump=dump[0] if dump else None)
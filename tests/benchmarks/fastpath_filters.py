@@ -0,0 +1,43 @@
+# -*- coding: UTF-8 -*-
+# Copyright 2019 Red Hat, Inc.
+# Part of clufter project
+# Licensed under GPLv2+ (a copy included | http://gnu.org/licenses/gpl-2.0.txt)
+"""Benchmark native fast paths of trivial filters against XSLT"""
+__author__ = "Jan Pokorný <jpokorny @at@ Red Hat .dot. com>"
+
+from os.path import join, dirname; from sys import modules as m  # 2/3 compat
+b = m.get('builtins', m.get('__builtin__')); e, E, h = 'exec', 'execfile', hash
+c = lambda x: compile(x.read(), x.name, 'exec')
+with open(join(dirname(__file__), '_bench')) as f:
+    getattr(b, e, getattr(b, E, h)(f.name).__repr__.__name__.__ne__)(c(f))
+
+
+from warnings import simplefilter
+
+from .filter_manager import FilterManager
+
+flts = ('ccs-disable-rg', 'ccs-version-bump')
+tests_dir = dirname(dirname(__file__))
+
+
+def main():
+    filters = FilterManager.init_lookup(*flts).filters
+    simplefilter('ignore')  # extraneous keyword arguments
+    bench_report("filter on filled.conf (best of 5)", "XSLT [ms]",
+                 "fastpath [ms]", "speedup")
+    for flt in flts:
+        flt_obj = filters[flt]
+        in_obj = flt_obj.in_format('file', join(tests_dir, 'filled.conf'))
+        in_obj('etree')  # parse upfront, not to be measured
+        times, rets = [], []
+        for nofastpath in (True, False):
+            t, ret = bench(lambda: flt_obj(in_obj, nofastpath=nofastpath,
+                                           validator_specs={'': ''}))
+            times.append(t * 1000)
+            rets.append(ret.BYTESTRING())
+        assert rets[0] == rets[1]
+        bench_report(flt, times[0], times[1],
+                     "{0:.0f}x".format(times[0] / times[1]))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,62 @@
+# -*- coding: UTF-8 -*-
+# Copyright 2019 Red Hat, Inc.
+# Part of clufter project
+# Licensed under GPLv2+ (a copy included | http://gnu.org/licenses/gpl-2.0.txt)
+"""Benchmark command run with persistent filter cache cold/warm/disabled"""
+__author__ = "Jan Pokorný <jpokorny @at@ Red Hat .dot. com>"
+
+from os.path import join, dirname; from sys import modules as m  # 2/3 compat
+b = m.get('builtins', m.get('__builtin__')); e, E, h = 'exec', 'execfile', hash
+c = lambda x: compile(x.read(), x.name, 'exec')
+with open(join(dirname(__file__), '_bench')) as f:
+    getattr(b, e, getattr(b, E, h)(f.name).__repr__.__name__.__ne__)(c(f))
+
+
+from os import close, remove
+from shutil import rmtree
+from sys import argv
+from tempfile import mkdtemp, mkstemp
+
+from .utils_prog import getenv_namespaced, setenv_namespaced
+from .command_manager import CommandManager
+
+cmd_name = 'cib2pcscmd'
+cmd = CommandManager.init_lookup(cmd_name).commands[cmd_name]
+
+
+def run(cib, no_cache=False):
+    output = {'passin': 'bytestring'}
+    opts = type('opts', (object, ), dict(input=cib, output=output,
+                                          nocheck=True, batch=True,
+                                          quiet=True, no_cache=no_cache))
+    assert not cmd(opts)
+    return [l for l in output['passout'].splitlines()
+            if not l.startswith(b'# sequence generated')]
+
+
+def main(sizes):
+    bench_report("{0} (best of 5) [s]".format(cmd_name), "no cache", "cold",
+                 "warm", "speedup")
+    filtercache = getenv_namespaced('FILTERCACHE')
+    for size in sizes:
+        fd, cib = mkstemp(suffix='.xml')
+        close(fd)
+        cache_dir = mkdtemp()
+        try:
+            with open(cib, 'wb') as f:
+                f.write(gen_cib(nodes=max(2, size // 100), resources=size))
+            setenv_namespaced('FILTERCACHE', cache_dir)
+            t_none, r_none = bench(lambda: run(cib, no_cache=True))
+            t_cold, r_cold = bench(lambda _: run(cib),
+                                   setup=lambda: rmtree(cache_dir, True))
+            t_warm, r_warm = bench(lambda: run(cib))
+        finally:
+            setenv_namespaced('FILTERCACHE', filtercache)
+            rmtree(cache_dir, True)
+            remove(cib)
+        assert r_none == r_cold == r_warm
+        bench_report("{0} resources".format(size), t_none, t_cold, t_warm,
+                     "{0:.1f}x".format(t_none / t_warm))
+
+if __name__ == '__main__':
+    main([int(a) for a in argv[1:]] or [10, 100, 1000])
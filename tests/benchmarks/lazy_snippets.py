@@ -0,0 +1,79 @@
+# -*- coding: UTF-8 -*-
+# Copyright 2019 Red Hat, Inc.
+# Part of clufter project
+# Licensed under GPLv2+ (a copy included | http://gnu.org/licenses/gpl-2.0.txt)
+"""Benchmark eager vs. lazy loading of snippet modules (uncached walk)
+
+Input uses just a couple of resource agents out of many, hence lazily
+loaded snippets should scale with the input rather than the plugin tree.
+Each run pretends a fresh process (see also walk_schema_index.py).
+"""
+__author__ = "Jan Pokorný <jpokorny @at@ Red Hat .dot. com>"
+
+from os.path import join, dirname; from sys import modules as m  # 2/3 compat
+b = m.get('builtins', m.get('__builtin__')); e, E, h = 'exec', 'execfile', hash
+c = lambda x: compile(x.read(), x.name, 'exec')
+with open(join(dirname(__file__), '_bench')) as f:
+    getattr(b, e, getattr(b, E, h)(f.name).__repr__.__name__.__ne__)(c(f))
+
+
+from .filter import XMLFilter
+from .filter_manager import FilterManager
+from .format import _walk_schema_index_memo
+from .utils_prog import getenv_namespaced, setenv_namespaced
+
+flt = 'ccsflat2cibprelude'
+CCS = b'''\
+<cluster name="bench" config_version="1">
+  <rm>
+    <service name="svc">
+      <ip address="192.168.0.1" monitor_link="on">
+        <fs name="data" device="/dev/sdb1" mountpoint="/srv" fstype="xfs"/>
+      </ip>
+    </service>
+  </rm>
+</cluster>
+'''
+
+
+def fresh_run(fmt):
+    _walk_schema_index_memo.clear()
+    for name in [n for n in m if n.startswith(fmt.namespace + '.')]:
+        del m[name]
+
+
+def traverse(fmt, root_dir, lazy):
+    walk = fmt.walk_schema(root_dir, flt, lazy=lazy)
+    XMLFilter._traverse(None, walk, et=fmt('bytestring', CCS,
+                                          validator_specs={'': ''})('etree'),
+                        walk_default_first='', proceed=lambda *x: x[1])
+    namespace = '.'.join((fmt.namespace, flt))
+    return sum(1 for n, mod in list(m.items()) if mod is not None
+               and n.rsplit('.', 1)[0] == namespace)
+
+
+def main():
+    ccsflat2cibprelude = FilterManager.init_lookup(flt).filters[flt]
+    fmt = ccsflat2cibprelude.in_format
+    root_dir = dirname(m[ccsflat2cibprelude.__module__].__file__)
+    walkcache = getenv_namespaced('WALKCACHE')
+    setenv_namespaced('WALKCACHE', '')
+    bench_report("walk (best of 5) [ms]", "modules", "time")
+    try:
+        fresh_run(fmt)
+        traverse(fmt, root_dir, True)  # index built (all modules loaded)
+        index = dict(_walk_schema_index_memo)  # as if loaded from the disk
+
+        def setup():
+            fresh_run(fmt)
+            _walk_schema_index_memo.update(index)
+
+        for lazy in (False, True):
+            t, loaded = bench(lambda _: traverse(fmt, root_dir, lazy),
+                              setup=setup)
+            bench_report("lazy" if lazy else "eager", loaded, t * 1000)
+    finally:
+        setenv_namespaced('WALKCACHE', walkcache)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,81 @@
+# -*- coding: UTF-8 -*-
+# Copyright 2019 Red Hat, Inc.
+# Part of clufter project
+# Licensed under GPLv2+ (a copy included | http://gnu.org/licenses/gpl-2.0.txt)
+"""Benchmark running independent filter-chain branches in parallel
+
+Note that ccs2pcscmd needs ccs_flatten binary built.
+"""
+__author__ = "Jan Pokorný <jpokorny @at@ Red Hat .dot. com>"
+
+from os.path import join, dirname; from sys import modules as m  # 2/3 compat
+b = m.get('builtins', m.get('__builtin__')); e, E, h = 'exec', 'execfile', hash
+c = lambda x: compile(x.read(), x.name, 'exec')
+with open(join(dirname(__file__), '_bench')) as f:
+    getattr(b, e, getattr(b, E, h)(f.name).__repr__.__name__.__ne__)(c(f))
+
+
+from multiprocessing import cpu_count
+from os import close, remove
+from sys import argv
+from tempfile import mkstemp
+
+from .utils_prog import setenv_namespaced
+setenv_namespaced('NOSALT', 'true')  # deterministic output to compare
+from .command_manager import CommandManager
+
+cmd_name = 'ccs2pcscmd-flatiron'
+cmd = CommandManager.init_lookup(cmd_name).commands[cmd_name]
+
+
+def gen_cluster_conf(nodes, services):
+    """Generate synthetic cluster.conf (bytestring) of desired proportions"""
+    return (
+        '<cluster name="bench" config_version="1"><cman/><clusternodes>'
+        + ''.join('<clusternode name="node-{0:04d}" nodeid="{1}"/>'
+                  .format(i, i + 1) for i in range(nodes))
+        + '</clusternodes><rm><resources>'
+        + ''.join('<ip address="10.{0}.{1}.{2}" monitor_link="on"/>'
+                  .format(i >> 16, (i >> 8) & 255, i & 255)
+                  for i in range(services))
+        + '</resources>'
+        + ''.join('<service name="svc-{0:04d}"><ip ref="10.{1}.{2}.{3}"/>'
+                  '</service>'.format(i, i >> 16, (i >> 8) & 255, i & 255)
+                  for i in range(services))
+        + '</rm></cluster>'
+    ).encode('ascii')
+
+
+def run(conf, jobs):
+    output = {'passin': 'bytestring'}
+    opts = type('opts', (object, ), dict(input=conf, output=output,
+                                          nocheck=True, batch=True,
+                                          quiet=True, jobs=str(jobs)))
+    assert not cmd(opts)
+    return [l for l in output['passout'].splitlines()
+            if not l.startswith(b'# sequence generated')]
+
+
+def main(sizes):
+    jobs = max(2, cpu_count())
+    bench_report("{0} (best of 5) [s]".format(cmd_name), "jobs=1",
+                 "jobs={0}".format(jobs), "speedup")
+    for size in sizes:
+        fd, conf = mkstemp(suffix='.conf')
+        close(fd)
+        try:
+            with open(conf, 'wb') as f:
+                f.write(gen_cluster_conf(max(2, size // 10), size))
+            times, rets = [], []
+            for j in (1, jobs):
+                t, ret = bench(lambda: run(conf, j))
+                times.append(t)
+                rets.append(ret)
+        finally:
+            remove(conf)
+        assert rets[0] == rets[1]
+        bench_report("{0} services".format(size), times[0], times[1],
+                     "{0:.1f}x".format(times[0] / times[1]))
+
+if __name__ == '__main__':
+    main([int(a) for a in argv[1:]] or [10, 100, 500])
@@ -0,0 +1,59 @@
+# -*- coding: UTF-8 -*-
+# Copyright 2019 Red Hat, Inc.
+# Part of clufter project
+# Licensed under GPLv2+ (a copy included | http://gnu.org/licenses/gpl-2.0.txt)
+"""Benchmark parallel transformation of sibling subtrees (jobs > 1)"""
+__author__ = "Jan Pokorný <jpokorny @at@ Red Hat .dot. com>"
+
+from os.path import join, dirname; from sys import modules as m  # 2/3 compat
+b = m.get('builtins', m.get('__builtin__')); e, E, h = 'exec', 'execfile', hash
+c = lambda x: compile(x.read(), x.name, 'exec')
+with open(join(dirname(__file__), '_bench')) as f:
+    getattr(b, e, getattr(b, E, h)(f.name).__repr__.__name__.__ne__)(c(f))
+
+
+from multiprocessing import cpu_count
+from sys import argv
+
+from .utils_prog import setenv_namespaced
+setenv_namespaced('NOSALT', 'true')  # deterministic output to compare
+from .filter_manager import FilterManager
+
+flt = 'ccs2needlexml'
+ccs2needlexml = FilterManager.init_lookup(flt).filters[flt]
+ccs = ccs2needlexml.in_format
+
+
+def gen_cluster_conf(nodes):
+    """Generate synthetic cluster.conf (bytestring) with `nodes` nodes"""
+    return (
+        '<cluster name="bench" config_version="1"><cman/><clusternodes>'
+        + ''.join('<clusternode name="node-{0:04d}" nodeid="{1}"><fence>'
+                  '<method name="m"><device name="fence-{0:04d}"/></method>'
+                  '</fence></clusternode>'.format(i, i + 1)
+                  for i in range(nodes))
+        + '</clusternodes><fencedevices>'
+        + ''.join('<fencedevice name="fence-{0:04d}" agent="fence_xvm"/>'
+                  .format(i) for i in range(nodes))
+        + '</fencedevices><rm/></cluster>'
+    ).encode('ascii')
+
+
+def main(sizes):
+    jobs = max(2, cpu_count())
+    bench_report("{0} (best of 5) [s]".format(flt), "jobs=1",
+                 "jobs={0}".format(jobs), "speedup")
+    for size in sizes:
+        conf = gen_cluster_conf(size)
+        times, rets = [], []
+        for j in (1, jobs):
+            t, ret = bench(lambda: ccs2needlexml(ccs('bytestring', conf),
+                                                 jobs=j)('bytestring'))
+            times.append(t)
+            rets.append(ret)
+        assert rets[0] == rets[1]
+        bench_report("{0} nodes".format(size), times[0], times[1],
+                     "{0:.1f}x".format(times[0] / times[1]))
+
+if __name__ == '__main__':
+    main([int(a) for a in argv[1:]] or [100, 500, 2000])
@@ -0,0 +1,117 @@
+# -*- coding: UTF-8 -*-
+# Copyright 2019 Red Hat, Inc.
+# Part of clufter project
+# Licensed under GPLv2+ (a copy included | http://gnu.org/licenses/gpl-2.0.txt)
+"""Benchmark size and compile time of the stylesheets of *2pcscmd filters"""
+__author__ = "Jan Pokorný <jpokorny @at@ Red Hat .dot. com>"
+
+from os.path import join, dirname; from sys import modules as m  # 2/3 compat
+b = m.get('builtins', m.get('__builtin__')); e, E, h = 'exec', 'execfile', hash
+c = lambda x: compile(x.read(), x.name, 'exec')
+with open(join(dirname(__file__), '_bench')) as f:
+    getattr(b, e, getattr(b, E, h)(f.name).__repr__.__name__.__ne__)(c(f))
+
+
+from functools import reduce
+from timeit import default_timer
+from warnings import simplefilter
+
+from lxml import etree
+
+from .filter_manager import FilterManager
+from .utils_lxml import XSLTCache, etree_XSLT_safe
+
+tests_dir = dirname(dirname(__file__))
+
+
+# on top of filled.cib, to have (nearly) every snippet involved
+CIB_EXTRA = (
+    ('<crm_config/>', '''<crm_config>
+      <cluster_property_set id="cib-bootstrap-options">
+        <nvpair id="cib-bootstrap-options-no-quorum-policy"
+                name="no-quorum-policy" value="freeze"/>
+      </cluster_property_set>
+    </crm_config>'''),
+    ('<constraints/>', '''<constraints>
+      <rsc_location id="location-memcached" rsc="memcached-clone"
+                    node="virt-063" score="100"/>
+      <rsc_colocation id="colocation-ip-memcached" score="INFINITY"
+                      rsc="SERVICE-svc-GROUP" with-rsc="memcached-clone"/>
+      <rsc_order id="order-memcached-ip" first="memcached-clone"
+                 then="SERVICE-svc-GROUP"/>
+      <rsc_ticket id="ticket-memcached" rsc="memcached-clone" ticket="T"/>
+    </constraints>
+    <fencing-topology>
+      <fencing-level id="fl-virt-063-1" target="virt-063" index="1"
+                     devices="FENCEDEV-fence-virt-063"/>
+    </fencing-topology>
+    <acls>
+      <acl_role id="observer">
+        <acl_permission id="observer-read" kind="read" xpath="/cib"/>
+      </acl_role>
+      <acl_target id="alice"><role id="observer"/></acl_target>
+      <acl_group id="watchmen"><role id="observer"/></acl_group>
+    </acls>
+    <alerts>
+      <alert id="alert-log" path="/usr/share/pacemaker/alerts/alert_file.sh">
+        <recipient id="alert-log-recipient" value="/var/log/alerts.log"/>
+      </alert>
+    </alerts>'''),
+    ('pacemaker-1.2', 'pacemaker-3.0'),
+)
+
+
+class RecordingXSLTCache(XSLTCache):
+    """Stand-in for etree_XSLT_cached, compiling (and measuring) each time"""
+    def __init__(self):
+        super(RecordingXSLTCache, self).__init__(0)
+        self.sizes, self.times = [], []
+
+    def __call__(self, xslt_input, **kwargs):
+        self.sizes.append(len(etree.tostring(xslt_input)))
+        start = default_timer()
+        ret = etree_XSLT_safe(xslt_input, **kwargs)
+        self.times.append(default_timer() - start)
+        return ret
+
+
+def main():
+    flt_module = m[FilterManager.__module__.rsplit('.', 1)[0] + '.filter']
+    filters = FilterManager.init_lookup(
+        'ccs2needlexml', 'ccs2ccs-pcmk', 'cib2pcscmd', 'ccspcmk2pcscmd',
+        'needlexml2pcscmd', 'needleqdevicexml2pcscmd',
+    ).filters
+    ccs = filters['ccs2needlexml'].in_format('file',
+                                             join(tests_dir, 'filled.conf'))
+    with open(join(tests_dir, 'filled.cib')) as f:
+        cib_str = reduce(lambda s, r: s.replace(*r), CIB_EXTRA, f.read())
+    inputs = dict(
+        cib2pcscmd=cib_str.encode('ascii'),
+        ccspcmk2pcscmd=filters['ccs2ccs-pcmk'](ccs)('bytestring'),
+        needlexml2pcscmd=filters['ccs2needlexml'](ccs)('bytestring'),
+    )
+    inputs['needleqdevicexml2pcscmd'] = inputs['needlexml2pcscmd']
+
+    simplefilter('ignore')  # extraneous keyword arguments
+    orig = flt_module.etree_XSLT_cached
+    bench_report("filter (verbose, best of 5)", "sheets", "total [B]",
+                 "max [B]", "compile [s]")
+    try:
+        for name in sorted(inputs):
+            flt, in_obj = filters[name], inputs[name]
+            in_obj = flt.in_format('bytestring', in_obj,
+                                   validator_specs={'': ''})
+            best = None
+            for _ in range(5):
+                flt_module.etree_XSLT_cached = rec = RecordingXSLTCache()
+                flt(in_obj, pcscmd_verbose=True, system='linux',
+                    system_extra=('rhel', '8.0'), validator_specs={'': ''})
+                if best is None or sum(rec.times) < sum(best.times):
+                    best = rec
+            bench_report(name, len(best.sizes), sum(best.sizes),
+                         max(best.sizes), sum(best.times))
+    finally:
+        flt_module.etree_XSLT_cached = orig
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,110 @@
+# -*- coding: UTF-8 -*-
+# Copyright 2019 Red Hat, Inc.
+# Part of clufter project
+# Licensed under GPLv2+ (a copy included | http://gnu.org/licenses/gpl-2.0.txt)
+"""Benchmark peak RSS of commands with intermediate outputs released/kept
+
+As the peak RSS can only grow over the life of the process, each run
+takes place in a fresh interpreter (this very script, other mode), and
+the best of REPEAT runs is reported (the allocator may place the trees
+differently run to run, noticeably with PY2).
+Cases: cib2pcscmd, and ccs2pcs from flattened input (as in cib_scaling,
+i.e., sans ccs2ccsflat and its external ccs_flatten binary, and sans
+the Corosync branch), both with the number of resources per arguments.
+"""
+__author__ = "Jan Pokorný <jpokorny @at@ Red Hat .dot. com>"
+
+from os.path import join, dirname; from sys import modules as m  # 2/3 compat
+b = m.get('builtins', m.get('__builtin__')); e, E, h = 'exec', 'execfile', hash
+c = lambda x: compile(x.read(), x.name, 'exec')
+with open(join(dirname(__file__), '_bench')) as f:
+    getattr(b, e, getattr(b, E, h)(f.name).__repr__.__name__.__ne__)(c(f))
+
+
+from os import close, environ, remove
+from resource import RUSAGE_SELF, getrusage
+from subprocess import PIPE, Popen
+from sys import argv, executable
+from tempfile import mkstemp
+
+from .command import Command
+from .commands._chains_pcs import ccsflat2cibfinal_chain, \
+                                  ccsflat2cibfinal_output
+from .protocol import protocols
+
+# ccs2pcs sans ccs2ccsflat (external ccs_flatten binary), see _chains_pcs
+CCS2PCS = ('ccs-revitalize', 'ccsflat2cibprelude', 'cibprelude2cibcompact',
+           'cibcompact2cib', 'cib2cibfinal')
+REPEAT = 3
+
+
+@Command.deco(ccsflat2cibfinal_chain)
+def ccsflat2cib(cmd_ctxt, input='cluster.conf', cib='cib.xml'):
+    file_proto = protocols.plugins['file'].ensure_proto
+    return (
+        file_proto(input),
+        ccsflat2cibfinal_output(file_proto(cib)),
+    )
+
+
+def cmd_cib2pcscmd():
+    from .command_manager import CommandManager
+    return (CommandManager.init_lookup('cib2pcscmd').commands['cib2pcscmd'],
+            'output')
+
+
+def cmd_ccs2pcs():
+    from .filter_manager import FilterManager
+    return ccsflat2cib(FilterManager.init_lookup(*CCS2PCS).plugins), 'cib'
+
+
+CASES = (
+    ('cib2pcscmd', cmd_cib2pcscmd,
+     lambda size: gen_cib(nodes=max(2, size // 100), resources=size)),
+    ('ccs2pcs (flattened input)', cmd_ccs2pcs, gen_ccsflat),
+)
+
+
+def child(case, infile, keep):
+    """Run the command, return its peak RSS (KiB)"""
+    cmd, output = dict((n, c) for n, c, _ in CASES)[case]()
+    opts = type('opts', (object, ), {
+        'input': infile, output: {'passin': 'bytestring'},
+        'nocheck': True, 'batch': True, 'quiet': True, 'keep_outputs': keep,
+    })
+    assert not cmd(opts)
+    return getrusage(RUSAGE_SELF).ru_maxrss
+
+
+def run(case, infile, keep):
+    proc = Popen([executable, __file__, '--child', case, infile,
+                  str(int(keep))],
+                 stdout=PIPE, env=dict(environ, LOGLEVEL='WARNING'))
+    out, _ = proc.communicate()
+    assert proc.returncode == 0, "{0}: child exited with {1}".format(
+        case, proc.returncode)  # e.g. -9 when killed as out of memory
+    return int(out.split()[-1])
+
+
+def main(sizes):
+    for case, _, gen in CASES:
+        bench_report("{0} peak RSS [KiB]".format(case), "released", "kept",
+                     "saved")
+        for size in sizes:
+            fd, infile = mkstemp(suffix='.xml')
+            close(fd)
+            try:
+                with open(infile, 'wb') as f:
+                    f.write(gen(size))
+                rss = [min(run(case, infile, keep) for _ in range(REPEAT))
+                       for keep in (False, True)]
+            finally:
+                remove(infile)
+            bench_report("{0} resources".format(size), rss[0], rss[1],
+                         "{0:.1%}".format(1 - float(rss[0]) / rss[1]))
+
+if __name__ == '__main__':
+    if argv[1:2] == ['--child']:
+        print(child(argv[2], argv[3], bool(int(argv[4]))))
+    else:
+        main([int(a) for a in argv[1:]] or [100, 1000, 5000])
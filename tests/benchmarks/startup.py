@@ -0,0 +1,163 @@
+# -*- coding: UTF-8 -*-
+# Copyright 2019 Red Hat, Inc.
+# Part of clufter project
+# Licensed under GPLv2+ (a copy included | http://gnu.org/licenses/gpl-2.0.txt)
+"""Benchmark startup cost of the typical invocations, optionally on budget
+
+Each case is run in a fresh interpreter (best of REPEAT wall times is
+picked), instrumented with _startup so as to break the time down into
+imports (per module, self and cumulative), plugin discovery, filter
+resolution and option-parser construction (these overlap with imports
+as the discovery loads the plugin modules).  Note that the instrumentation
+itself adds some overhead.
+
+Results are emitted as JSON (to stdout unless --output), a case failing
+to run (in any of the repeated runs) is marked with `failed' and carries
+no timings, just the exit code.  The exit code of the script is non-zero
+when any case failed or, with --budget, when any metric exceeds the
+respective limit (all reported to stderr).  Budget file maps
+case names to {metric: limit}, where metric is one of `wall', `total',
+`imports', `discovery', `resolution', `options' (seconds) or `modules'
+(count of modules imported anew).
+
+Note that ccs2pcscmd needs ccs_flatten binary built.
+"""
+__author__ = "Jan Pokorný <jpokorny @at@ Red Hat .dot. com>"
+
+from os.path import join, dirname; from sys import modules as m  # 2/3 compat
+b = m.get('builtins', m.get('__builtin__')); e, E, h = 'exec', 'execfile', hash
+c = lambda x: compile(x.read(), x.name, 'exec')
+with open(join(dirname(__file__), '_bench')) as f:
+    getattr(b, e, getattr(b, E, h)(f.name).__repr__.__name__.__ne__)(c(f))
+
+
+from json import dump, load
+from optparse import OptionParser
+from os import close, devnull, remove
+from os.path import abspath
+from platform import python_version
+from shutil import rmtree
+from subprocess import call
+from sys import executable, exit, stderr, stdout
+from tempfile import mkdtemp, mkstemp
+
+here = dirname(abspath(__file__))
+pkg_dir = dirname(dirname(here))
+tests_dir = dirname(here)
+
+CASES = (
+    ('version', ('--version', )),
+    ('list', ('--list', )),
+    ('help', ('ccs2pcscmd', '--help')),
+    ('convert', ('ccs2pcscmd', '-i', join(tests_dir, 'empty.conf'),
+                 '-o', '{tmp}/out.sh')),
+    ('convert-cib', ('cib2pcscmd', '-i', '{tmp}/in.cib', '-o', '{tmp}/out.sh')),
+)
+METRICS = ('wall', 'total', 'imports', 'discovery', 'resolution', 'options')
+
+
+def run_case(args, tmp):
+    """Single instrumented run, returns its results incl. wall time"""
+    fd, result_file = mkstemp(dir=tmp, suffix='.json')
+    close(fd)
+    args = [a.format(tmp=tmp) for a in args]
+    with open(devnull, 'w') as null:
+        wall, ec = bench(lambda: call(
+            [executable, join(here, '_startup'), result_file, dirname(pkg_dir),
+             __package__.split('.')[0], join(pkg_dir, 'run-dev')] + args,
+            stdout=null, stderr=null
+        ), repeat=1)
+    try:
+        with open(result_file) as f:
+            ret = load(f)
+    except ValueError:  # empty, the run went wrong
+        ret = dict(exit=ec)
+    finally:
+        remove(result_file)
+    ret['wall'] = wall
+    return ret
+
+
+def run_cases(cases, repeat, tmp):
+    ret = {}
+    for name, args in cases:
+        runs = [run_case(args, tmp) for _ in range(repeat)]
+        failed = [r['exit'] for r in runs if r['exit']]
+        if failed:  # no timings, these would look valid
+            ret[name] = dict(argv=args, exit=failed[0], failed=True)
+        else:
+            ret[name] = dict(min(runs, key=lambda r: r['wall']), argv=args)
+    return ret
+
+
+def report(results, top=5):
+    bench_report("case (best run) [ms]", *(METRICS + ('modules', )))
+    for name, r in sorted(results.items()):
+        if r.get('failed'):
+            bench_report(name, "failed ({0})".format(r['exit']))
+            continue
+        bench_report(name, *[(r[k] if k == 'wall' else r['phases'][k]) * 1000
+                             for k in METRICS] + [r['modules']])
+        for module, (own, cumulative) in sorted(
+            r['imports'].items(), key=lambda i: i[1][0], reverse=True
+        )[:top]:
+            bench_report("  " + module, "self", own * 1000,
+                         "cumulative", cumulative * 1000)
+
+
+def check_budget(results, budget):
+    """Return list of failed cases and budget violations as strings"""
+    ret = ["{0}: failed to run ({1})".format(name, r['exit'])
+           for name, r in sorted(results.items()) if r.get('failed')]
+    for name, limits in sorted(budget.items()):
+        r = results.get(name)
+        if r is None or r.get('failed'):
+            continue
+        for metric, limit in sorted(limits.items()):
+            value = r[metric] if metric in ('wall', 'modules') \
+                    else r['phases'][metric]
+            if value > limit:
+                ret.append("{0}: {1} {2:.4g} exceeds budget {3:.4g}"
+                           .format(name, metric, value, limit))
+    return ret
+
+
+def main():
+    parser = OptionParser(usage="%prog [options] [CASE ...]",
+                          description="Cases: " + ', '.join(n for n, _ in CASES))
+    parser.add_option('-n', '--repeat', type='int', default=5,
+                      help="runs per case [%default]")
+    parser.add_option('-o', '--output', metavar="FILE",
+                      help="emit JSON to FILE (and a summary to stdout)")
+    parser.add_option('-b', '--budget', metavar="FILE",
+                      help="check results against budget FILE")
+    opts, args = parser.parse_args()
+    cases = [c for c in CASES if not args or c[0] in args]
+    budget = {}
+    if opts.budget:
+        with open(opts.budget) as f:
+            budget = load(f)
+
+    tmp = mkdtemp()
+    try:
+        with open(join(tmp, 'in.cib'), 'wb') as f:
+            f.write(gen_cib(nodes=1, resources=1, status=False))
+        results = run_cases(cases, opts.repeat, tmp)
+    finally:
+        rmtree(tmp)
+
+    out = dict(python=python_version(), repeat=opts.repeat, cases=results)
+    if opts.output:
+        with open(opts.output, 'w') as f:
+            dump(out, f, indent=1, separators=(',', ': '), sort_keys=True)
+        report(results)
+    else:
+        dump(out, stdout, indent=1, separators=(',', ': '), sort_keys=True)
+        stdout.write('\n')
+    violations = check_budget(results, budget)
+    for v in violations:
+        stderr.write(v + "\n")
+    return int(bool(violations))
+
+if __name__ == '__main__':
+    exit(main())
@@ -0,0 +1,67 @@
+# -*- coding: UTF-8 -*-
+# Copyright 2019 Red Hat, Inc.
+# Part of clufter project
+# Licensed under GPLv2+ (a copy included | http://gnu.org/licenses/gpl-2.0.txt)
+"""Benchmark startup: resolving just the command's closure vs. everything
+
+Each measurement is carried out in a fresh interpreter (best of 5).
+"""
+__author__ = "Jan Pokorný <jpokorny @at@ Red Hat .dot. com>"
+
+from os.path import join, dirname; from sys import modules as m  # 2/3 compat
+b = m.get('builtins', m.get('__builtin__')); e, E, h = 'exec', 'execfile', hash
+c = lambda x: compile(x.read(), x.name, 'exec')
+with open(join(dirname(__file__), '_bench')) as f:
+    getattr(b, e, getattr(b, E, h)(f.name).__repr__.__name__.__ne__)(c(f))
+
+
+from os import close, devnull, remove
+from os.path import abspath
+from subprocess import PIPE, Popen
+from sys import executable
+from tempfile import mkstemp
+
+pkg_dir = dirname(dirname(dirname(abspath(__file__))))
+RUN = ("import sys; sys.path.insert(0, {0!r});"
+       " from {1}.main import run; sys.exit(run([{2!r}] + sys.argv[1:]))")
+RESOLVE = ("import sys; sys.path.insert(0, {0!r}); from time import time;"
+           " from {1}.command_manager import CommandManager; t = time();"
+           " CommandManager.init_lookup(*sys.argv[1:]); print(time() - t)")
+
+
+def python(code, *args):
+    code = code.format(dirname(pkg_dir), __package__.split('.')[0],
+                       join(pkg_dir, 'run-dev'))
+    with open(devnull, 'w') as null:
+        proc = Popen((executable, '-c', code) + args, stdout=PIPE,
+                     stderr=null)
+        return proc.communicate()[0]
+
+
+def main():
+    fd, cib = mkstemp(suffix='.cib')
+    close(fd)
+    with open(cib, 'wb') as f:
+        f.write(gen_cib(nodes=1, resources=1, status=False))
+    try:
+        bench_report("case (best of 5) [ms]", "wall")
+        for case, args in (
+            ("--version", ('--version', )),
+            ("--list (all resolved)", ('--list', )),
+            ("cib2pcscmd --help", ('cib2pcscmd', '--help')),
+            ("ccs2pcscmd --help (alias)", ('ccs2pcscmd', '--help')),
+            ("cib2pcscmd (1 resource)", ('cib2pcscmd', '-i', cib, '-o',
+                                         devnull)),
+        ):
+            bench_report(case, bench(lambda: python(RUN, *args))[0] * 1000)
+
+        bench_report("resolution (best of 5) [ms]", "closure", "all")
+        for cmd in ('cib2pcscmd', 'ccs2pcscmd', 'ccs-obfuscate'):
+            times = [min(float(python(RESOLVE, *a)) for _ in range(5)) * 1000
+                     for a in ((cmd, ), ())]
+            bench_report(cmd, *times)
+    finally:
+        remove(cib)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,60 @@
+# -*- coding: UTF-8 -*-
+# Copyright 2019 Red Hat, Inc.
+# Part of clufter project
+# Licensed under GPLv2+ (a copy included | http://gnu.org/licenses/gpl-2.0.txt)
+"""Benchmark overhead of the structured tracing (disabled and enabled)"""
+__author__ = "Jan Pokorný <jpokorny @at@ Red Hat .dot. com>"
+
+from os.path import join, dirname; from sys import modules as m  # 2/3 compat
+b = m.get('builtins', m.get('__builtin__')); e, E, h = 'exec', 'execfile', hash
+c = lambda x: compile(x.read(), x.name, 'exec')
+with open(join(dirname(__file__), '_bench')) as f:
+    getattr(b, e, getattr(b, E, h)(f.name).__repr__.__name__.__ne__)(c(f))
+
+
+from functools import partial
+from os import devnull
+from sys import argv
+from warnings import simplefilter
+
+from .filter import XMLFilter
+from .filter_manager import FilterManager
+from .utils_xslt import XSLTTrace
+
+flt = 'cib2pcscmd'
+cib2pcscmd = FilterManager.init_lookup(flt).filters[flt]
+cib = cib2pcscmd.in_format
+flt_dir = dirname(m[cib2pcscmd.__module__].__file__)
+
+
+def traverse(in_obj, trace=None):
+    # traversal proper, proceeding with the elements is made trivial
+    return XMLFilter.proceed(in_obj, root_dir=flt_dir, symbol=flt,
+                             proceed=lambda s, elem, children: elem,
+                             trace=trace and partial(trace, flt))
+
+
+def convert(in_obj, trace=None):
+    return cib2pcscmd(in_obj, pcscmd_verbose=False, pcscmd_tmpcib='',
+                      system='linux', system_extra=('rhel', '7.3'),
+                      trace=trace)
+
+
+def main(sizes):
+    simplefilter('ignore')  # extraneous keyword arguments
+    bench_report("stage (best of 5) [s]", "events", "disabled", "enabled",
+                 "ratio")
+    for size in sizes:
+        in_str = gen_cib(nodes=16, resources=size, status=False)
+        for name, fnc in (("traverse", traverse), ("cib2pcscmd", convert)):
+            times, trace = [], XSLTTrace(devnull)
+            for t in (None, trace):
+                times.append(bench(lambda in_obj: fnc(in_obj, trace=t),
+                                   setup=lambda: cib('bytestring', in_str))[0])
+            trace.close()
+            bench_report("{0} ({1} resources)".format(name, size),
+                         trace.events // 5, times[0], times[1],
+                         "{0:.2f}x".format(times[1] / times[0]))
+
+if __name__ == '__main__':
+    main([int(a) for a in argv[1:]] or [100, 1000, 3000])
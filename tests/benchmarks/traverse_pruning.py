@@ -0,0 +1,71 @@
+# -*- coding: UTF-8 -*-
+# Copyright 2019 Red Hat, Inc.
+# Part of clufter project
+# Licensed under GPLv2+ (a copy included | http://gnu.org/licenses/gpl-2.0.txt)
+"""Benchmark walk-driven subtree pruning in XMLFilter._traverse"""
+__author__ = "Jan Pokorný <jpokorny @at@ Red Hat .dot. com>"
+
+from os.path import join, dirname; from sys import modules as m  # 2/3 compat
+b = m.get('builtins', m.get('__builtin__')); e, E, h = 'exec', 'execfile', hash
+c = lambda x: compile(x.read(), x.name, 'exec')
+with open(join(dirname(__file__), '_bench')) as f:
+    getattr(b, e, getattr(b, E, h)(f.name).__repr__.__name__.__ne__)(c(f))
+
+
+from sys import argv
+
+from lxml import etree
+
+from .filter import XMLFilter
+from .filter_manager import FilterManager
+
+flt = 'cib2pcscmd'
+cib2pcscmd = FilterManager.init_lookup(flt).filters[flt]
+cib = cib2pcscmd.in_format
+flt_dir = dirname(m[cib2pcscmd.__module__].__file__)
+
+
+def full_walk(et):
+    # what the traversal used to visit at least: every single element
+    cnt = 0
+    for _ in etree.iterwalk(et, events=('start', 'end')):
+        cnt += 1
+    return cnt
+
+
+def traverse(in_obj):
+    # traversal proper, proceeding with the elements is made trivial
+    return XMLFilter.proceed(in_obj, root_dir=flt_dir, symbol=flt,
+                             proceed=lambda s, elem, children: elem)
+
+
+def convert(in_obj):
+    return cib2pcscmd(in_obj, pcscmd_verbose=False, pcscmd_tmpcib='',
+                      system='linux', system_extra=('rhel', '7.3'))
+
+
+def main(sizes):
+    bench_report("stage (best of 5) [s]", "size [kiB]", "status/conf",
+                 "no status", "w/ status")
+    for size in sizes:
+        cibs = [gen_cib(nodes=16, resources=size, status=s)
+                for s in (False, True)]
+        kib = len(cibs[1]) >> 10
+        ratio = "{0:.1f}x".format(float(len(cibs[1])) / len(cibs[0]))
+        objs = lambda: [cib('bytestring', c) for c in cibs]
+        ets = [etree.ElementTree(etree.XML(c)) for c in cibs]
+        bench_report("full iterwalk ({0} resources)".format(size), kib, ratio,
+                     *(bench(full_walk, setup=lambda: et)[0] for et in ets))
+        rets = []
+        for name, fnc in (("traverse", traverse), ("cib2pcscmd", convert)):
+            times = []
+            for i in range(2):
+                t, ret = bench(fnc, setup=lambda: objs()[i])
+                times.append(t)
+                rets.append(ret)
+            bench_report("{0} ({1} resources)".format(name, size), kib,
+                         ratio, *times)
+        assert rets[2].BYTESTRING() == rets[3].BYTESTRING()
+
+if __name__ == '__main__':
+    main([int(a) for a in argv[1:]] or [100, 1000, 3000])
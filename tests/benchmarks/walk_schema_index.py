@@ -0,0 +1,59 @@
+# -*- coding: UTF-8 -*-
+# Copyright 2019 Red Hat, Inc.
+# Part of clufter project
+# Licensed under GPLv2+ (a copy included | http://gnu.org/licenses/gpl-2.0.txt)
+"""Benchmark schema walks: index being built vs loaded from the disk cache
+
+Each run pretends a fresh process: the in-process index memo is dropped
+and so are the snippet modules loaded so far.
+"""
+__author__ = "Jan Pokorný <jpokorny @at@ Red Hat .dot. com>"
+
+from os.path import join, dirname; from sys import modules as m  # 2/3 compat
+b = m.get('builtins', m.get('__builtin__')); e, E, h = 'exec', 'execfile', hash
+c = lambda x: compile(x.read(), x.name, 'exec')
+with open(join(dirname(__file__), '_bench')) as f:
+    getattr(b, e, getattr(b, E, h)(f.name).__repr__.__name__.__ne__)(c(f))
+
+
+from shutil import rmtree
+from sys import argv
+from tempfile import mkdtemp
+
+from .format import _walk_schema_index_memo
+from .filter_manager import FilterManager
+from .utils_prog import cli_undecor, getenv_namespaced, setenv_namespaced
+
+
+def fresh_run(fmt):
+    _walk_schema_index_memo.clear()
+    for name in [n for n in m if n.startswith(fmt.namespace + '.')]:
+        del m[name]
+
+
+def main(names):
+    filters = FilterManager.init_lookup(*names).filters
+    walkcache, cache_dir = getenv_namespaced('WALKCACHE'), mkdtemp()
+    bench_report("filter (best of 5) [ms]", "built", "indexed", "speedup")
+    try:
+        for name in names:
+            flt = filters[name]
+            fmt = flt.in_format
+            root_dir = dirname(m[flt.__module__].__file__)
+            symbol = cli_undecor(flt.__class__.name)
+            walk = lambda *_: fmt._walk_schema(root_dir, symbol)
+            times = []
+            for cache in ('', cache_dir):
+                setenv_namespaced('WALKCACHE', cache)
+                walk()  # populate the cache, if any
+                times.append(bench(walk, setup=lambda: fresh_run(fmt))[0]
+                             * 1000)
+            bench_report(name, times[0], times[1],
+                         "{0:.1f}x".format(times[0] / times[1]))
+    finally:
+        setenv_namespaced('WALKCACHE', walkcache)
+        rmtree(cache_dir)
+
+if __name__ == '__main__':
+    main(argv[1:] or ['ccs2needlexml', 'ccsflat2cibprelude', 'cib2pcscmd',
+                      'cibcompact2cib', 'ccs-obfuscate-identifiers'])
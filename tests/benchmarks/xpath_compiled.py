@@ -0,0 +1,64 @@
+# -*- coding: UTF-8 -*-
+# Copyright 2019 Red Hat, Inc.
+# Part of clufter project
+# Licensed under GPLv2+ (a copy included | http://gnu.org/licenses/gpl-2.0.txt)
+"""Micro-benchmark precompiled XPath expressions against ad-hoc ones"""
+__author__ = "Jan Pokorný <jpokorny @at@ Red Hat .dot. com>"
+
+from os.path import join, dirname; from sys import modules as m  # 2/3 compat
+b = m.get('builtins', m.get('__builtin__')); e, E, h = 'exec', 'execfile', hash
+c = lambda x: compile(x.read(), x.name, 'exec')
+with open(join(dirname(__file__), '_bench')) as f:
+    getattr(b, e, getattr(b, E, h)(f.name).__repr__.__name__.__ne__)(c(f))
+
+
+from lxml import etree
+
+from .utils_xml import NAMESPACES
+from .utils_xpath import xpath_clufter_comment, xpath_cman_nodes, \
+                         xpath_pi_named, xpath_rng_element, xpath_root_pi
+
+tests_dir = dirname(dirname(__file__))
+LOOPS = 1000
+
+
+def main():
+    with open(join(tests_dir, 'filled.conf')) as f:
+        ccs = etree.parse(f)
+    with open(join(tests_dir, 'corosync.rng')) as f:
+        rng = etree.parse(f)
+    snippet = etree.ElementTree(etree.XML(
+        '<clufter:snippet xmlns:clufter="{0}"><a><clufter:comment/></a>'
+        '<?clufter-comment x?></clufter:snippet>'.format(NAMESPACES['clufter'])
+    ))
+    cases = (
+        ("cman nodes", ccs,
+         lambda et: et.xpath('/cluster/clusternodes/clusternode'),
+         xpath_cman_nodes),
+        ("rng element", rng,
+         lambda et: etree.ETXPath(
+             "/{{{0}}}grammar//{{{0}}}element[@name = 'totem']"
+             .format(NAMESPACES['rng']))(et),
+         lambda et: xpath_rng_element(et, name='totem')),
+        ("root PIs", ccs,
+         lambda et: et.xpath("/*/processing-instruction()"),
+         xpath_root_pi),
+        ("clufter:comment", snippet,
+         lambda et: et.xpath("//clufter:comment",
+                             namespaces={'clufter': NAMESPACES['clufter']}),
+         xpath_clufter_comment),
+        ("named PI", snippet,
+         lambda et: et.xpath("//processing-instruction('clufter-comment')"),
+         lambda et: xpath_pi_named(et, name='clufter-comment')),
+    )
+    bench_report("expression ({0} evaluations)".format(LOOPS), "ad-hoc [ms]",
+                 "compiled [ms]", "speedup")
+    for name, et, adhoc, compiled in cases:
+        assert adhoc(et) == compiled(et)
+        times = [bench(lambda: [fnc(et) for _ in range(LOOPS)])[0] * 1000
+                 for fnc in (adhoc, compiled)]
+        bench_report(name, times[0], times[1],
+                     "{0:.1f}x".format(times[0] / times[1]))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,68 @@
+# -*- coding: UTF-8 -*-
+# Copyright 2019 Red Hat, Inc.
+# Part of clufter project
+# Licensed under GPLv2+ (a copy included | http://gnu.org/licenses/gpl-2.0.txt)
+"""Benchmark XSLT result postprocessing: in-tree vs serialize & re-parse"""
+__author__ = "Jan Pokorný <jpokorny @at@ Red Hat .dot. com>"
+
+from os.path import join, dirname; from sys import modules as m  # 2/3 compat
+b = m.get('builtins', m.get('__builtin__')); e, E, h = 'exec', 'execfile', hash
+c = lambda x: compile(x.read(), x.name, 'exec')
+with open(join(dirname(__file__), '_bench')) as f:
+    getattr(b, e, getattr(b, E, h)(f.name).__repr__.__name__.__ne__)(c(f))
+
+
+from sys import argv
+
+from lxml import etree
+
+from .utils_lxml import etree_parser_safe, etree_parser_safe_unblanking, \
+                        etree_standalone
+from .utils_xml import XSL_NS, nselem
+from .utils_xslt import xslt_identity
+
+identity = nselem(XSL_NS, 'stylesheet', version="1.0")
+identity.append(etree.XML(xslt_identity('')))
+identity = etree.XSLT(identity)
+
+
+def result_tree(cib):
+    # what a filter stage ends up with: a fresh XSLT result tree
+    return identity(etree.XML(cib))
+
+
+def standalone_roundtrip(ret):
+    # how postprocess used to get rid of the unneeded namespaces
+    ret = etree.fromstring(etree.tostring(ret), parser=etree_parser_safe)
+    etree.cleanup_namespaces(ret)
+    return ret
+
+
+def unblanked(ret):
+    # filter_proceed_xslt (not raw) step, prerequisite of pretty printing
+    return etree.fromstring(etree.tostring(ret),
+                            parser=etree_parser_safe_unblanking)
+
+
+def main(sizes):
+    bench_report("stage (best of 5) [s]", "size [kiB]", "round trip",
+                 "in-tree", "speedup")
+    for size in sizes:
+        cib = gen_cib(nodes=16, resources=size)
+        kib = len(cib) >> 10
+        setup = lambda: result_tree(cib)
+        for name, old, new in (
+            ("postprocess", standalone_roundtrip, etree_standalone),
+            ("postprocess+unblanking",
+             lambda r: unblanked(standalone_roundtrip(r)),
+             lambda r: unblanked(etree_standalone(r))),
+        ):
+            t_old, r_old = bench(old, setup=setup)
+            t_new, r_new = bench(new, setup=setup)
+            assert (etree.tostring(r_old.getroottree())
+                    == etree.tostring(r_new.getroottree()))
+            bench_report("{0} ({1} resources)".format(name, size), kib,
+                         t_old, t_new, "{0:.1f}x".format(t_old / t_new))
+
+if __name__ == '__main__':
+    main([int(a) for a in argv[1:]] or [100, 1000, 3000])
@@ -24,8 +24,12 @@ from unittest import TestCase
 from os.path import dirname, join
 from os import remove, stat
 
+from optparse import OptionParser
+
 from .command import Command, CommandError
+from .command_manager import CommandManager
 from .filter_manager import FilterManager
+from .utils_prog import make_options
 
 from .format import formats
 formats = formats.plugins
@@ -194,6 +198,139 @@ class ChainResolve(TestCase):
             continue
 
 
+class ParserOptions(TestCase):
+    def tearDown(self):
+        CommandManager._default_registry.setup(True)  # start from scratch
+
+    def testShortOptionsKept(self):
+        # expert (underscored) options do not claim any short option
+        commands = CommandManager.init_lookup('ccs2pcscmd').commands
+        cmd = commands[commands['ccs2pcscmd']]  # alias
+        parser = OptionParser()
+        _, options = cmd.parser_desc_opts(opt_group=parser)
+        parser.add_options(make_options(options))
+        opts, _ = parser.parse_args(['-x', '-i', 'tests/filled.conf',
+                                     '-o', 'out.sh'])
+        self.assertTrue(opts.set_exec)
+        self.assertEqual(opts.input, 'tests/filled.conf')
+
+
+class ExecutionPlan(TestCase):
+    def testPlanOrderAndCaching(self):
+        names = ('ccs2ccsflat', 'ccsflat2cibprelude', 'ccs2needlexml')
+        # feeders are scheduled on-demand, only then the very terminal
+        @Command.deco(('ccs2ccsflat',
+                          ('ccsflat2cibprelude'),
+                          ('ccs2needlexml')))
+        def cmd_plan(cmd_ctxt, input='in', output='out', coro='coro'):
+            return (
+                ('file', input),
+                (
+                    ('file', output),
+                    ('file', coro),
+                ),
+            )
+        plans = []
+        for _ in range(2):  # fresh filters, the same plan
+            filters = FilterManager.init_lookup(*names,
+                                                ext_plugins=False).plugins
+            plans.append(cmd_plan(filters).filter_chain_analysis['plan'])
+        self.assertEqual(plans[0], (
+            ('input', 'ccs2ccsflat', 0),
+            ('run', 'ccsflat2cibprelude', 1),
+            ('output', 'ccsflat2cibprelude', 1),
+            ('run', 'ccs2needlexml', 2),
+            ('output', 'ccs2needlexml', 2),
+        ))
+        self.assertTrue(plans[0] is plans[1])
+
+    def testPlanBacktrack(self):
+        # terminal D visited first needs its (inner) feeder C to run first
+        plan = Command.plan_chain({
+            'A': (), 'C': ('A', ), 'D': ('C', ), 'O': (), 'P': ('C', 'O'),
+        }, ('A', 'O', 'D', 'P', None))
+        self.assertEqual(plan, (
+            ('input', 'A', 0),
+            ('input', 'O', 1),
+            ('run', 'C', None),
+            ('run', 'D', 2),
+            ('output', 'D', 2),
+            ('run', 'P', 3),
+            ('output', 'P', 3),
+        ))
+
+    def testPlanRelease(self):
+        names = ('ccs2ccsflat', 'ccsflat2cibprelude', 'ccs2needlexml')
+        @Command.deco(('ccs2ccsflat',
+                          ('ccsflat2cibprelude'),
+                          ('ccs2needlexml')))
+        def cmd_release(cmd_ctxt, input='in', output='out', coro='coro'):
+            return (
+                ('file', input),
+                (
+                    ('file', output),
+                    ('file', coro),
+                ),
+            )
+        filters = FilterManager.init_lookup(*names, ext_plugins=False).plugins
+        cmd = cmd_release(filters)
+        analysis = cmd.filter_chain_analysis
+        bound = (
+            (filters['ccs2ccsflat'], ('file', 'in')),
+            (filters['ccsflat2cibprelude'],
+             ('file', 'cib-{ccs2ccsflat.in.hash}.xml')),
+            (filters['ccs2needlexml'], ('file', 'coro')),
+        )
+        release = cmd._plan_release(analysis['plan'], bound,
+                                    analysis['filter_backtrack'])
+        # input referred to in the interpolation kept, so are the outputs
+        # of the filters with output steps
+        self.assertEqual([set(r) for r in release], [
+            set([('input', ('file', 'in'))]),
+            set([('in', 'ccsflat2cibprelude')]),
+            set(),
+            set([('in', 'ccs2needlexml'), ('out', 'ccs2ccsflat')]),
+            set(),
+        ])
+        # the same as per the consuming steps
+        consumers = cmd._plan_consumers(analysis['plan'], bound,
+                                        analysis['filter_backtrack'])
+        self.assertEqual(consumers, {
+            ('input', ('file', 'in')): [0],
+            ('in', 'ccsflat2cibprelude'): [1],
+            ('in', 'ccs2needlexml'): [3],
+            ('out', 'ccs2ccsflat'): [1, 3],
+        })
+
+    def testPlanConcurrent(self):
+        names = ('ccs2ccsflat', 'ccsflat2cibprelude', 'ccs2needlexml')
+        @Command.deco(('ccs2ccsflat',
+                          ('ccsflat2cibprelude'),
+                          ('ccs2needlexml')))
+        def cmd_branched(cmd_ctxt, input='in', output='out', coro='coro'):
+            return (
+                ('file', input),
+                (
+                    ('file', output),
+                    ('file', coro),
+                ),
+            )
+        @Command.deco(('ccs2ccsflat',
+                          ('ccsflat2cibprelude')))
+        def cmd_linear(cmd_ctxt, input='in', output='out'):
+            return (
+                ('file', input),
+                ('file', output),
+            )
+        filters = FilterManager.init_lookup(*names, ext_plugins=False).plugins
+        for cmd, concurrent in ((cmd_branched(filters), True),
+                                (cmd_linear(filters), False)):
+            analysis = cmd.filter_chain_analysis
+            self.assertEqual(cmd._plan_concurrent(analysis['plan'],
+                                                  analysis['filter_backtrack']),
+                             concurrent)
+
+
 from os.path import join, dirname; from sys import modules as m  # 2/3 compat
 b = m.get('builtins', m.get('__builtin__')); e, E, h = 'exec', 'execfile', hash
 with open(join(dirname(__file__), '_gone')) as f:
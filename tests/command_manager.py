@@ -39,6 +39,24 @@ class Default(CommandManagerTestCase):
             self.assertEqual(cls, type(commands[cls.name]))
 
 
+class Closure(TestCase):
+    def tearDown(self):
+        CommandManager._default_registry.setup(True)  # start from scratch
+
+    def test_command(self):
+        commands = CommandManager.init_lookup('cib2pcscmd').commands
+        self.assertEqual(type(commands['cib2pcscmd']).name, 'cib2pcscmd')
+        self.assertFalse(ccs2pcs_needle.name in commands)
+
+    def test_alias(self):
+        commands = CommandManager.init_lookup('ccs2pcscmd', system='linux',
+                                              system_extra='rhel,7.5').commands
+        self.assertEqual(commands['ccs2pcscmd'], 'ccs2pcscmd-needle')
+        self.assertEqual(type(commands['ccs2pcscmd-needle']).name,
+                         'ccs2pcscmd-needle')
+        self.assertFalse(ccs2pcs_needle.name in commands)
+
+
 from os.path import join, dirname; from sys import modules as m  # 2/3 compat
 b = m.get('builtins', m.get('__builtin__')); e, E, h = 'exec', 'execfile', hash
 with open(join(dirname(__file__), '_gone')) as f:
@@ -21,11 +21,12 @@ from os.path import dirname, join
 
 from lxml import etree
 
-from .format import formats
+from .format import LazySnippet, formats, walk_resolve
 formats = formats.plugins
 from .formats.ccs import ccs
 from .filter import XMLFilter
 from .utils_2to3 import str_enc
+from .utils_prog import getenv_namespaced, setenv_namespaced
 
 WALK_DIR = join(dirname(__file__), 'XMLFormat-walk')
 
@@ -60,6 +61,81 @@ class XMLTraverse(TestCase):
         self.assertEqual(str_enc(etree.tostring(r, encoding='UTF-8'), 'utf-8'),
                          RESULT_DIRECT_XSLT)
 
+    def testDirectXSLTMonolithic(self):
+        flt = XMLFilter(formats)
+        in_obj = ccs('file', join(dirname(__file__), 'filled.conf'))
+        r = flt.proceed_xslt(in_obj, symbol='direct_xslt_test',
+                             root_dir=WALK_DIR, xslt_mode='monolithic')
+
+        assert not isinstance(r, list)
+        self.assertEqual(str_enc(etree.tostring(r, encoding='UTF-8'), 'utf-8'),
+                         RESULT_DIRECT_XSLT)
+
+    def testMonolithicFallback(self):
+        in_obj = ccs('file', join(dirname(__file__), 'filled.conf'))
+        walk = in_obj.walk_schema(WALK_DIR, symbol='direct_xslt_test')
+        root = in_obj('etree').getroot()
+        assert XMLFilter._xslt_monolithic(walk, root) is not None
+        # callable cannot be expressed within the single stylesheet
+        walk['cluster'][1]['clusternode'] = (lambda elem, children: elem, {})
+        self.assertEqual(XMLFilter._xslt_monolithic(walk, root), None)
+
+    def testPreprocessMemoized(self):
+        parent = XMLFilter._xslt_preprocess(
+            '<clufter:descent at="clusternode"/>', 'clusternodes'
+        )
+        snippet = '<node><xsl:value-of select="@name"/></node>'
+        child = XMLFilter._xslt_preprocess(snippet, 'clusternode', parent)
+        self.assertTrue(XMLFilter._xslt_preprocess(snippet, 'clusternode',
+                                                   parent) is child)
+        # mixing clears the template upon use, hence a fresh copy each time
+        parent = XMLFilter._xslt_preprocess(
+            '<clufter:descent-mix at="clusternode"/>', 'clusternodes'
+        )
+        child = XMLFilter._xslt_preprocess(snippet, 'clusternode', parent)
+        other = XMLFilter._xslt_preprocess(snippet, 'clusternode', parent)
+        self.assertFalse(other[0] is child[0])
+        self.assertEqual(etree.tostring(other[0]), etree.tostring(child[0]))
+        self.assertEqual(other[1:], child[1:])
+
+    def testTraversePruning(self):
+        walk = {'a': ('A', {'b': ('B', {})})}
+        proceed = lambda sym, elem, children: (sym, elem.get('id'),
+                                               tuple(children.values()))
+        plain = etree.ElementTree(etree.XML('<a id="0"><x><b id="1"/></x>'
+                                            '<b id="2"/></a>'))
+        # subtrees not expected (at any depth) per the walk are pruned,
+        # hence any noise within does not matter, incl. a tag clash
+        noisy = etree.ElementTree(etree.XML('<a id="0"><y><z/><z><a/></z></y>'
+                                            '<x><w/><b id="1"><c/></b></x>'
+                                            '<b id="2"><b id="noise"/></b>'
+                                            '</a>'))
+        expected = ('A', '0', (('B', '1', ()), ('B', '2', ())))
+        for et in (plain, noisy):
+            self.assertEqual(XMLFilter._traverse(None, walk, et=et,
+                                                 proceed=proceed),
+                             expected)
+
+    def testTraverseLazy(self):
+        walkcache = getenv_namespaced('WALKCACHE')
+        setenv_namespaced('WALKCACHE', '')  # snippets would be at hand
+        try:
+            walk = ccs.walk_schema(WALK_DIR, symbol='traverse_test',
+                                   lazy=True)
+        finally:
+            setenv_namespaced('WALKCACHE', walkcache)
+        proceed = lambda sym, elem, children: (sym, elem.tag,
+                                               list(children.values()))
+        r = XMLFilter._traverse(None, walk, proceed=proceed,
+                                et=etree.ElementTree(etree.XML(
+                                    '<clusternodes/>'
+                                )))
+        self.assertEqual(r, ('clusternodes-traverse_test', 'clusternodes', []))
+        # snippet for an element not present in the input is never loaded
+        sym, _ = walk['clusternodes'][1]['clusternode']
+        self.assertTrue(isinstance(sym, LazySnippet))
+        self.assertEqual(walk_resolve(sym), 'clusternode-traverse_test')
+
     def testXSLTTemplate(self):
         flt = XMLFilter(formats)
         in_obj = ccs('file', join(dirname(__file__), 'filled.conf'))
@@ -0,0 +1,99 @@
+# -*- coding: UTF-8 -*-
+# Copyright 2019 Red Hat, Inc.
+# Part of clufter project
+# Licensed under GPLv2+ (a copy included | http://gnu.org/licenses/gpl-2.0.txt)
+"""Testing persistent filter cache"""
+__author__ = "Jan Pokorný <jpokorny @at@ Red Hat .dot. com>"
+
+from os.path import join, dirname; from sys import modules as m  # 2/3 compat
+b = m.get('builtins', m.get('__builtin__')); e, E, h = 'exec', 'execfile', hash
+c = lambda x: compile(x.read(), x.name, 'exec')
+with open(join(dirname(__file__), '_go')) as f:
+    getattr(b, e, getattr(b, E, h)(f.name).__repr__.__name__.__ne__)(c(f))
+
+
+from unittest import TestCase
+from os import listdir, makedirs
+from os.path import join
+from shutil import rmtree
+from tempfile import mkdtemp
+
+from .command_context import CommandContext
+from .filter_cache import FilterCache
+from .filter_manager import FilterManager
+
+flt_name, flt_msg_name = 'ccs-propagate-cman', 'ccs2needlexml'
+filters = FilterManager.init_lookup(flt_name, flt_msg_name,
+                                    ext_plugins=False).filters
+flt, flt_msg = filters[flt_name], filters[flt_msg_name]
+testfile = join(dirname(__file__), 'filled.conf')
+
+
+class FilterCacheTestCase(TestCase):
+    def setUp(self):
+        self.cache_dir = mkdtemp()
+
+    def tearDown(self):
+        rmtree(self.cache_dir, True)
+
+    def run_filter(self, cache, flt=flt, **kwargs):
+        cmd_ctxt = CommandContext(dict(kwargs, validator_specs={'': ''}))
+        cmd_ctxt.ensure_filter(flt)
+        return cache(flt, flt.in_format('file', testfile),
+                     cmd_ctxt.filter(flt.__class__.name))
+
+    def testHit(self):
+        cache = FilterCache(self.cache_dir)
+        out = [self.run_filter(cache).BYTESTRING() for _ in range(2)]
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+        self.assertEqual(out[0], out[1])
+        # does not depend on the particular instance
+        cache = FilterCache(self.cache_dir)
+        self.assertEqual(self.run_filter(cache).BYTESTRING(), out[0])
+        self.assertEqual((cache.hits, cache.misses), (1, 0))
+
+    def testReadKeyChanged(self):
+        cache = FilterCache(self.cache_dir)
+        self.run_filter(cache)
+        self.run_filter(cache, system='linux')
+        self.assertEqual((cache.hits, cache.misses), (0, 2))
+        # both variants retained
+        self.run_filter(cache)
+        self.run_filter(cache, system='linux')
+        self.assertEqual((cache.hits, cache.misses), (2, 2))
+
+    def testMessagesReplayed(self):
+        cache, messages = FilterCache(self.cache_dir), ([], [])
+        for msgs in messages:
+            self.run_filter(cache, flt=flt_msg, batch=True,
+                            svc_output=lambda msg, **kws: msgs.append(msg))
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+        self.assertTrue(messages[0])
+        self.assertEqual(messages[0], messages[1])
+
+    def testSnippetsKeyed(self):
+        cache = FilterCache(self.cache_dir)
+        cmd_ctxt = CommandContext({'root_dir': self.cache_dir})
+        flt_ctxt = cmd_ctxt.ensure_filter(flt)
+        in_obj = flt.in_format('file', testfile)
+        makedirs(join(self.cache_dir, in_obj.root))
+        key = cache._key(flt, in_obj, flt_ctxt)
+        with open(join(self.cache_dir, in_obj.root, 'x.py'), 'w') as f:
+            f.write("x = ''\n")
+        self.assertEqual(cache._key(flt, in_obj, flt_ctxt), key)  # memoized
+        cache = FilterCache(self.cache_dir)  # new run
+        self.assertNotEqual(cache._key(flt, in_obj, flt_ctxt), key)
+
+    def testEviction(self):
+        cache = FilterCache(self.cache_dir, maxsize=0)
+        self.run_filter(cache)
+        self.assertTrue(cache.evictions > 0)
+        self.assertEqual(listdir(self.cache_dir), [])
+        self.run_filter(cache)
+        self.assertEqual((cache.hits, cache.misses), (0, 2))
+
+
+from os.path import join, dirname; from sys import modules as m  # 2/3 compat
+b = m.get('builtins', m.get('__builtin__')); e, E, h = 'exec', 'execfile', hash
+with open(join(dirname(__file__), '_gone')) as f:
+    getattr(b, e, getattr(b, E, h)(f.name).__repr__.__name__.__ne__)(f.read())
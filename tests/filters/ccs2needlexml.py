@@ -16,7 +16,12 @@ with open(join(dirname(dirname(__file__)), '_com')) as f:
     getattr(b, e, getattr(b, E, h)(f.name).__repr__.__name__.__ne__)(c(f))
 
 
+from json import loads
+from os import close, remove
+from tempfile import mkstemp
+
 from .utils_2to3 import bytes_enc
+from .utils_xslt import XSLTProfile, XSLTTrace
 
 flt = 'ccs2needlexml'
 
@@ -40,11 +45,99 @@ class FiltersCcs2NeedleXmlTestCase(TeardownFilterTestCase):
         )
         for (in_str, out_str) in io_strings:
             in_obj = in_fmt('bytestring', in_str)
-            out_obj = flt_obj(in_obj)
+            out_obj = run_xslt_modes(self, flt_obj, in_obj)
             #print(out_obj.BYTESTRING())
             self.assertEqual(out_obj.BYTESTRING(), bytes_enc(out_str))
 
 
+class FiltersCcs2NeedleXmlMonolithicTestCase(DeterministicFilterTestCase):
+    def testMonolithicSameAsSparse(self):
+        flt_obj = self.flt_mgr.filters[flt]
+        in_fmt = flt_obj.in_format
+        file_path = join(dirname(dirname(__file__)), 'filled.conf')
+        out = [flt_obj(in_fmt('file', file_path), xslt_mode=mode).BYTESTRING()
+               for mode in ('sparse', 'monolithic')]
+        self.assertEqual(*out)
+
+
+class FiltersCcs2NeedleXmlParallelTestCase(DeterministicFilterTestCase):
+    def testParallelSameAsSequential(self):
+        flt_obj = self.flt_mgr.filters[flt]
+        in_fmt = flt_obj.in_format
+        in_str = (
+            '<cluster name="test" config_version="1"><cman/><clusternodes>'
+            + ''.join('<clusternode name="node-{0}" nodeid="{1}"/>'
+                      .format(i, i + 1) for i in range(32))
+            + '</clusternodes><rm/></cluster>'
+        )
+        out = [flt_obj(in_fmt('bytestring', in_str), jobs=jobs).BYTESTRING()
+               for jobs in (1, 4, 4)]
+        self.assertEqual(out[0], out[1])
+        self.assertEqual(out[0], out[2])
+        self.assertEqual(out[0].count(b'<node '), 32)
+
+
+class FiltersCcs2NeedleXmlProfileTestCase(DeterministicFilterTestCase):
+    def testProfileAggregated(self):
+        flt_obj = self.flt_mgr.filters[flt]
+        in_fmt = flt_obj.in_format
+        file_path = join(dirname(dirname(__file__)), 'filled.conf')
+        profile = XSLTProfile()
+        out = [flt_obj(in_fmt('file', file_path), jobs=jobs,
+                       **(dict(profile=profile) if p else {})).BYTESTRING()
+               for p, jobs in ((False, 1), (True, 1), (True, 2))]
+        self.assertEqual(out[0], out[1])
+        self.assertEqual(out[0], out[2])
+        report = loads(profile.as_json())
+        self.assertEqual(report['atoms'], profile.atoms)
+        self.assertEqual([f['filter'] for f in report['filters']], [flt])
+        clusternode = [s for s in report['snippets'] if s['snippet']
+                       == 'cluster/clusternodes/clusternode']
+        self.assertEqual(clusternode[0]['atoms'], 2 * 2)
+        self.assertTrue(report['templates'])
+        self.assertEqual(report['templates'],
+                         sorted(report['templates'],
+                                key=lambda t: (-t['time'], -t['calls'])))
+        self.assertTrue(profile.as_text().startswith("XSLT profile: {0} atoms"
+                                                     .format(profile.atoms)))
+
+
+class FiltersCcs2NeedleXmlTraceTestCase(DeterministicFilterTestCase):
+    def testTrace(self):
+        flt_obj = self.flt_mgr.filters[flt]
+        in_fmt = flt_obj.in_format
+        file_path = join(dirname(dirname(__file__)), 'filled.conf')
+        fd, trace_path = mkstemp(suffix='.jsonl')
+        close(fd)
+        try:
+            trace = XSLTTrace(trace_path)
+            out = [flt_obj(in_fmt('file', file_path), jobs=jobs,
+                           **(dict(trace=trace) if t else {})).BYTESTRING()
+                   for t, jobs in ((False, 1), (True, 1), (True, 2))]
+            self.assertEqual(out[0], out[1])
+            self.assertEqual(out[0], out[2])
+            self.assertEqual(trace.close(), trace_path)
+            with open(trace_path) as f:
+                events = [loads(l) for l in f]
+        finally:
+            remove(trace_path)
+        self.assertEqual(len(events), trace.events)
+        self.assertEqual(set(e['filter'] for e in events), set((flt, )))
+        self.assertEqual(set(e['event'] for e in events),
+                         set(('enter', 'snippet', 'prune', 'merge', 'mix',
+                              'leave', 'xslt')))
+        # balanced per each run, and each atom labeled with its snippet
+        self.assertEqual(sum(e['event'] == 'leave' for e in events),
+                         sum(e['event'] == 'snippet' for e in events))
+        self.assertEqual([e['snippet'] for e in events
+                          if e['event'] == 'xslt'
+                          and e['snippet'].endswith('/clusternode')],
+                         ['cluster/clusternodes/clusternode'] * 4)
+        self.assertFalse(any(e['failed'] for e in events
+                             if e['event'] == 'xslt'))
+        # untouched unless any event
+        self.assertEqual(XSLTTrace(trace_path).close(), None)
+
 from os.path import join, dirname; from sys import modules as m  # 2/3 compat
 b = m.get('builtins', m.get('__builtin__')); e, E, h = 'exec', 'execfile', hash
 with open(join(dirname(dirname(__file__)), '_gone')) as f:
@@ -8,10 +8,11 @@ from __future__ import print_function
 """Testing `ccs-disable-rg' filter"""
 __author__ = "Jan Pokorný <jpokorny @at@ Red Hat .dot. com>"
 
+# following makes available also: run_xslt_modes
 from os.path import join, dirname; from sys import modules as m  # 2/3 compat
 b = m.get('builtins', m.get('__builtin__')); e, E, h = 'exec', 'execfile', hash
 c = lambda x: compile(x.read(), x.name, 'exec')
-with open(join(dirname(dirname(__file__)), '_go')) as f:
+with open(join(dirname(dirname(__file__)), '_com')) as f:
     getattr(b, e, getattr(b, E, h)(f.name).__repr__.__name__.__ne__)(c(f))
 
 
@@ -27,7 +28,7 @@ ccs = ccs_disable_rg.in_format
 class FiltersCcsDisableRGTestCase(TestCase):
     def testDisableRG(self):
         in_obj = ccs('file', join(dirname(dirname(__file__)), 'filled.conf'))
-        ret = ccs_disable_rg(in_obj)
+        ret = run_xslt_modes(self, ccs_disable_rg, in_obj)
         #print(ret.BYTESTRING())
         disabled = bool(ret.ETREE().xpath("/cluster/rm/@disabled")[0])
         self.assertEqual(disabled, True)
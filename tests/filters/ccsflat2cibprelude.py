@@ -121,8 +121,10 @@ class FiltersCcsFlat2CibPreludeTestCase(TeardownFilterTestCase):
 </resources>
 '''
             in_obj = in_fmt('bytestring', in_str)
-            out_obj = flt_obj(in_obj,
-                              system='linux', system_extra=('rhel', '7.3'))
+            out_obj = run_xslt_modes(
+                self, flt_obj, in_obj,
+                system='linux', system_extra=('rhel', '7.3')
+            )
             #print(out_obj.BYTESTRING())
             self.assertEqual(out_obj.BYTESTRING(), bytes_enc(out_str))
 
@@ -191,8 +193,10 @@ class FiltersCcsFlat2CibPreludeTestCase(TeardownFilterTestCase):
 </resources>
 '''
             in_obj = in_fmt('bytestring', in_str)
-            out_obj = flt_obj(in_obj,
-                              system='linux', system_extra=('rhel', '7.3'))
+            out_obj = run_xslt_modes(
+                self, flt_obj, in_obj,
+                system='linux', system_extra=('rhel', '7.3')
+            )
             #print(out_obj.BYTESTRING())
             self.assertEqual(out_obj.BYTESTRING(), bytes_enc(out_str))
 
@@ -245,8 +249,10 @@ class FiltersCcsFlat2CibPreludeTestCase(TeardownFilterTestCase):
 </resources>
 '''
             in_obj = in_fmt('bytestring', in_str)
-            out_obj = flt_obj(in_obj,
-                              system='linux', system_extra=('rhel', '7.3'))
+            out_obj = run_xslt_modes(
+                self, flt_obj, in_obj,
+                system='linux', system_extra=('rhel', '7.3')
+            )
             #print(out_obj.BYTESTRING())
             self.assertEqual(out_obj.BYTESTRING(), bytes_enc(out_str))
 
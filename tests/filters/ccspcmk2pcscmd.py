@@ -8,10 +8,11 @@ from __future__ import print_function
 """Testing `ccspcmk2pcscmd' filter"""
 __author__ = "Jan Pokorný <jpokorny @at@ Red Hat .dot. com>"
 
+# following makes available also: run_xslt_modes
 from os.path import join, dirname; from sys import modules as m  # 2/3 compat
 b = m.get('builtins', m.get('__builtin__')); e, E, h = 'exec', 'execfile', hash
 c = lambda x: compile(x.read(), x.name, 'exec')
-with open(join(dirname(dirname(__file__)), '_go')) as f:
+with open(join(dirname(dirname(__file__)), '_com')) as f:
     getattr(b, e, getattr(b, E, h)(f.name).__repr__.__name__.__ne__)(c(f))
 
 
@@ -43,9 +44,10 @@ class FiltersCcspcmk2pcscmdTestCase(TestCase):
             .format(sleep=ccspcmk2pcscmd.defs['pcscmd_start_wait'])),
         )
         for system_extra, out_str in io_strings:
-            ret = ccspcmk2pcscmd(in_obj, pcscmd_verbose=False,
-                                         pcscmd_noauth=True,
-                                         pcscmd_noguidance=True,
+            ret = run_xslt_modes(self, ccspcmk2pcscmd, in_obj,
+                                 pcscmd_verbose=False,
+                                 pcscmd_noauth=True,
+                                 pcscmd_noguidance=True,
                                  system='linux', system_extra=system_extra)
             #print(ret.BYTESTRING())
             self.assertEqual(str_enc(ret.BYTESTRING()), out_str)
@@ -21,6 +21,7 @@ from unittest import TestCase
 
 from .filter_manager import FilterManager
 from .utils_2to3 import bytes_enc, str_enc
+from .utils_lxml import etree_XSLT_cached
 flt = 'cib2pcscmd'
 cib2pcscmd = FilterManager.init_lookup(flt).filters[flt]
 cib = cib2pcscmd.in_format
@@ -46,6 +47,66 @@ pcs resource clone memcached 'interleave=true'
 '''
         )
 
+    def testConversionVerbose(self):
+        in_obj = cib('file', join(dirname(dirname(__file__)), 'filled.cib'))
+        ret = cib2pcscmd(in_obj, pcscmd_verbose=True, pcscmd_tmpcib='',
+                         system='linux', system_extra=('rhel', '7.3'))
+        #print(ret.BYTESTRING())
+        self.assertEqual(
+            str_enc(ret.BYTESTRING()).split('\n', 8)[:8],
+            '''\
+echo ':: new stonith: FENCEDEV-fence-virt-063'
+pcs stonith create FENCEDEV-fence-virt-063 fence_xvm 'auth=sha256' 'hash=sha256' 'key_file=/etc/cluster/fence_xvm.key' 'timeout=5' 'pcmk_host_map=virt-063:virt-063.example.com'
+test $? -eq 0 && echo ':: OK' || echo ':: FAILURE'
+:
+echo ':: new stonith: FENCEDEV-fence-virt-064'
+pcs stonith create FENCEDEV-fence-virt-064 fence_xvm 'auth=sha256' 'hash=sha256' 'key_file=/etc/cluster/fence_xvm.key' 'timeout=5' 'pcmk_host_map=virt-064:virt-064.example.com'
+test $? -eq 0 && echo ':: OK' || echo ':: FAILURE'
+:
+'''.split('\n')[:8]
+        )
+        lines = str_enc(ret.BYTESTRING()).split('\n')
+        self.assertEqual(sum(l.startswith("echo ':: ") for l in lines), 8)
+        self.assertEqual(sum(l.startswith("test $? -eq 0") for l in lines), 8)
+
+    def testConversionStatusIgnored(self):
+        # populated status section is pruned from the traversal as a whole
+        with open(join(dirname(dirname(__file__)), 'filled.cib')) as f:
+            cib_str = f.read()
+        status = ''.join(
+            '<node_state id="{0}" uname="{0}" crmd="online"><lrm id="{0}">'
+            '<lrm_resources><lrm_resource id="memcached" class="systemd"'
+            ' type="memcached"><lrm_rsc_op id="memcached_last_0"'
+            ' operation="start" call-id="1" rc-code="0"/></lrm_resource>'
+            '</lrm_resources></lrm></node_state>'.format(n)
+            for n in ('virt-063', 'virt-064', 'virt-069')
+        )
+        self.assertTrue('<status/>' in cib_str)
+        rets = [
+            cib2pcscmd(cib('bytestring', bytes_enc(s)), pcscmd_verbose=False,
+                       pcscmd_tmpcib='', system='linux',
+                       system_extra=('rhel', '7.3')).BYTESTRING()
+            for s in (cib_str, cib_str.replace(
+                '<status/>', '<status>{0}</status>'.format(status)))
+        ]
+        self.assertEqual(rets[0], rets[1])
+
+    def testOptionsShareStylesheet(self):
+        # options are runtime XSLT params, not baked into the stylesheets
+        in_obj = cib('file', join(dirname(dirname(__file__)), 'filled.cib'))
+        kwargs = dict(pcscmd_verbose=False, pcscmd_tmpcib='', system='linux',
+                      system_extra=('rhel', '7.3'))
+        ret = cib2pcscmd(in_obj, **kwargs).BYTESTRING()
+        misses = etree_XSLT_cached.stats['misses']
+        kwargs.update(pcscmd_tmpcib='tmp-cib.xml', pcscmd_dryrun=True,
+                      system_extra=('rhel', '6.8'))
+        ret_other = cib2pcscmd(in_obj, **kwargs).BYTESTRING()
+        if etree_XSLT_cached.enabled:
+            self.assertEqual(etree_XSLT_cached.stats['misses'], misses)
+        self.assertTrue(str_enc(ret).startswith('pcs stonith create'))
+        self.assertTrue(str_enc(ret_other).startswith(
+            'pcs -f tmp-cib.xml stonith create'))
+
 
 class FiltersCib2pcscmdConstraintsTestCase(TeardownFilterTestCase):
     def testColocationConstraints(self):
@@ -88,8 +149,10 @@ setoptions id=colocation-my-rsc-set
 '''
             in_obj = in_fmt('bytestring', bytes_enc(in_str),
                             validator_specs={in_fmt.ETREE: ''})
-            out_obj = flt_obj(in_obj, pcscmd_verbose=False, pcscmd_tmpcib='',
-                              system='linux', system_extra=('rhel', '7.3'))
+            out_obj = run_xslt_modes(
+                self, flt_obj, in_obj, pcscmd_verbose=False, pcscmd_tmpcib='',
+                system='linux', system_extra=('rhel', '7.3')
+            )
             #print(out_obj.BYTESTRING())
             self.assertEqual(str_enc(out_obj.BYTESTRING()), out_str)
 
@@ -133,8 +196,10 @@ constraint-id=location-A-on-XYZ score=INFINITY \
 '''
             in_obj = in_fmt('bytestring', bytes_enc(in_str),
                             validator_specs={in_fmt.ETREE: ''})
-            out_obj = flt_obj(in_obj, pcscmd_verbose=False, pcscmd_tmpcib='',
-                              system='linux', system_extra=('rhel', '7.3'))
+            out_obj = run_xslt_modes(
+                self, flt_obj, in_obj, pcscmd_verbose=False, pcscmd_tmpcib='',
+                system='linux', system_extra=('rhel', '7.3')
+            )
             #print(out_obj.BYTESTRING())
             self.assertEqual(str_enc(out_obj.BYTESTRING()), out_str)
 
@@ -183,8 +248,10 @@ setoptions id=order-my-rsc-set
 '''
             in_obj = in_fmt('bytestring', bytes_enc(in_str),
                             validator_specs={in_fmt.ETREE: ''})
-            out_obj = flt_obj(in_obj, pcscmd_verbose=False, pcscmd_tmpcib='',
-                              system='linux', system_extra=('rhel', '7.3'))
+            out_obj = run_xslt_modes(
+                self, flt_obj, in_obj, pcscmd_verbose=False, pcscmd_tmpcib='',
+                system='linux', system_extra=('rhel', '7.3')
+            )
             #print(out_obj.BYTESTRING())
             self.assertEqual(str_enc(out_obj.BYTESTRING()), out_str)
 
@@ -239,8 +306,10 @@ setoptions ticket=my-ticket loss-policy=fence id=ticket-my-ticket-my-rsc-set
 '''
             in_obj = in_fmt('bytestring', bytes_enc(in_str),
                             validator_specs={in_fmt.ETREE: ''})
-            out_obj = flt_obj(in_obj, pcscmd_verbose=False, pcscmd_tmpcib='',
-                              system='linux', system_extra=('rhel', '7.3'))
+            out_obj = run_xslt_modes(
+                self, flt_obj, in_obj, pcscmd_verbose=False, pcscmd_tmpcib='',
+                system='linux', system_extra=('rhel', '7.3')
+            )
             #print(out_obj.BYTESTRING())
             self.assertEqual(str_enc(out_obj.BYTESTRING()), out_str)
 
@@ -270,8 +339,10 @@ pcs alert create 'path=/bin/yes' id=alert-bar 'description=idling avoidance ;-)'
 '''
             in_obj = in_fmt('bytestring', bytes_enc(in_str),
                             validator_specs={in_fmt.ETREE: ''})
-            out_obj = flt_obj(in_obj, pcscmd_verbose=False, pcscmd_tmpcib='',
-                              system='linux', system_extra=('rhel', '7.3'))
+            out_obj = run_xslt_modes(
+                self, flt_obj, in_obj, pcscmd_verbose=False, pcscmd_tmpcib='',
+                system='linux', system_extra=('rhel', '7.3')
+            )
             #print(out_obj.BYTESTRING())
             self.assertEqual(str_enc(out_obj.BYTESTRING()), out_str)
 
@@ -301,8 +372,10 @@ pcs alert recipient add alert-foo 'value=3' id=alert-foo-recipient3
 '''
             in_obj = in_fmt('bytestring', bytes_enc(in_str),
                             validator_specs={in_fmt.ETREE: ''})
-            out_obj = flt_obj(in_obj, pcscmd_verbose=False, pcscmd_tmpcib='',
-                              system='linux', system_extra=('rhel', '7.3'))
+            out_obj = run_xslt_modes(
+                self, flt_obj, in_obj, pcscmd_verbose=False, pcscmd_tmpcib='',
+                system='linux', system_extra=('rhel', '7.3')
+            )
             #print(out_obj.BYTESTRING())
             self.assertEqual(str_enc(out_obj.BYTESTRING()), out_str)
 
@@ -323,6 +396,18 @@ class FiltersCib2pcscmdACLTestCase(TeardownFilterTestCase):
 ''', '''\
 pcs acl role create no-fd-passwd deny id no-fd-passwd
 pcs acl user create observer no-fd-passwd
+'''),
+            ('''\
+<acl_role id="read-roles">
+  <acl_permission id="read-roles-perm1" kind="read" reference="no-roles"/>
+  <acl_permission id="read-roles-perm2" kind="read" reference="read-roles"/>
+</acl_role>
+<acl_role id="no-roles">
+  <acl_permission id="no-roles-perm" kind="deny" reference="read-roles"/>
+</acl_role>
+''', '''\
+pcs acl role create read-roles read id no-roles read id read-roles
+pcs acl role create no-roles deny id read-roles
 '''),
         )
         for (in_str, out_str) in io_strings:
@@ -333,8 +418,10 @@ pcs acl user create observer no-fd-passwd
 '''
             in_obj = in_fmt('bytestring', bytes_enc(in_str),
                             validator_specs={in_fmt.ETREE: ''})
-            out_obj = flt_obj(in_obj, pcscmd_verbose=False, pcscmd_tmpcib='',
-                              system='linux', system_extra=('rhel', '7.3'))
+            out_obj = run_xslt_modes(
+                self, flt_obj, in_obj, pcscmd_verbose=False, pcscmd_tmpcib='',
+                system='linux', system_extra=('rhel', '7.3')
+            )
             #print(out_obj.BYTESTRING())
             self.assertEqual(str_enc(out_obj.BYTESTRING()), out_str)
 
@@ -377,8 +464,10 @@ pcs resource create httpd ocf:heartbeat:apache bundle httpd-bundle
 '''
             in_obj = in_fmt('bytestring', bytes_enc(in_str),
                             validator_specs={in_fmt.ETREE: ''})
-            out_obj = flt_obj(in_obj, pcscmd_verbose=False, pcscmd_tmpcib='',
-                              system='linux', system_extra=('rhel', '7.4'))
+            out_obj = run_xslt_modes(
+                self, flt_obj, in_obj, pcscmd_verbose=False, pcscmd_tmpcib='',
+                system='linux', system_extra=('rhel', '7.4')
+            )
             #print(out_obj.BYTESTRING())
             self.assertEqual(str_enc(out_obj.BYTESTRING()), out_str)
 
@@ -421,8 +510,10 @@ pcs resource create httpd ocf:heartbeat:apache bundle httpd-bundle
 '''
             in_obj = in_fmt('bytestring', bytes_enc(in_str),
                             validator_specs={in_fmt.ETREE: ''})
-            out_obj = flt_obj(in_obj, pcscmd_verbose=False, pcscmd_tmpcib='',
-                              system='linux', system_extra=('rhel', '7.5'))
+            out_obj = run_xslt_modes(
+                self, flt_obj, in_obj, pcscmd_verbose=False, pcscmd_tmpcib='',
+                system='linux', system_extra=('rhel', '7.5')
+            )
             #print(out_obj.BYTESTRING())
             self.assertEqual(str_enc(out_obj.BYTESTRING()), out_str)
 
@@ -0,0 +1,76 @@
+# -*- coding: UTF-8 -*-
+# Copyright 2019 Red Hat, Inc.
+# Part of clufter project
+# Licensed under GPLv2+ (a copy included | http://gnu.org/licenses/gpl-2.0.txt)
+"""Testing native fast paths of XSLT-driven filters for equivalence"""
+__author__ = "Jan Pokorný <jpokorny @at@ Red Hat .dot. com>"
+
+# following makes available also: TeardownFilterTestCase, rewrite_root
+from os.path import join, dirname; from sys import modules as m  # 2/3 compat
+b = m.get('builtins', m.get('__builtin__')); e, E, h = 'exec', 'execfile', hash
+c = lambda x: compile(x.read(), x.name, 'exec')
+with open(join(dirname(dirname(__file__)), '_com')) as f:
+    getattr(b, e, getattr(b, E, h)(f.name).__repr__.__name__.__ne__)(c(f))
+
+
+from glob import glob
+from itertools import product
+
+tests_dir = dirname(dirname(__file__))
+
+# filters with fastpath registered (see XMLFilter.deco_xslt)
+flts = ('ccs-disable-rg', 'ccs-version-bump')
+
+inputs = [join(tests_dir, fn) for fn in ('empty.conf', 'filled.conf')]
+inputs.extend(sorted(glob(join(tests_dir, 'cluster.conf', 'orig', '*.conf'))))
+
+
+def gen_inputs():
+    """Generate (mostly corner-case) cluster.conf variants (as bytestrings)"""
+    versions = (None, '0', '1', '41', '-3', '1.5', ' 7 ', 'x', '',
+                '4294967295', '12345678901234567890')
+    rms = ('', '<rm/>', '<rm disabled="0"/>',
+           '<rm central_processing="1"><!-- rm comment -->'
+           '<failoverdomains/><service name="s" autostart="1"/></rm>',
+           '<rm log_level="7"><service name="a"/></rm>\n  <rm/>')
+    for version, rm in product(versions, rms):
+        yield ('<?xml version="1.0"?>\n<!-- leading comment -->\n'
+               '<cluster name="test"{0}>\n  <cman two_node="1"/>\n'
+               '  <!-- nodes follow -->\n  <clusternodes>\n'
+               '    <clusternode name="a" nodeid="1"/>\n'
+               '  </clusternodes>\n  {1}\n</cluster>\n'.format(
+                   '' if version is None
+                   else ' config_version="{0}"'.format(version), rm
+               )).encode('ascii')
+
+
+class FiltersFastpathTestCase(CommonFilterTestCase):
+    def _assertEquivalent(self, flt_obj, in_obj, **kwargs):
+        out = [flt_obj(in_obj, nofastpath=nofastpath, **kwargs).BYTESTRING()
+               for nofastpath in (True, False)]
+        self.assertEqual(*out)
+        out.append(flt_obj(in_obj, nofastpath=True, xslt_mode='monolithic',
+                           **kwargs).BYTESTRING())
+        self.assertEqual(*out[1:])
+
+    def testFastpathSameAsXSLTFiles(self):
+        for flt, in_file in product(flts, inputs):
+            flt_obj = self.flt_mgr.filters[flt]
+            in_obj = flt_obj.in_format('file', in_file,
+                                       validator_specs={'': ''})
+            self._assertEquivalent(flt_obj, in_obj, validator_specs={'': ''})
+
+    def testFastpathSameAsXSLTGenerated(self):
+        for flt, in_str in product(flts, gen_inputs()):
+            flt_obj = self.flt_mgr.filters[flt]
+            for raw in (False, True):
+                in_obj = flt_obj.in_format('bytestring', in_str,
+                                           validator_specs={'': ''})
+                self._assertEquivalent(flt_obj, in_obj, raw=raw,
+                                       validator_specs={'': ''})
+
+
+from os.path import join, dirname; from sys import modules as m  # 2/3 compat
+b = m.get('builtins', m.get('__builtin__')); e, E, h = 'exec', 'execfile', hash
+with open(join(dirname(dirname(__file__)), '_gone')) as f:
+    getattr(b, e, getattr(b, E, h)(f.name).__repr__.__name__.__ne__)(f.read())
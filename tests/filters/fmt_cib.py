@@ -8,7 +8,8 @@ from __future__ import print_function
 """Testing filters for upgrading CIB formats"""
 __author__ = "Jan Pokorný <jpokorny @at@ Red Hat .dot. com>"
 
-# following makes available also: TeardownFilterTestCase, rewrite_root
+# following makes available also: TeardownFilterTestCase, rewrite_root,
+#                                  run_xslt_modes
 from os.path import join, dirname; from sys import modules as m  # 2/3 compat
 b = m.get('builtins', m.get('__builtin__')); e, E, h = 'exec', 'execfile', hash
 c = lambda x: compile(x.read(), x.name, 'exec')
@@ -52,7 +53,7 @@ class FiltersFmtCib1to2TestCase(TeardownFilterTestCase):
   </configuration>
 </cib>
 ''')
-        ret = fmt_cib_1to2(in_obj)
+        ret = run_xslt_modes(self, fmt_cib_1to2, in_obj)
         #print(ret.BYTESTRING())
         self.assertEqual(
             ret.BYTESTRING(),
@@ -45,8 +45,10 @@ pcs quorum device add model net host=191.168.10.20 heuristics mode=on timeout=5
         for (in_str, out_str) in io_strings:
             in_obj = in_fmt('bytestring', bytes_enc(in_str),
                             validator_specs={in_fmt.ETREE: ''})
-            out_obj = flt_obj(in_obj, pcscmd_verbose=False, pcscmd_tmpcib='',
-                              system='linux', system_extra=('rhel', '7.5'))
+            out_obj = run_xslt_modes(
+                self, flt_obj, in_obj, pcscmd_verbose=False, pcscmd_tmpcib='',
+                system='linux', system_extra=('rhel', '7.5')
+            )
             #print(out_obj.BYTESTRING())
             self.assertEqual(str_enc(out_obj.BYTESTRING()), out_str)
 
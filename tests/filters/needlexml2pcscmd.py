@@ -44,9 +44,11 @@ pcs cluster start --all --wait=60
             in_obj = in_fmt('bytestring', bytes_enc(in_str),
                             validator_specs={in_fmt.ETREE: ''})
             # there may be issues with this when tests (ever?) run in parallel
-            out_obj = flt_obj(in_obj, pcscmd_verbose=False, pcscmd_tmpcib='',
-                              pcscmd_noauth=True, pcscmd_noguidance=True,
-                              system='linux', system_extra=('rhel', '7.3'))
+            out_obj = run_xslt_modes(
+                self, flt_obj, in_obj, pcscmd_verbose=False, pcscmd_tmpcib='',
+                pcscmd_noauth=True, pcscmd_noguidance=True,
+                system='linux', system_extra=('rhel', '7.3')
+            )
             #print(out_obj.BYTESTRING())
             self.assertEqual(str_enc(out_obj.BYTESTRING()), out_str)
 
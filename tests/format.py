@@ -12,16 +12,24 @@ with open(join(dirname(__file__), '_go')) as f:
     getattr(b, e, getattr(b, E, h)(f.name).__repr__.__name__.__ne__)(c(f))
 
 
-from os.path import dirname, join
+from glob import glob
+from json import dump, load
+from os import listdir, makedirs, utime
+from os.path import abspath, dirname, exists, join
+from shutil import rmtree
+from sys import modules
+from tempfile import mkdtemp
 from unittest import TestCase
 #from pprint import pprint
 
 from lxml import etree
 
-from .format import FormatError
+from . import package_name, version
+from .format import FormatError, _walk_schema_index_memo
 from .formats.ccs import ccs
 from .formats.coroxml import coroxml_needle
-from .utils import head_tail
+from .utils import head_tail, volatilestring
+from .utils_prog import getenv_namespaced, setenv_namespaced
 
 
 class XMLFormatWalkTestCase(TestCase):
@@ -63,6 +71,128 @@ class XMLFormatWalkTestCase(TestCase):
         #pprint(r, width=8)  # --> expected
         self.assertEqual(r, self.result_walk_sparse)
 
+    def testWalkCache(self):
+        walkcache, cache_dir = getenv_namespaced('WALKCACHE'), mkdtemp()
+        setenv_namespaced('WALKCACHE', cache_dir)
+        try:
+            r = ccs.walk_schema(self.walk_dir, 'sparse')
+            self.assertEqual(r, self.result_walk_sparse)
+            cache_file, = glob(join(cache_dir, package_name() + '-walk', version,
+                                     'walk-sparse-*.json'))
+            # tamper the cached walk -> is it really used?
+            with open(cache_file) as f:
+                cached = load(f)
+            cached['walk']['heuristic'][0] = 'heuristic-cached'
+            with open(cache_file, 'w') as f:
+                dump(cached, f)
+            r = ccs.walk_schema(self.walk_dir, 'sparse')
+            self.assertEqual(r['heuristic'][0], 'heuristic-cached')
+            # pretend a snippet module was changed -> cache invalidated
+            cached['identities'][0][2] = 0
+            with open(cache_file, 'w') as f:
+                dump(cached, f)
+            r = ccs.walk_schema(self.walk_dir, 'sparse')
+            self.assertEqual(r, self.result_walk_sparse)
+            with open(cache_file) as f:
+                self.assertNotEqual(load(f)['identities'][0][2], 0)
+        finally:
+            setenv_namespaced('WALKCACHE', walkcache)
+            rmtree(cache_dir)
+
+    def testWalkCachePrune(self):
+        walkcache, cache_dir = getenv_namespaced('WALKCACHE'), mkdtemp()
+        walkcachesize = getenv_namespaced('WALKCACHESIZE')
+        setenv_namespaced('WALKCACHE', cache_dir)
+        parent = join(cache_dir, package_name() + '-walk')
+        current = join(parent, version)
+        try:
+            # leftovers of other version (tagged) vs. foreign stuff around
+            for d in ('0.0', 'foreign'):
+                makedirs(join(parent, d))
+            with open(join(parent, '0.0', 'CACHEDIR.TAG'), 'w') as f:
+                f.write(modules[FormatError.__module__]
+                        ._walk_schema_cache_tag[1])
+            for f in (join(cache_dir, 'walk-full-0.json'),
+                      join(parent, 'index-cluster-0.json')):
+                open(f, 'w').close()
+            makedirs(current)
+            # an old entry of the current version (to be evicted first)
+            old = join(current, 'walk-old-0.json')
+            with open(old, 'w') as f:
+                f.write(' ' * (1 << 20))
+            utime(old, (0, 0))
+            setenv_namespaced('WALKCACHESIZE', '1')
+            modules[FormatError.__module__]._walk_schema_cache_swept = False
+            r = ccs.walk_schema(self.walk_dir, 'sparse')
+            self.assertEqual(r, self.result_walk_sparse)
+            self.assertEqual(sorted(listdir(cache_dir)),
+                             [package_name() + '-walk', 'walk-full-0.json'])
+            self.assertEqual(sorted(listdir(parent)),
+                             sorted(['foreign', 'index-cluster-0.json',
+                                     version]))
+            self.assertFalse(exists(old))
+            self.assertTrue(glob(join(current, 'walk-sparse-*.json')))
+        finally:
+            setenv_namespaced('WALKCACHE', walkcache)
+            setenv_namespaced('WALKCACHESIZE', walkcachesize)
+            rmtree(cache_dir)
+
+    def testWalkCacheVolatile(self):
+        walkcache, cache_dir = getenv_namespaced('WALKCACHE'), mkdtemp()
+        setenv_namespaced('WALKCACHE', cache_dir)
+        root_dir = join(dirname(dirname(abspath(__file__))), 'filters')
+        try:
+            for _ in range(2):  # stored, then loaded
+                r = coroxml_needle.walk_schema(root_dir, 'needlexml2pcscmd')
+                self.assertTrue(isinstance(r['corosync'][0], volatilestring))
+            cache_file, = glob(join(cache_dir, package_name() + '-walk', version,
+                                    'walk-needlexml2pcscmd-*.json'))
+            with open(cache_file) as f:
+                cached = load(f)['walk']
+            # salted snippet not stored, plain ones nested alike are
+            self.assertEqual(cached['corosync'][0], {'lazy': ''})
+            self.assertTrue(cached['corosync'][1]['quorum'][0].strip())
+        finally:
+            setenv_namespaced('WALKCACHE', walkcache)
+            rmtree(cache_dir)
+
+    def testWalkIndex(self):
+        walkcache, cache_dir = getenv_namespaced('WALKCACHE'), mkdtemp()
+        setenv_namespaced('WALKCACHE', cache_dir)
+        memo_key = (abspath(self.walk_dir), 'cluster')
+        try:
+            _walk_schema_index_memo.pop(memo_key, None)
+            r = ccs._walk_schema(self.walk_dir, 'sparse')
+            self.assertEqual(r, self.result_walk_sparse)
+            index_file, = glob(join(cache_dir, package_name() + '-walk', version,
+                                     'index-cluster-*.json'))
+            # symbol not provided anywhere -> no module loaded at all
+            r = ccs._walk_schema(self.walk_dir, 'void')
+            self.assertEqual(r, {})
+            self.assertFalse([m for m in modules
+                              if m.startswith(ccs.namespace + '.void.')])
+            # tamper the index (as if in the next run) -> is it really used?
+            _walk_schema_index_memo.pop(memo_key)
+            with open(index_file) as f:
+                cached = load(f)
+            cached['index']['cluster'][3]['quorumd'][3]['heuristic'][2] = []
+            with open(index_file, 'w') as f:
+                dump(cached, f)
+            r = ccs._walk_schema(self.walk_dir, 'sparse')
+            self.assertEqual(r, {'failoverdomain': ('failoverdomain-sparse',
+                                                    {})})
+            # pretend a snippet module was changed -> index invalidated
+            _walk_schema_index_memo.pop(memo_key)
+            cached['identities'][0][2] = 0
+            with open(index_file, 'w') as f:
+                dump(cached, f)
+            r = ccs._walk_schema(self.walk_dir, 'sparse')
+            self.assertEqual(r, self.result_walk_sparse)
+        finally:
+            _walk_schema_index_memo.pop(memo_key, None)
+            setenv_namespaced('WALKCACHE', walkcache)
+            rmtree(cache_dir)
+
 
 class XMLValidationTestCase(TestCase):
     coro_input_ok = join(dirname(__file__), 'coro_ok.xml')
@@ -13,11 +13,15 @@ with open(join(dirname(__file__), '_go')) as f:
 
 
 from unittest import TestCase
-from os.path import dirname, exists, join
+from json import load
+from os import chdir, close, getcwd, listdir, remove
+from os.path import abspath, dirname, exists, join
+from shutil import rmtree
+from tempfile import mkdtemp, mkstemp
 #from os import unlink
 
 from .command_manager import CommandManager
-from .utils_2to3 import iter_values
+from .utils_2to3 import PY3, iter_items, iter_values
 from .utils_func import foreach
 
 
@@ -77,6 +81,113 @@ class Main(TestCase):
         #from pprint import pprint
         #pprint(outputs['coro']['passout'])
 
+    def testCib2PcscmdJobs(self):
+        testfile = join(dirname(__file__), 'filled.cib')
+        cmd = CommandManager.init_lookup('cib2pcscmd').commands['cib2pcscmd']
+        results = []
+        for jobs in ('1', '2'):
+            output = {'passin': 'bytestring'}
+            clufter_args = type("cluster_args", (object, ), dict(
+                input=testfile,
+                output=output,
+                nocheck=True,
+                batch=True,
+                jobs=jobs)
+            )
+            self.assertFalse(cmd(clufter_args))
+            # drop the lines carrying the time of generation
+            results.append([l for l in output['passout'].splitlines()
+                            if not l.startswith(b'# sequence generated')])
+        self.assertTrue(results[0])
+        self.assertEqual(results[0], results[1])
+
+    def testCib2PcscmdJobsRelease(self):
+        testfile = join(dirname(__file__), 'filled.cib')
+        cmd = CommandManager.init_lookup('cib2pcscmd').commands['cib2pcscmd']
+        computed, plan_compute = {}, cmd._plan_compute
+        def _plan_compute(*args):
+            ret = plan_compute(*args)
+            computed.update(ret)  # popped from as the plan gets executed
+            return ret
+        cmd._plan_compute = _plan_compute
+        clufter_args = type("cluster_args", (object, ), dict(
+            input=testfile,
+            output={'passin': 'bytestring'},
+            nocheck=True,
+            batch=True,
+            quiet=True,
+            jobs='2')
+        )
+        self.assertFalse(cmd(clufter_args))
+        self.assertEqual(set(computed), set(cmd._filters))
+        # intermediate results dropped once consumed, terminal output kept
+        self.assertEqual(dict((n, [x is not None for x in r[:2]])
+                              for n, r in iter_items(computed)),
+                         dict((n, [False, n == 'cmd-wrap'])
+                              for n in cmd._filters))
+
+    def testCib2PcscmdStats(self):
+        testfile = join(dirname(__file__), 'filled.cib')
+        cmd = CommandManager.init_lookup('cib2pcscmd').commands['cib2pcscmd']
+        fd, statsfile = mkstemp(suffix='.json')
+        close(fd)
+        try:
+            for jobs in ('1', '2'):
+                output = {'passin': 'bytestring'}
+                clufter_args = type("cluster_args", (object, ), dict(
+                    input=testfile,
+                    output=output,
+                    nocheck=True,
+                    batch=True,
+                    quiet=True,
+                    jobs=jobs,
+                    stats=statsfile)
+                )
+                self.assertFalse(cmd(clufter_args))
+                with open(statsfile) as f:
+                    stats = load(f)
+                filters = dict((f['filter'], f) for f in stats['filters'])
+                self.assertEqual(set(filters), set(cmd._filters))
+                self.assertTrue(all(f['runs'] == 1 and f['wall'] > 0
+                                    for f in filters.values()))
+                self.assertTrue(filters['cib2pcscmd']['in'] > 0)
+                self.assertTrue(filters['cib2pcscmd']['out'] > 0)
+                # void input, terminal output sized once written out,
+                # stream once materialized by the consumer
+                self.assertEqual(filters['cmd-annotate']['in'], 0)
+                self.assertEqual(filters['cmd-wrap']['out'],
+                                 len(output['passout']))
+                self.assertTrue(filters['stringiter-combine2']['out'] > 0)
+                self.assertEqual(stats['memory'],
+                                 filters['cib2pcscmd']['peak'] is not None)
+        finally:
+            remove(statsfile)
+
+    def testCib2PcscmdProfileFilter(self):
+        testfile = abspath(join(dirname(__file__), 'filled.cib'))  # chdir
+        cmd = CommandManager.init_lookup('cib2pcscmd').commands['cib2pcscmd']
+        clufter_args = type("cluster_args", (object, ), dict(
+            input=testfile,
+            output={'passin': 'bytestring'},
+            nocheck=True,
+            batch=True,
+            quiet=True,
+            profile_filter=['cib2pcscmd'],
+            profile_memory=True)
+        )
+        cwd, tmpdir = getcwd(), mkdtemp()
+        try:
+            chdir(tmpdir)
+            self.assertFalse(cmd(clufter_args))
+            profiles = listdir(tmpdir)
+        finally:
+            chdir(cwd)
+            rmtree(tmpdir)
+        pstats = [p for p in profiles if p.endswith('.pstats')]
+        self.assertEqual(len(pstats), 1)
+        self.assertTrue(pstats[0].startswith('profile-cib2pcscmd-'))
+        self.assertEqual(len(profiles), 2 if PY3 else 1)
+
 
 from os.path import join, dirname; from sys import modules as m  # 2/3 compat
 b = m.get('builtins', m.get('__builtin__')); e, E, h = 'exec', 'execfile', hash
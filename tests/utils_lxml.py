@@ -0,0 +1,91 @@
+# -*- coding: UTF-8 -*-
+# Copyright 2019 Red Hat, Inc.
+# Part of clufter project
+# Licensed under GPLv2+ (a copy included | http://gnu.org/licenses/gpl-2.0.txt)
+"""Testing lxml wrappers"""
+__author__ = "Jan Pokorný <jpokorny @at@ Red Hat .dot. com>"
+
+from os.path import join, dirname; from sys import modules as m  # 2/3 compat
+b = m.get('builtins', m.get('__builtin__')); e, E, h = 'exec', 'execfile', hash
+c = lambda x: compile(x.read(), x.name, 'exec')
+with open(join(dirname(__file__), '_go')) as f:
+    getattr(b, e, getattr(b, E, h)(f.name).__repr__.__name__.__ne__)(c(f))
+
+
+from unittest import TestCase
+
+from lxml import etree
+
+from .utils_lxml import XSLTCache, etree_parser_safe, etree_standalone
+from .utils_xml import XSL_NS
+
+STYLESHEET = '''\
+<xsl:stylesheet version="1.0" xmlns:xsl="{0}">
+    <xsl:template match="/*">
+        <{1}/>
+    </xsl:template>
+</xsl:stylesheet>'''
+
+
+def stylesheet(tag):
+    return etree.XML(STYLESHEET.format(XSL_NS, tag))
+
+
+class TestXSLTCache(TestCase):
+    def test_hit_miss(self):
+        cache = XSLTCache(4)
+        first = cache(stylesheet('a'))
+        self.assertTrue(cache(stylesheet('a')) is first)
+        self.assertFalse(cache(stylesheet('b')) is first)
+        self.assertEqual((cache.hits, cache.misses, cache.evictions),
+                         (1, 2, 0))
+        ret = first(etree.XML('<foo/>').getroottree())
+        self.assertEqual(ret.getroot().tag, 'a')
+
+    def test_eviction(self):
+        cache = XSLTCache(2)
+        first = cache(stylesheet('a'))
+        cache(stylesheet('b'))
+        cache(stylesheet('a'))  # 'b' is now the least recently used
+        cache(stylesheet('c'))
+        self.assertEqual(cache.evictions, 1)
+        self.assertTrue(cache(stylesheet('a')) is first)
+        self.assertEqual(cache.stats['size'], 2)
+
+    def test_disabled(self):
+        cache = XSLTCache(0)
+        self.assertFalse(cache.enabled)
+        self.assertFalse(cache(stylesheet('a')) is cache(stylesheet('a')))
+        self.assertEqual((cache.hits, cache.misses), (0, 0))
+
+
+class TestStandalone(TestCase):
+    snippet = ('<clufter:snippet xmlns:clufter="urn:c" xmlns:u="urn:u"'
+               ' xmlns:v="urn:v"><!--pre--><a xmlns:w="urn:w">\n'
+               '  <u:b c="1"> <!--c--> </u:b>\n</a>\n</clufter:snippet>')
+
+    @staticmethod
+    def roundtrip(elem):
+        ret = etree.fromstring(etree.tostring(elem), parser=etree_parser_safe)
+        etree.cleanup_namespaces(ret)
+        return etree.tostring(ret.getroottree())
+
+    def test_element(self):
+        elem = etree.XML(self.snippet)[1]
+        expected = self.roundtrip(elem)
+        ret = etree_standalone(elem)
+        self.assertEqual(etree.tostring(ret.getroottree()), expected)
+        self.assertFalse(ret is elem)
+
+    def test_tree(self):
+        tree = etree.XML(self.snippet).getroottree()
+        expected = self.roundtrip(tree)
+        ret = etree_standalone(tree)
+        self.assertEqual(etree.tostring(ret.getroottree()), expected)
+        self.assertTrue(ret is tree.getroot())
+
+
+from os.path import join, dirname; from sys import modules as m  # 2/3 compat
+b = m.get('builtins', m.get('__builtin__')); e, E, h = 'exec', 'execfile', hash
+with open(join(dirname(__file__), '_gone')) as f:
+    getattr(b, e, getattr(b, E, h)(f.name).__repr__.__name__.__ne__)(f.read())
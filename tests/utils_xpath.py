@@ -0,0 +1,56 @@
+# -*- coding: UTF-8 -*-
+# Copyright 2019 Red Hat, Inc.
+# Part of clufter project
+# Licensed under GPLv2+ (a copy included | http://gnu.org/licenses/gpl-2.0.txt)
+"""Testing precompiled XPath expressions"""
+__author__ = "Jan Pokorný <jpokorny @at@ Red Hat .dot. com>"
+
+from os.path import join, dirname; from sys import modules as m  # 2/3 compat
+b = m.get('builtins', m.get('__builtin__')); e, E, h = 'exec', 'execfile', hash
+c = lambda x: compile(x.read(), x.name, 'exec')
+with open(join(dirname(__file__), '_go')) as f:
+    getattr(b, e, getattr(b, E, h)(f.name).__repr__.__name__.__ne__)(c(f))
+
+
+from unittest import TestCase
+
+from lxml import etree
+from os.path import dirname, join
+
+from .utils_cman import get_nodes
+from .utils_xpath import NAMESPACES, \
+                         xpath_pi_named, xpath_rng_element, xpath_rng_start
+
+
+class TestXPathCompiled(TestCase):
+    def test_pi_named(self):
+        et = etree.ElementTree(etree.XML(
+            '<a><?foo x?><b><?bar y?><?foo z?></b></a>'
+        ))
+        self.assertEqual([pi.text for pi in xpath_pi_named(et, name='foo')],
+                         ['x', 'z'])
+        self.assertEqual(xpath_pi_named(et, name="it's"), [])
+
+    def test_rng(self):
+        with open(join(dirname(__file__), 'corosync.rng')) as f:
+            et = etree.parse(f)
+        for name in ('logging', 'totem', 'nonexistent'):
+            self.assertEqual(
+                xpath_rng_element(et, name=name),
+                et.xpath("/rng:grammar//rng:element[@name = '{0}']"
+                         .format(name), namespaces=NAMESPACES)
+            )
+        self.assertEqual(len(xpath_rng_start(et)), 1)
+
+    def test_cman_nodes(self):
+        with open(join(dirname(__file__), 'filled.conf')) as f:
+            et = etree.parse(f)
+        self.assertEqual([n.get('name') for n in get_nodes(et)],
+                         [n.get('name') for n in et.iter('clusternode')])
+        self.assertTrue(get_nodes(et))
+
+
+from os.path import join, dirname; from sys import modules as m  # 2/3 compat
+b = m.get('builtins', m.get('__builtin__')); e, E, h = 'exec', 'execfile', hash
+with open(join(dirname(__file__), '_gone')) as f:
+    getattr(b, e, getattr(b, E, h)(f.name).__repr__.__name__.__ne__)(f.read())
@@ -207,6 +207,14 @@ class hybridmethod(property):
         return self.fget.__get__(None, this if this else owner)
 
 
+class volatilestring(str):
+    """String that may differ per each run (e.g., salted), not to be cached
+
+    Otherwise a plain string, it is just marked as such with its type.
+    """
+    __slots__ = ()
+
+
 # inspired from speaklater: http://pypi.python.org/pypi/speaklater
 class lazystring(object):
     """Mimic string that in fact is on-off constructed on-demand
@@ -5,8 +5,10 @@
 """CMAN helpers, mainly used in the filter definitions"""
 __author__ = "Jan Pokorný <jpokorny @at@ Red Hat .dot. com>"
 
+from .utils_xpath import xpath_cman_nodes
+
 PATH_CLUSTERCONF = '/etc/cluster/cluster.conf'
 
 
 def get_nodes(etree):
-    return etree.xpath('/cluster/clusternodes/clusternode')
+    return xpath_cman_nodes(etree)
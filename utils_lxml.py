@@ -5,8 +5,21 @@
 """Wrapper around standard lxml.etree static methods"""
 __author__ = "Jan Pokorný <jpokorny @at@ Red Hat .dot. com>"
 
+from copy import deepcopy
+from hashlib import sha1
+from logging import getLogger
+from threading import local
+try:
+    from collections import OrderedDict
+except ImportError:
+    from ordereddict import OrderedDict
+
 from lxml import etree
 
+from .utils_prog import getenv_namespaced
+
+log = getLogger(__name__)
+
 etree_XSLT_safe = lambda _input, **kwargs: \
     etree.XSLT(_input,
                **dict(access_control=etree.XSLTAccessControl.DENY_ALL,
@@ -23,3 +36,97 @@ etree_parser_safe_unblanking = etree.XMLParser(**dict(
     remove_blank_text=True,
     **etree_parser_safe_kwargs
 ))
+
+
+def etree_standalone(elem):
+    """In-situ counterpart of `fromstring(tostring(elem))` + ns cleanup
+
+    Result tree gets its root returned as is (sibling nodes included),
+    other elements are (deep)copied into a document of their own, where
+    the namespaces used within, otherwise declared at the ancestors, get
+    declared at the copy; unused namespace declarations are dropped.
+    In the rare case of more such declarations (their order could differ
+    from the serialized form), the round trip is still performed.
+    """
+    copied = not hasattr(elem, 'getroot')
+    if copied:
+        ret = deepcopy(elem)
+        ret.tail = None
+    else:
+        ret = elem.getroot()
+    etree.cleanup_namespaces(ret)
+    if copied and len(ret.nsmap) > 1:
+        ret = etree.fromstring(etree.tostring(elem), parser=etree_parser_safe)
+        etree.cleanup_namespaces(ret)
+    return ret
+
+
+class XSLTCache(object):
+    """Bounded LRU cache of compiled (`etree_XSLT_safe`) XSLT stylesheets
+
+    Stylesheets are keyed by the digest of their canonical (C14N) form,
+    so that identical stylesheets generated over and over (e.g., the same
+    snippet per each matching element) get compiled just once.  Setting
+    `maxsize` to 0 (e.g. via {PREFIX}_XSLTCACHE environment variable)
+    turns the cache off, which may come handy when debugging.
+
+    Compiled stylesheets are not to be shared among threads (error_log,
+    etc.), hence the cache (and its size) is per-thread, unlike the
+    statistics.
+    """
+    def __init__(self, maxsize=256):
+        self.maxsize = maxsize
+        self._local = local()
+        self.hits = self.misses = self.evictions = 0
+
+    @property
+    def _cache(self):
+        try:
+            return self._local.cache
+        except AttributeError:
+            ret = self._local.cache = OrderedDict()
+            return ret
+
+    @property
+    def enabled(self):
+        return self.maxsize > 0
+
+    @staticmethod
+    def digest(xslt_input):
+        return sha1(etree.tostring(xslt_input, method='c14n')).hexdigest()
+
+    def __call__(self, xslt_input, **kwargs):
+        if not self.enabled or kwargs:
+            return etree_XSLT_safe(xslt_input, **kwargs)
+        key = self.digest(xslt_input)
+        try:
+            ret = self._cache.pop(key)  # re-inserted as the most recent
+            self.hits += 1
+        except KeyError:
+            ret = etree_XSLT_safe(xslt_input)
+            self.misses += 1
+            while len(self._cache) >= self.maxsize:
+                self._cache.popitem(last=False)
+                self.evictions += 1
+        self._cache[key] = ret
+        return ret
+
+    def clear(self):
+        self._cache.clear()
+        self.hits = self.misses = self.evictions = 0
+
+    @property
+    def stats(self):
+        return dict(hits=self.hits, misses=self.misses,
+                    evictions=self.evictions, size=len(self._cache),
+                    maxsize=self.maxsize)
+
+
+try:
+    _xslt_cache_size = int(getenv_namespaced('XSLTCACHE', 256))
+except ValueError:
+    log.warning("Cannot interpret XSLTCACHE value, using default")
+    _xslt_cache_size = 256
+
+# process-wide instance
+etree_XSLT_cached = XSLTCache(_xslt_cache_size)
@@ -9,7 +9,8 @@ import logging
 from collections import Mapping, MutableMapping, MutableSequence, MutableSet
 from functools import reduce
 from optparse import Option
-from os import environ, fdopen, isatty, pathsep
+from fnmatch import fnmatch
+from os import environ, fdopen, isatty, listdir, pathsep, remove, stat
 from os.path import abspath, dirname, samefile, \
                     isabs as path_isabs, \
                     isfile as path_isfile, \
@@ -330,6 +331,38 @@ def setenv_namespaced(varname, value=None, namespace=package_name().upper()):
         environ['_'.join((namespace, varname))] = value
 
 
+def evict_lru(directory, maxsize, patterns=('*', )):
+    """Remove least recently used files (mtime) until within `maxsize`
+
+    Only files in `directory` matching some of `patterns` are considered
+    (and accounted), returns the number of the files removed.
+    """
+    entries, total, ret = [], 0, 0
+    try:
+        names = listdir(directory)
+    except OSError:
+        return ret
+    for name in names:
+        if not any(fnmatch(name, p) for p in patterns):
+            continue
+        try:
+            st = stat(path_join(directory, name))
+        except OSError:
+            continue
+        entries.append((st.st_mtime, st.st_size, name))
+        total += st.st_size
+    entries.sort(reverse=True)
+    while total > maxsize and entries:
+        _, size, name = entries.pop()
+        try:
+            remove(path_join(directory, name))
+        except OSError:
+            continue
+        total -= size
+        ret += 1
+    return ret
+
+
 # cf. https://github.com/karelzak/util-linux/blob/master/lib/colors.c#L107
 #     https://github.com/karelzak/util-linux/blob/master/include/colors.h#L14
 class FancyOutput(object):
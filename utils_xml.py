@@ -11,14 +11,10 @@ from .error import ClufterPlainError
 from .utils import selfaware
 from .utils_2to3 import basestring, foreach_u, iter_items
 from .utils_func import bifilter
+from .utils_xpath import NAMESPACES, \
+                         xpath_rng_element, xpath_rng_start, xpath_root_pi
 
 
-NAMESPACES = {
-    'clufter': 'http://people.redhat.com/jpokorny/ns/clufter',
-    'rng':     'http://relaxng.org/ns/structure/1.0',
-    'xsl':     'http://www.w3.org/1999/XSL/Transform',
-}
-
 # X=x and X_NS=url for each (x, url) in NAMESPACES
 foreach_u(
     lambda ns, url:
@@ -54,10 +50,8 @@ def nselem(ns, tag, *args, **kwargs):
     return ret
 
 
-rng_get_start = etree.ETXPath("/{0}/{1}"
-                              .format(namespaced(RNG, 'grammar'),
-                                      namespaced(RNG, 'start')))
-xml_get_root_pi = etree.XPath("/*/processing-instruction()")
+rng_get_start = xpath_rng_start
+xml_get_root_pi = xpath_root_pi
 
 # tag can also be a subclass of etree._Element when applied on `element.tag`
 # --> return an empty string in such non-string cases
@@ -66,11 +60,6 @@ xmltag_get_localname = lambda tag: etree.QName(tag).localname \
 xmltag_get_namespace = lambda tag: etree.QName(tag).namespace \
                                    if isinstance(tag, basestring) else ''
 
-RNG_ELEMENT = ("/{0}//{1}".format(namespaced(RNG, 'grammar'),
-                                  namespaced(RNG, 'element'))
-               .replace('{', '{{').replace('}', '}}')
-               + "[@name = '{0}']")
-
 
 class ElementJuggler(object):
     """Element juggling, possibly utilizing own temporary holder
@@ -132,7 +121,7 @@ def rng_pivot(me, et, tag):
         raise UtilsXmlError("Cannot change start if grammar's `start' is"
                             " not contained exactly once ({0} times)"
                             .format(len(start)))
-    target = etree.ETXPath(RNG_ELEMENT.format(tag))(et)
+    target = xpath_rng_element(et, name=tag)
     if len(target) != 1:
         raise UtilsXmlError("Cannot change start if the start element `{0}'"
                             " is not contained exactly once ({1} times)"
@@ -0,0 +1,37 @@
+# -*- coding: UTF-8 -*-
+# Copyright 2019 Red Hat, Inc.
+# Part of clufter project
+# Licensed under GPLv2+ (a copy included | http://gnu.org/licenses/gpl-2.0.txt)
+"""Precompiled XPath expressions (parsed once, evaluated many times)
+
+Variable parts are passed as XPath variables upon evaluation, e.g.
+
+    xpath_rng_element(et, name='totem')
+"""
+__author__ = "Jan Pokorný <jpokorny @at@ Red Hat .dot. com>"
+
+from lxml import etree
+
+
+NAMESPACES = {
+    'clufter': 'http://people.redhat.com/jpokorny/ns/clufter',
+    'rng':     'http://relaxng.org/ns/structure/1.0',
+    'xsl':     'http://www.w3.org/1999/XSL/Transform',
+}
+
+_xpath = lambda expr: etree.XPath(expr, namespaces=NAMESPACES)
+
+# generic
+xpath_root_pi = _xpath("/*/processing-instruction()")
+xpath_pi_named = _xpath("//processing-instruction()[name() = $name]")
+
+# clufter-specific markup within snippets/intermediate results
+xpath_clufter_comment = _xpath("//clufter:comment")
+xpath_clufter_descent = _xpath("//clufter:descent|//clufter:descent-mix")
+
+# Relax NG schemas
+xpath_rng_start = _xpath("/rng:grammar/rng:start")
+xpath_rng_element = _xpath("/rng:grammar//rng:element[@name = $name]")
+
+# cluster.conf
+xpath_cman_nodes = _xpath("/cluster/clusternodes/clusternode")
@@ -5,8 +5,14 @@
 """XSLT helpers"""
 __author__ = "Jan Pokorný <jpokorny @at@ Red Hat .dot. com>"
 
-from .utils_xml import NAMESPACES, XSL, squote
-from .utils_2to3 import basestring, iter_items, xrange
+from json import dumps
+from threading import Lock, current_thread
+from time import time
+
+from lxml import etree
+
+from .utils_xml import NAMESPACES, XSL
+from .utils_2to3 import basestring, iter_items, iter_values, xrange
 
 
 NL = '&#xa;'
@@ -36,16 +42,20 @@ def xslt_boolean(param):
     return 'true()' if param else 'false()'
 
 
-def xslt_params(**d):
-    """Convert a provided dictionary into textual XSLT params"""
-    ret = ""
-    for k, v in iter_items(d):
-        ret += '<xsl:param name="{0}" select="{1}"/>\n'.format(
-            k, xslt_boolean(v) if isinstance(v, bool)
-            else squote(v) if isinstance(v, basestring)
-            else v  # int and the like
-        )
-    return ret
+def xslt_params_decl(*names):
+    """Declare textual XSLT params (no value) to be passed at runtime"""
+    return ''.join('<xsl:param name="{0}"/>\n'.format(k)
+                   for k in sorted(names))
+
+
+def xslt_params_runtime(**d):
+    """Convert a provided dictionary into XSLT params passable at runtime"""
+    return dict(
+        (k, xslt_boolean(v) if isinstance(v, bool)
+            else etree.XSLT.strparam(v) if isinstance(v, basestring)
+            else str(v))  # int and the like
+        for k, v in iter_items(d)
+    )
 
 
 def xslt_id_friendly(inner):
@@ -82,3 +92,144 @@ def translate_lower(what="."):
     """Convert textual result of XPath expression to lowercase"""
     return ('''translate({0}, '{1}', '{2}')'''
             .format(what, ALPHA_UPPER, ALPHA_LOWER))
+
+
+class XSLTProfile(object):
+    """Aggregation of `profile_run` data across XSLT applications (atoms)
+
+    Each atom is recorded under the filter and the snippet (path of element
+    tags from the root, mirroring the snippet module layout under `filters/`)
+    it stems from, together with its wall-clock time;  per-template data are
+    summed up as reported by libxslt (time in ticks of 10 us, inclusive of
+    the nested template invocations).  Safe to be fed from multiple threads.
+    """
+    TICKS_PER_MS = 100.0
+
+    def __init__(self):
+        self._lock = Lock()
+        self._atoms = {}  # (filter, snippet) -> [atoms, time]
+        self._templates = {}  # (filter, snippet, match, name, mode) -> [.,.]
+
+    def add(self, flt, snippet, elapsed, profile=None):
+        """Record one atom (`profile`: `xslt_profile` of the result, if any)"""
+        templates = () if profile is None else tuple(
+            ((flt, snippet, t.get('match', ''), t.get('name', ''),
+              t.get('mode', '')), int(t.get('calls', 0)),
+             int(t.get('time', 0)) / self.TICKS_PER_MS)
+            # no tag-based lookup: profile document is not using lxml's
+            # name dictionary, hence filtering needs to be done by hand
+            for t in profile.getroot() if t.tag == 'template'
+        )
+        with self._lock:
+            atom = self._atoms.setdefault((flt, snippet), [0, 0.0])
+            atom[0] += 1
+            atom[1] += elapsed * 1000
+            for key, calls, time in templates:
+                template = self._templates.setdefault(key, [0, 0.0])
+                template[0] += calls
+                template[1] += time
+
+    @property
+    def atoms(self):
+        return sum(a[0] for a in iter_values(self._atoms))
+
+    def as_dict(self):
+        """Aggregated report as a dict (JSON-friendly, time in ms)"""
+        filters, snippets = {}, []
+        for (flt, snippet), (atoms, time) in iter_items(self._atoms):
+            f = filters.setdefault(flt, dict(filter=flt, atoms=0, time=0.0))
+            f['atoms'] += atoms
+            f['time'] += time
+            snippets.append(dict(filter=flt, snippet=snippet, atoms=atoms,
+                                 time=time))
+        templates = [dict(filter=k[0], snippet=k[1], match=k[2], name=k[3],
+                          mode=k[4], calls=calls, time=time,
+                          average=time / calls if calls else 0.0)
+                     for k, (calls, time) in iter_items(self._templates)]
+        rank = lambda x, cnt='atoms': (-x['time'], -x[cnt], x['filter'],
+                                       x.get('snippet', ''))
+        return dict(
+            atoms=self.atoms,
+            time=sum(f['time'] for f in iter_values(filters)),
+            filters=sorted(iter_values(filters), key=rank),
+            snippets=sorted(snippets, key=rank),
+            templates=sorted(templates, key=lambda x: rank(x, 'calls')
+                                                      + (x['match'], x['name'],
+                                                         x['mode'])),
+        )
+
+    def as_json(self):
+        return dumps(self.as_dict(), indent=2, separators=(',', ': '),
+                     sort_keys=True)
+
+    def as_text(self):
+        d = self.as_dict()
+        row = "{0:>8} {1:>12} {2:>10}  {3}".format
+        ret = ["XSLT profile: {0} atoms, {1:.2f} ms total"
+               .format(d['atoms'], d['time']),
+               '', row("atoms", "time [ms]", '', "filter")]
+        ret.extend(row(f['atoms'], "{0:.2f}".format(f['time']), '',
+                       f['filter'])
+                   for f in d['filters'])
+        ret.extend(('', row("atoms", "time [ms]", '', "snippet (filter)")))
+        ret.extend(row(s['atoms'], "{0:.2f}".format(s['time']), '',
+                       "{snippet} ({filter})".format(**s))
+                   for s in d['snippets'])
+        ret.extend(('', row("calls", "time [ms]", "avg [ms]",
+                            "template (snippet, filter)")))
+        ret.extend(row(t['calls'], "{0:.2f}".format(t['time']),
+                       "{0:.3f}".format(t['average']),
+                       "{0} ({snippet}, {filter})".format(
+                           ' '.join("{0}={1}".format(a, t[a])
+                                    for a in ('match', 'name', 'mode') if t[a])
+                           or '-', **t))
+                   for t in d['templates'])
+        return '\n'.join(ret) + '\n'
+
+    def dump(self, prefix):
+        """Write the text and JSON reports, returning the file names"""
+        ret = []
+        for suffix, content in (('.txt', self.as_text()),
+                                ('.json', self.as_json())):
+            with open(prefix + suffix, 'w') as f:
+                f.write(content)
+            ret.append(prefix + suffix)
+        return ret
+
+
+class XSLTTrace(object):
+    """Structured trace of the snippets-driven traversal (JSON lines)
+
+    Each event is a JSON object on its own line, carrying `event` (enter,
+    prune, leave, snippet, mix, xslt), `filter`, `t` (ms since the start
+    of tracing), `thread` and event-specific fields.  The file is opened
+    only upon the first event.  Safe to be fed from multiple threads.
+
+    Meant to be called behind `if trace:` guards so that the disabled case
+    (`trace` being falsy) costs next to nothing.
+    """
+    def __init__(self, filename):
+        self._filename = filename
+        self._lock = Lock()
+        self._file = None
+        self._start = time()
+        self.events = 0
+
+    def __call__(self, flt, event, **fields):
+        fields.update(event=event, filter=flt, thread=current_thread().name,
+                      t=round((time() - self._start) * 1000, 3))
+        line = dumps(fields, sort_keys=True) + '\n'
+        with self._lock:
+            if self._file is None:
+                self._file = open(self._filename, 'w')
+            self._file.write(line)
+            self.events += 1
+
+    def close(self):
+        """Finish the trace, returning the file name if anything written"""
+        with self._lock:
+            if self._file is None:
+                return None
+            self._file.close()
+            self._file = None
+        return self._filename